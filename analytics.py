@@ -0,0 +1,491 @@
+"""Fleet analytics over per-call records.
+
+:class:`persistence.CallWriter` appends one JSON line per finished call to
+``reports/calls.jsonl`` (:func:`metrics.append_call_records`).
+:class:`FleetAnalytics` reads that file from the byte offset where the
+last run stopped. It parses only the new calls and appends them to compact
+typed columns (:class:`CallColumns`), which are saved as raw binary files
+next to a small JSON state file. Then it recomputes the statistics of the
+days those calls fell on. The statistics are latency percentiles, the
+duration distribution, the guardrail reject rate and the calendar error
+rate. They are computed with vectorized grouped reductions over the
+columns when NumPy is installed, and with plain loops otherwise.
+
+Run ``python analytics.py`` to update the state and print the report.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import codec
+from latency import PERCENTILES
+from metrics import CALL_RECORDS_FILE, percentiles
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+BACKEND = "numpy" if np is not None else "python"
+
+# Column name and array typecode; latencies are single precision
+COLUMNS = (
+    ("start", "d"),
+    ("duration", "d"),
+    ("items", "i"),
+    ("turns", "i"),
+    ("guardrail_rejects", "i"),
+    ("calendar_errors", "i"),
+    ("setup_latency", "f"),
+    ("turn_latency", "f"),
+    ("first_audio", "f"),
+)
+
+# Columns reported as p50/p95/p99 across the calls of a day
+LATENCY_COLUMNS = ("turn_latency", "first_audio", "setup_latency")
+
+# Upper bounds in seconds of the call duration buckets; the last is open
+DURATION_BUCKETS = (30, 60, 120, 300, 600)
+DURATION_LABELS = ("<30s", "30s-1m", "1-2m", "2-5m", "5-10m", "10m+")
+
+_DAY = 86400
+_READ_CHUNK = 4 * 1024 * 1024
+_STATE_FILE = "state.json"
+_STATE_VERSION = 1
+
+
+def _epoch(start: str) -> float:
+    moment = datetime.fromisoformat(start)
+    if moment.tzinfo is None:
+        # Call start times are recorded in UTC without an offset
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def day_label(day: int) -> str:
+    """Return the ISO date of a day number (days since the epoch, UTC)."""
+    return datetime.fromtimestamp(day * _DAY, tz=timezone.utc).date().isoformat()
+
+
+class CallColumns:
+    """Per-call metrics as one typed :class:`array.array` per column.
+
+    A call takes 44 bytes across all columns. Missing latencies are NaN.
+    """
+
+    def __init__(self) -> None:
+        self.arrays: Dict[str, array] = {name: array(code) for name, code in COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self.arrays["start"])
+
+    def append(self, record: Mapping[str, Any]) -> None:
+        """Append one :func:`metrics.call_record` record."""
+        turns = int(record.get("turns", 0))
+        values = (
+            _epoch(record["start"]),
+            float(record.get("duration", 0.0)),
+            int(record.get("items", 0)),
+            turns,
+            int(record.get("guardrail_rejects", 0)),
+            int(record.get("calendar_errors", 0)),
+            float(record.get("setup_latency", 0.0)),
+            float(record.get("avg_latency", 0.0)) if turns else math.nan,
+            float(record.get("first_audio", math.nan)),
+        )
+        # Convert every value before appending so a bad record leaves the
+        # columns aligned
+        for (name, _), value in zip(COLUMNS, values):
+            self.arrays[name].append(value)
+
+    def view(self, name: str):
+        """Return a column as a zero-copy NumPy array (or the array itself).
+
+        Do not keep a NumPy view across :meth:`append`; an array cannot grow
+        while its buffer is exported.
+        """
+        column = self.arrays[name]
+        if np is None:
+            return column
+        if not len(column):
+            return np.empty(0, dtype=column.typecode)
+        return np.frombuffer(column, dtype=column.typecode)
+
+    def days(self, start: int = 0) -> List[int]:
+        """Return the distinct day numbers of the calls from index ``start``."""
+        if np is not None:
+            starts = self.view("start")[start:]
+            return [int(d) for d in np.unique(np.floor(starts / _DAY))]
+        return sorted({int(t // _DAY) for t in self.arrays["start"][start:]})
+
+    def nbytes(self) -> int:
+        return sum(len(a) * a.itemsize for a in self.arrays.values())
+
+    def save(self, directory: str, start: int = 0) -> None:
+        """Append the calls from index ``start`` to the column files."""
+        os.makedirs(directory, exist_ok=True)
+        for name, column in self.arrays.items():
+            with open(os.path.join(directory, f"{name}.bin"), "ab") as f:
+                column[start:].tofile(f)
+
+    @classmethod
+    def load(cls, directory: str, count: int) -> "CallColumns":
+        """Load the first ``count`` calls saved in ``directory``.
+
+        Column files are truncated to ``count`` calls, dropping rows written
+        by a run that stopped before it saved its state.
+        """
+        columns = cls()
+        for name, column in columns.arrays.items():
+            path = os.path.join(directory, f"{name}.bin")
+            with open(path, "rb") as f:
+                column.fromfile(f, count)
+            if os.path.getsize(path) > count * column.itemsize:
+                os.truncate(path, count * column.itemsize)
+        return columns
+
+
+def _nearest_rank(ordered: Sequence[float], q: float) -> float:
+    return ordered[max(1, math.ceil(len(ordered) * q / 100)) - 1]
+
+
+def _group_stats_numpy(columns: CallColumns, keys, mask=None) -> Dict[int, Dict[str, Any]]:
+    view = {name: columns.view(name) for name, _ in COLUMNS}
+    if mask is not None:
+        keys = keys[mask]
+        view = {name: values[mask] for name, values in view.items()}
+    if not len(keys):
+        return {}
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    groups, starts, counts = np.unique(sorted_keys, return_index=True, return_counts=True)
+    group_of_row = np.repeat(np.arange(len(groups)), counts)
+
+    def sums(name):
+        return np.add.reduceat(view[name][order].astype(np.float64), starts)
+
+    def grouped_percentiles(values):
+        # Sort by group, then value; NaNs sort last within each group
+        ranked = values[np.lexsort((values, keys))]
+        valid = np.add.reduceat((~np.isnan(ranked)).astype(np.int64), starts)
+        result = {}
+        for q in PERCENTILES:
+            rank = np.maximum(1, np.ceil(valid * q / 100)).astype(np.int64)
+            picked = ranked[np.minimum(starts + rank - 1, len(ranked) - 1)]
+            result[q] = np.where(valid > 0, picked, np.nan)
+        return valid, result
+
+    durations = view["duration"]
+    duration_sum = sums("duration")
+    _, duration_pct = grouped_percentiles(durations)
+    bounds = np.asarray(DURATION_BUCKETS, dtype=np.float64)
+    bucket = np.searchsorted(bounds, durations[order], side="right")
+    width = len(DURATION_LABELS)
+    histogram = np.bincount(group_of_row * width + bucket, minlength=len(groups) * width)
+    histogram = histogram.reshape(len(groups), width)
+    items = sums("items")
+    rejects = sums("guardrail_rejects")
+    errors = sums("calendar_errors")
+    erred = (view["calendar_errors"][order] > 0).astype(np.int64)
+    calls_with_errors = np.add.reduceat(erred, starts)
+    latency = {name: grouped_percentiles(view[name]) for name in LATENCY_COLUMNS}
+
+    stats = {}
+    for g, key in enumerate(groups):
+        calls = int(counts[g])
+        entry: Dict[str, Any] = {
+            "calls": calls,
+            "duration_mean": float(duration_sum[g]) / calls,
+        }
+        for q in PERCENTILES:
+            entry[f"duration_p{q}"] = float(duration_pct[q][g])
+        entry["duration_buckets"] = [int(n) for n in histogram[g]]
+        for name in LATENCY_COLUMNS:
+            valid, pct = latency[name]
+            entry[f"{name}_count"] = int(valid[g])
+            for q in PERCENTILES:
+                entry[f"{name}_p{q}"] = _finite(float(pct[q][g]))
+        entry.update(
+            _rates(
+                calls,
+                float(items[g]),
+                float(rejects[g]),
+                float(errors[g]),
+                int(calls_with_errors[g]),
+            )
+        )
+        stats[int(key)] = entry
+    return stats
+
+
+def _group_stats_python(
+    columns: CallColumns, keys: Iterable[int], wanted=None
+) -> Dict[int, Dict[str, Any]]:
+    rows: Dict[int, List[int]] = {}
+    for index, key in enumerate(keys):
+        if wanted is None or key in wanted:
+            rows.setdefault(key, []).append(index)
+    arrays = columns.arrays
+    stats = {}
+    for key in sorted(rows):
+        indexes = rows[key]
+        calls = len(indexes)
+        durations = [arrays["duration"][i] for i in indexes]
+        entry: Dict[str, Any] = {"calls": calls, "duration_mean": math.fsum(durations) / calls}
+        for name, value in percentiles(durations).items():
+            entry[f"duration_{name}"] = value
+        buckets = [0] * len(DURATION_LABELS)
+        for duration in durations:
+            buckets[sum(duration >= bound for bound in DURATION_BUCKETS)] += 1
+        entry["duration_buckets"] = buckets
+        for name in LATENCY_COLUMNS:
+            values = sorted(v for v in (arrays[name][i] for i in indexes) if not math.isnan(v))
+            entry[f"{name}_count"] = len(values)
+            for q in PERCENTILES:
+                entry[f"{name}_p{q}"] = _nearest_rank(values, q) if values else None
+        errors = [arrays["calendar_errors"][i] for i in indexes]
+        entry.update(
+            _rates(
+                calls,
+                sum(arrays["items"][i] for i in indexes),
+                sum(arrays["guardrail_rejects"][i] for i in indexes),
+                sum(errors),
+                sum(1 for n in errors if n > 0),
+            )
+        )
+        stats[key] = entry
+    return stats
+
+
+def _finite(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+def _rates(
+    calls: int, items: float, rejects: float, errors: float, calls_with_errors: int
+) -> Dict[str, Any]:
+    return {
+        "items": int(items),
+        "guardrail_rejects": int(rejects),
+        # Rejected items per transcript item
+        "guardrail_reject_rate": rejects / items if items else 0.0,
+        "calendar_errors": int(errors),
+        # Share of calls with at least one calendar error
+        "calendar_error_rate": calls_with_errors / calls,
+    }
+
+
+def day_stats(
+    columns: CallColumns, days: Optional[Iterable[int]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Return statistics per ISO date for ``days`` (day numbers), or for all days."""
+    wanted = None if days is None else sorted(set(days))
+    if np is not None:
+        keys = np.floor(columns.view("start") / _DAY).astype(np.int64)
+        mask = None if wanted is None else np.isin(keys, wanted)
+        stats = _group_stats_numpy(columns, keys, mask)
+    else:
+        keys = (int(t // _DAY) for t in columns.arrays["start"])
+        stats = _group_stats_python(columns, keys, None if wanted is None else set(wanted))
+    return {day_label(day): entry for day, entry in stats.items()}
+
+
+def fleet_stats(columns: CallColumns) -> Dict[str, Any]:
+    """Return the statistics of every call together."""
+    if not len(columns):
+        return {"calls": 0}
+    if np is not None:
+        stats = _group_stats_numpy(columns, np.zeros(len(columns), dtype=np.int64))
+    else:
+        stats = _group_stats_python(columns, [0] * len(columns))
+    return stats[0]
+
+
+class FleetAnalytics:
+    """Incrementally maintained columns and per-day statistics.
+
+    Parameters
+    ----------
+    reports_dir: str
+        Directory holding :data:`metrics.CALL_RECORDS_FILE`.
+    state_dir: str
+        Where columns and state are kept between runs (default:
+        ``<reports_dir>/analytics``).
+    """
+
+    def __init__(self, reports_dir: str = "reports", state_dir: Optional[str] = None):
+        self.records_path = os.path.join(reports_dir, CALL_RECORDS_FILE)
+        self.state_dir = state_dir or os.path.join(reports_dir, "analytics")
+        self.columns = CallColumns()
+        self.offset = 0
+        self.skipped = 0
+        self.days: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        path = os.path.join(self.state_dir, _STATE_FILE)
+        if not os.path.exists(path):
+            # Column files without state are left over from an interrupted run
+            self.reset()
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") != _STATE_VERSION:
+                raise ValueError("state version changed")
+            self.columns = CallColumns.load(self.state_dir, state["calls"])
+        except (ValueError, KeyError, EOFError, OSError):
+            # Unreadable or inconsistent state: rebuild from the records
+            self.reset()
+            return
+        self.offset = state["offset"]
+        self.skipped = state.get("skipped", 0)
+        self.days = state["days"]
+
+    def reset(self) -> None:
+        """Forget all ingested calls and delete the saved state."""
+        self.columns = CallColumns()
+        self.offset = 0
+        self.skipped = 0
+        self.days = {}
+        for name, _ in COLUMNS:
+            try:
+                os.remove(os.path.join(self.state_dir, f"{name}.bin"))
+            except FileNotFoundError:
+                pass
+        try:
+            os.remove(os.path.join(self.state_dir, _STATE_FILE))
+        except FileNotFoundError:
+            pass
+
+    def _save(self, start: int) -> None:
+        self.columns.save(self.state_dir, start)
+        state = {
+            "version": _STATE_VERSION,
+            "offset": self.offset,
+            "calls": len(self.columns),
+            "skipped": self.skipped,
+            "days": self.days,
+        }
+        path = os.path.join(self.state_dir, _STATE_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(path + ".tmp", path)
+
+    def update(self) -> Dict[str, int]:
+        """Ingest calls recorded since the last update and refresh their days.
+
+        Returns the number of new calls, days recomputed and calls in total.
+        A trailing partial line is left for the next update.
+        """
+        try:
+            size = os.path.getsize(self.records_path)
+        except FileNotFoundError:
+            size = 0
+        if size < self.offset:
+            # The record file was replaced or truncated
+            self.reset()
+        start = len(self.columns)
+        if size > self.offset:
+            self._read_new()
+        touched = self.columns.days(start) if len(self.columns) > start else []
+        if touched:
+            self.days.update(day_stats(self.columns, touched))
+        self._save(start)
+        total = len(self.columns)
+        return {"calls": total - start, "days": len(touched), "total": total}
+
+    def _read_new(self) -> None:
+        with open(self.records_path, "rb") as f:
+            f.seek(self.offset)
+            tail = b""
+            while True:
+                chunk = f.read(_READ_CHUNK)
+                if not chunk:
+                    return
+                data = tail + chunk
+                end = data.rfind(b"\n") + 1
+                tail = data[end:]
+                for line in data[:end].splitlines():
+                    if line.strip():
+                        self._ingest(line)
+                self.offset += end
+
+    def _ingest(self, line: bytes) -> None:
+        try:
+            self.columns.append(codec.loads(line))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self.skipped += 1
+
+    def report(self, last_days: Optional[int] = None) -> Dict[str, Any]:
+        """Return per-day statistics (optionally the last ``last_days``) and fleet totals."""
+        dates = sorted(self.days)
+        if last_days:
+            dates = dates[-last_days:]
+        return {
+            "days": {date: self.days[date] for date in dates},
+            "fleet": fleet_stats(self.columns),
+            "skipped": self.skipped,
+        }
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 1000:.0f}"
+
+
+def format_report(report: Mapping[str, Any]) -> str:
+    """Render :meth:`FleetAnalytics.report` as a text table."""
+    header = (
+        f"{'day':<12}{'calls':>7}{'dur p50':>9}{'dur p95':>9}"
+        f"{'turn p50':>10}{'turn p95':>10}{'turn p99':>10}{'first p95':>11}"
+        f"{'reject %':>10}{'cal err %':>11}  duration " + "/".join(DURATION_LABELS)
+    )
+    lines = [header]
+    rows = list(report["days"].items())
+    if report["fleet"].get("calls"):
+        rows.append(("all", report["fleet"]))
+    for date, s in rows:
+        lines.append(
+            f"{date:<12}{s['calls']:>7}{s['duration_p50']:>9.0f}{s['duration_p95']:>9.0f}"
+            f"{_ms(s['turn_latency_p50']):>10}{_ms(s['turn_latency_p95']):>10}"
+            f"{_ms(s['turn_latency_p99']):>10}{_ms(s['first_audio_p95']):>11}"
+            f"{s['guardrail_reject_rate'] * 100:>10.2f}{s['calendar_error_rate'] * 100:>11.2f}"
+            f"  " + "/".join(str(n) for n in s["duration_buckets"])
+        )
+    return "\n".join(lines)
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Update and print fleet call analytics.")
+    parser.add_argument("--reports-dir", default="reports")
+    parser.add_argument("--state-dir", default=None)
+    parser.add_argument("--days", type=int, default=14, help="days to show (0 for all)")
+    parser.add_argument(
+        "--rebuild", action="store_true", help="discard state and re-read every call"
+    )
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+    analytics = FleetAnalytics(args.reports_dir, args.state_dir)
+    if args.rebuild:
+        analytics.reset()
+    update = analytics.update()
+    report = analytics.report(args.days or None)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(
+        f"{update['calls']} new calls, {update['days']} days updated, {update['total']} calls "
+        f"({analytics.columns.nbytes() / 1024:.0f} KiB of columns, {BACKEND})"
+    )
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    main_cli()
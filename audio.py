@@ -0,0 +1,72 @@
+"""Helpers for the G.711 μ-law audio frames exchanged with Twilio and OpenAI."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+
+
+def passthrough_payload(delta: str, validate: bool = False) -> str:
+    """Return an OpenAI ``response.audio.delta`` payload for Twilio.
+
+    Both legs carry base64-encoded μ-law, so the string is forwarded as-is.
+    With ``validate`` the payload is decoded first and ``ValueError`` is
+    raised for malformed base64, which is useful when debugging a peer.
+    """
+    if validate:
+        try:
+            base64.b64decode(delta, validate=True)
+        except binascii.Error as exc:
+            raise ValueError(f"Invalid base64 audio payload: {exc}") from exc
+    return delta
+
+
+# 8 kHz μ-law: one byte per sample
+BYTES_PER_MS = 8
+
+
+class FrameCoalescer:
+    """Concatenate inbound μ-law frames into windows of ``window_ms``.
+
+    Twilio sends a 20 ms frame per ``media`` message. Each frame's base64
+    payload is decoded and buffered; :meth:`add` returns the re-encoded
+    window once ``window_ms`` of audio is buffered and :meth:`flush`
+    returns whatever is pending, e.g. on ``stop``, ``dtmf`` or a timeout.
+    ``first_at`` is when the oldest pending frame arrived.
+    """
+
+    __slots__ = ("window_bytes", "first_at", "frames", "_chunks", "_size")
+
+    def __init__(self, window_ms: int):
+        if window_ms <= 0:
+            raise ValueError("window_ms must be positive")
+        self.window_bytes = window_ms * BYTES_PER_MS
+        self.first_at = 0.0
+        self.frames = 0
+        self._chunks: list[bytes] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, payload: str, now: float) -> str | None:
+        """Buffer one frame received at ``now``; return a full window or ``None``."""
+        data = binascii.a2b_base64(payload)
+        if not self._chunks:
+            self.first_at = now
+        self._chunks.append(data)
+        self._size += len(data)
+        self.frames += 1
+        if self._size >= self.window_bytes:
+            return self.flush()
+        return None
+
+    def flush(self) -> str | None:
+        """Return the pending audio as one base64 payload, or ``None``."""
+        if not self._chunks:
+            return None
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self._size = 0
+        self.frames = 0
+        return binascii.b2a_base64(data, newline=False).decode("ascii")
@@ -0,0 +1,308 @@
+"""In-memory availability index at slot granularity.
+
+Each calendar's availability for a UTC day is one integer bitmap: bit ``i``
+is set when slot ``i`` of the day (``slot_minutes`` long, counted from
+midnight) overlaps none of the calendar's busy periods. Checking a slot is
+a dictionary lookup and a bit test. Team availability is the AND (everyone
+free) or OR (someone free) of the members' bitmaps. A booking clears its
+bit at once, before the calendar event is created.
+
+Slots are named by IDs such as ``20261017-20`` (day and slot index), so a
+slot offered to the caller can be booked without formatting and
+re-parsing times. :meth:`AvailabilityIndex.rebuild` replaces the bitmaps
+from freebusy data. It runs on a background thread. A booked slot stays
+busy across rebuilds until :meth:`AvailabilityIndex.confirm` records that
+its event was created, and rebuilds whose fetch may predate that keep it
+busy too.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from gcal import ALL_FREE, TEAM_MODES, Slot
+
+SlotId = str
+
+# Busy periods of each calendar between two times, e.g. gcal.query_busy
+BusyFetcher = Callable[[Sequence[str], datetime, datetime], Mapping[str, Sequence[Slot]]]
+
+
+def make_slot_id(day: date, index: int) -> SlotId:
+    """Return the ID of slot ``index`` on ``day``."""
+    return f"{day.year:04d}{day.month:02d}{day.day:02d}-{index:02d}"
+
+
+def parse_slot_id(slot_id: SlotId) -> Tuple[date, int]:
+    """Return the ``(day, index)`` of a slot ID; raise ``ValueError`` if malformed."""
+    if len(slot_id) < 10 or slot_id[8] != "-" or not slot_id[:8].isdigit():
+        raise ValueError(f"Invalid slot ID {slot_id!r}")
+    day = date(int(slot_id[:4]), int(slot_id[4:6]), int(slot_id[6:8]))
+    return day, int(slot_id[9:])
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, dt_time.min, tzinfo=timezone.utc)
+
+
+class AvailabilityIndex:
+    """Per-calendar, per-day free-slot bitmaps.
+
+    Parameters
+    ----------
+    slot_minutes: int
+        Slot length; must divide a day evenly.
+    clock: callable
+        Returns the current time, used for :attr:`built_at`.
+    """
+
+    def __init__(self, slot_minutes: int = 30, clock: Callable[[], float] = time.time):
+        if slot_minutes <= 0 or 1440 % slot_minutes:
+            raise ValueError("slot_minutes must divide 1440")
+        self.slot_minutes = slot_minutes
+        self.slots_per_day = 1440 // slot_minutes
+        self._full = (1 << self.slots_per_day) - 1
+        self._clock = clock
+        self._days: Dict[str, Dict[date, int]] = {}
+        # Slots booked whose calendar event may not be created yet
+        self._pending: Dict[str, Dict[date, int]] = {}
+        # Bumped by every booking and confirmation so a rebuild whose fetch
+        # started before them never resurrects a booked slot
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        start = datetime(2000, 1, 1)
+        delta = timedelta(minutes=slot_minutes)
+        self.labels: Tuple[str, ...] = tuple(
+            f"{(start + i * delta).strftime('%I:%M %p')} - "
+            f"{(start + (i + 1) * delta).strftime('%I:%M %p')}"
+            for i in range(self.slots_per_day)
+        )
+        self._label_index = {label: i for i, label in enumerate(self.labels)}
+        self.rebuilds = 0
+        self.built_at: Optional[float] = None
+        self.bookings = 0
+        self.conflicts = 0
+
+    # Slot IDs and times
+
+    def slot_bounds(self, slot_id: SlotId) -> Slot:
+        """Return the UTC start and end of a slot."""
+        day, index = self._parse(slot_id)
+        start = _day_start(day) + timedelta(minutes=index * self.slot_minutes)
+        return start, start + timedelta(minutes=self.slot_minutes)
+
+    def label(self, slot_id: SlotId) -> str:
+        """Return the ``"10:00 AM - 10:30 AM"`` label of a slot."""
+        return self.labels[self._index(slot_id)]
+
+    def resolve(self, time_slot: str, day: date) -> Optional[SlotId]:
+        """Return the slot ID for a slot ID or one of :attr:`labels` on ``day``."""
+        time_slot = time_slot.strip()
+        index = self._label_index.get(time_slot)
+        if index is not None:
+            return make_slot_id(day, index)
+        try:
+            self._parse(time_slot)
+        except ValueError:
+            return None
+        return time_slot
+
+    def _parse(self, slot_id: SlotId) -> Tuple[date, int]:
+        day, index = parse_slot_id(slot_id)
+        if not 0 <= index < self.slots_per_day:
+            raise ValueError(f"Invalid slot ID {slot_id!r}")
+        return day, index
+
+    def _index(self, slot_id: SlotId) -> int:
+        """Return the slot index of an ID without building its date."""
+        if len(slot_id) < 10 or slot_id[8] != "-" or not slot_id[9:].isdigit():
+            raise ValueError(f"Invalid slot ID {slot_id!r}")
+        index = int(slot_id[9:])
+        if index >= self.slots_per_day:
+            raise ValueError(f"Invalid slot ID {slot_id!r}")
+        return index
+
+    # Queries
+
+    def covers(self, calendar_ids: Iterable[str], day: date) -> bool:
+        """Return whether every calendar has a bitmap for ``day``."""
+        with self._lock:
+            return all(day in self._days.get(c, ()) for c in calendar_ids)
+
+    def is_free(self, calendar_id: str, slot_id: SlotId) -> bool:
+        """Return whether the calendar is free for the slot (``False`` if unknown)."""
+        day, index = self._parse(slot_id)
+        with self._lock:
+            bits = self._days.get(calendar_id, {}).get(day, 0)
+        return bool(bits >> index & 1)
+
+    def free_bits(self, calendar_ids: Sequence[str], day: date, mode: str = ALL_FREE) -> int:
+        """Return the team bitmap for ``day``.
+
+        Members' bitmaps are ANDed with :data:`~gcal.ALL_FREE` and ORed with
+        :data:`~gcal.ANY_FREE`. Days that are not indexed count as busy.
+        """
+        if mode not in TEAM_MODES:
+            raise ValueError(f"Unknown availability mode {mode!r}; expected one of {TEAM_MODES}")
+        with self._lock:
+            maps = [self._days.get(c, {}).get(day, 0) for c in calendar_ids]
+        if not maps:
+            return 0
+        bits = maps[0]
+        if mode == ALL_FREE:
+            for other in maps[1:]:
+                bits &= other
+        else:
+            for other in maps[1:]:
+                bits |= other
+        return bits
+
+    def free_slot_ids(
+        self, calendar_ids: Sequence[str], day: date, mode: str = ALL_FREE
+    ) -> List[SlotId]:
+        """Return the team's free slot IDs on ``day`` in time order."""
+        bits = self.free_bits(calendar_ids, day, mode)
+        prefix = make_slot_id(day, 0)[:9]
+        ids = []
+        while bits:
+            low = bits & -bits
+            ids.append(f"{prefix}{low.bit_length() - 1:02d}")
+            bits ^= low
+        return ids
+
+    def free_calendars(self, calendar_ids: Sequence[str], slot_id: SlotId) -> List[str]:
+        """Return the calendars free for the slot, in ``calendar_ids`` order."""
+        day, index = self._parse(slot_id)
+        with self._lock:
+            return [
+                c for c in calendar_ids if self._days.get(c, {}).get(day, 0) >> index & 1
+            ]
+
+    # Updates
+
+    def book(self, calendar_ids: Sequence[str], slot_id: SlotId) -> bool:
+        """Mark the slot busy on every calendar if all of them are free.
+
+        Returns ``False``, changing nothing, when one of them is already
+        busy or not indexed.
+        """
+        day, index = self._parse(slot_id)
+        bit = 1 << index
+        with self._lock:
+            maps = [self._days.get(c, {}) for c in calendar_ids]
+            if not all(m.get(day, 0) & bit for m in maps):
+                self.conflicts += 1
+                return False
+            for calendar_id, days in zip(calendar_ids, maps):
+                days[day] &= ~bit
+                pending = self._pending.setdefault(calendar_id, {})
+                pending[day] = pending.get(day, 0) | bit
+                self._generations[calendar_id] = self._generations.get(calendar_id, 0) + 1
+            self.bookings += 1
+            return True
+
+    def confirm(self, calendar_ids: Sequence[str], slot_id: SlotId) -> None:
+        """Record that the booked slot's event exists, so freebusy data shows it."""
+        day, index = self._parse(slot_id)
+        with self._lock:
+            for calendar_id in calendar_ids:
+                self._clear_pending(calendar_id, day, index)
+                self._generations[calendar_id] = self._generations.get(calendar_id, 0) + 1
+
+    def release(self, calendar_ids: Sequence[str], slot_id: SlotId) -> None:
+        """Mark the slot free again, e.g. after creating the event failed."""
+        day, index = self._parse(slot_id)
+        with self._lock:
+            for calendar_id in calendar_ids:
+                self._clear_pending(calendar_id, day, index)
+                days = self._days.get(calendar_id)
+                if days is not None and day in days:
+                    days[day] |= 1 << index
+
+    def _clear_pending(self, calendar_id: str, day: date, index: int) -> None:
+        pending = self._pending.get(calendar_id)
+        if pending is None or day not in pending:
+            return
+        pending[day] &= ~(1 << index)
+        if not pending[day]:
+            del pending[day]
+            if not pending:
+                del self._pending[calendar_id]
+
+    def set_busy(
+        self, calendar_id: str, first_day: date, days: int, busy: Iterable[Slot]
+    ) -> None:
+        """Replace the calendar's bitmaps for ``days`` days from ``first_day``."""
+        bitmaps = self._bitmaps(busy, first_day, days)
+        with self._lock:
+            self._days[calendar_id] = {
+                first_day + timedelta(days=d): bits for d, bits in enumerate(bitmaps)
+            }
+
+    def rebuild(
+        self, fetch_busy: BusyFetcher, calendar_ids: Sequence[str], first_day: date, days: int = 1
+    ) -> int:
+        """Fetch busy periods and replace the bitmaps of ``calendar_ids``.
+
+        Blocking; run it on a worker thread. Slots booked but not yet
+        confirmed, and slots booked or confirmed while the fetch was in
+        flight, stay busy. Returns the number of calendars indexed.
+        """
+        ids = list(dict.fromkeys(calendar_ids))
+        with self._lock:
+            generations = {c: self._generations.get(c, 0) for c in ids}
+        start = _day_start(first_day)
+        end = start + timedelta(days=days)
+        busy = fetch_busy(ids, start, end)
+        # A calendar missing from the answer is busy for the whole range
+        bitmaps = {c: self._bitmaps(busy.get(c, [(start, end)]), first_day, days) for c in ids}
+        with self._lock:
+            for calendar_id, maps in bitmaps.items():
+                fresh = {first_day + timedelta(days=d): bits for d, bits in enumerate(maps)}
+                if self._generations.get(calendar_id, 0) != generations[calendar_id]:
+                    current = self._days.get(calendar_id, {})
+                    fresh = {d: bits & current.get(d, bits) for d, bits in fresh.items()}
+                pending = self._pending.get(calendar_id, {})
+                fresh = {d: bits & ~pending.get(d, 0) for d, bits in fresh.items()}
+                self._days[calendar_id] = fresh
+            self.rebuilds += 1
+            self.built_at = self._clock()
+        return len(ids)
+
+    def _bitmaps(self, busy: Iterable[Slot], first_day: date, days: int) -> List[int]:
+        """Return one bitmap per day with every slot overlapping ``busy`` cleared."""
+        per_day = self.slots_per_day
+        total = per_day * days
+        base = _day_start(first_day).timestamp()
+        slot_seconds = self.slot_minutes * 60
+        maps = [self._full] * days
+        for start, end in busy:
+            lo = max(math.floor((start.timestamp() - base) / slot_seconds), 0)
+            hi = min(math.ceil((end.timestamp() - base) / slot_seconds), total)
+            if hi <= lo:
+                continue
+            for d in range(lo // per_day, (hi - 1) // per_day + 1):
+                first = max(lo, d * per_day) - d * per_day
+                last = min(hi, (d + 1) * per_day) - d * per_day
+                maps[d] &= ~(((1 << (last - first)) - 1) << first)
+        return maps
+
+    def stats(self) -> Dict[str, float]:
+        """Return calendar, rebuild and booking counters."""
+        with self._lock:
+            return {
+                "calendars": len(self._days),
+                "pending": sum(
+                    bin(bits).count("1")
+                    for days in self._pending.values()
+                    for bits in days.values()
+                ),
+                "rebuilds": self.rebuilds,
+                "built_at": self.built_at or 0.0,
+                "bookings": self.bookings,
+                "conflicts": self.conflicts,
+            }
@@ -0,0 +1,76 @@
+"""Microbenchmark: per-frame cost of forwarding OpenAI audio deltas to Twilio.
+
+Compares the old decode/re-encode round trip with the passthrough used by
+``main.bridge_call`` and with its optional validation mode. Reports CPU
+time and peak bytes allocated per frame.
+
+Usage::
+
+    python benchmarks/audio_passthrough.py --frame-bytes 160 --frames 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio import passthrough_payload  # noqa: E402
+
+
+def reencode(delta: str) -> str:
+    return base64.b64encode(base64.b64decode(delta)).decode("utf-8")
+
+
+def passthrough(delta: str) -> str:
+    return passthrough_payload(delta)
+
+
+def validated(delta: str) -> str:
+    return passthrough_payload(delta, validate=True)
+
+
+def measure(func, delta: str, frames: int) -> tuple[float, float]:
+    """Return (ns of CPU per frame, peak bytes allocated while forwarding one frame)."""
+    start = time.process_time_ns()
+    for _ in range(frames):
+        func(delta)
+    cpu = (time.process_time_ns() - start) / frames
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    func(delta)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated = peak - baseline
+    return cpu, allocated
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--frame-bytes", type=int, default=160, help="μ-law bytes per frame (160 = 20 ms)"
+    )
+    parser.add_argument("--frames", type=int, default=200_000)
+    args = parser.parse_args()
+
+    delta = base64.b64encode(os.urandom(args.frame_bytes)).decode()
+    print(f"{args.frame_bytes}-byte frames, {args.frames} iterations")
+    print(f"{'mode':<14}{'ns/frame':>12}{'peak bytes/frame':>20}")
+    for name, func in (
+        ("re-encode", reencode),
+        ("passthrough", passthrough),
+        ("validate", validated),
+    ):
+        cpu, allocated = measure(func, delta, args.frames)
+        print(f"{name:<14}{cpu:>12.0f}{allocated:>20.0f}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,247 @@
+"""Benchmark: availability bitmap index against the ``list_free_slots`` loop.
+
+Gives ``--calendars`` fake calendars random meetings on the half-hour grid
+over ``--days`` days, rebuilds an ``availability.AvailabilityIndex`` from
+them, then:
+
+* checks each calendar's free slots per day, and team slots in both modes,
+  against ``gcal.list_free_slots`` and ``gcal.free_slots_from_busy``;
+* checks that a booked slot conflicts, that releasing it frees it again,
+  and that rebuilds keep it busy until its event is confirmed, including
+  rebuilds whose fetch started before the booking or the confirmation;
+* times listing a day's slots, checking one slot, intersecting the team
+  and turning the chosen slot back into times, each against what the
+  service did before: a freebusy round trip (``--delay`` seconds, 0 by
+  default so only the local work is timed) and the walk over busy periods,
+  or ``strptime`` on the slot label.
+
+Exits non-zero if any check fails.
+
+Usage::
+
+    python benchmarks/availability_index.py --calendars 50 --days 7
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from fakes import FakeCalendarService
+
+import gcal
+from availability import AvailabilityIndex, make_slot_id
+
+START = datetime(2026, 3, 2, tzinfo=timezone.utc)
+SLOT_MINUTES = 30
+
+
+def make_calendars(count: int, days: int, meetings: int, rng: random.Random) -> dict:
+    calendars = {}
+    for c in range(count):
+        busy = []
+        for _ in range(rng.randint(meetings // 2, meetings * 3 // 2)):
+            begin = START + timedelta(minutes=SLOT_MINUTES * rng.randrange(days * 48))
+            length = timedelta(minutes=SLOT_MINUTES * rng.choice((1, 1, 2, 3)))
+            busy.append({"start": begin.isoformat(), "end": (begin + length).isoformat()})
+        busy.sort(key=lambda p: p["start"])
+        calendars[f"rep{c:04d}@example.com"] = busy
+    return calendars
+
+
+def per_call(func, repeat: int) -> float:
+    """Mean seconds per call of ``func`` over ``repeat`` calls."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat
+
+
+def check_slots(index: AvailabilityIndex, ids: list, days: int, failures: list) -> None:
+    for calendar_id in ids:
+        for d in range(days):
+            day_start = START + timedelta(days=d)
+            expected = gcal.list_free_slots(
+                calendar_id, day_start, day_start + timedelta(days=1), slot_minutes=SLOT_MINUTES
+            )
+            slot_ids = index.free_slot_ids([calendar_id], day_start.date())
+            got = [index.slot_bounds(s) for s in slot_ids]
+            if got != expected:
+                failures.append(f"{calendar_id} {day_start.date()}: slots differ")
+                return
+    busy = gcal.query_busy(ids, START, START + timedelta(days=days))
+    for mode in gcal.TEAM_MODES:
+        team = ids if mode == gcal.ANY_FREE else ids[:3]
+        for d in range(days):
+            day_start = START + timedelta(days=d)
+            expected = gcal.free_slots_from_busy(
+                {c: busy[c] for c in team},
+                day_start,
+                day_start + timedelta(days=1),
+                mode=mode,
+                slot_minutes=SLOT_MINUTES,
+            )
+            got = []
+            for slot_id in index.free_slot_ids(team, day_start.date(), mode):
+                slot_start, slot_end = index.slot_bounds(slot_id)
+                free = tuple(team)
+                if mode == gcal.ANY_FREE:
+                    free = tuple(index.free_calendars(team, slot_id))
+                got.append((slot_start, slot_end, free))
+            if got != expected:
+                failures.append(f"{mode} team {day_start.date()}: slots differ")
+                return
+
+
+def check_bookings(index: AvailabilityIndex, ids: list, failures: list) -> None:
+    calendar_id = ids[0]
+    day = START.date()
+    free = index.free_slot_ids([calendar_id], day)
+    if not free:
+        failures.append("no free slot to book")
+        return
+    slot_id = free[0]
+    if not index.book([calendar_id], slot_id) or index.is_free(calendar_id, slot_id):
+        failures.append("booking a free slot")
+    if index.book([calendar_id], slot_id):
+        failures.append("a slot was booked twice")
+    index.release([calendar_id], slot_id)
+    if not index.is_free(calendar_id, slot_id):
+        failures.append("a released slot stayed busy")
+
+    # The fetch starts before the booking and answers without it
+    def stale_fetch(calendar_ids, start, end):
+        busy = gcal.query_busy(calendar_ids, start, end)
+        index.book([calendar_id], slot_id)
+        return busy
+
+    index.rebuild(stale_fetch, ids, day, 1)
+    if index.is_free(calendar_id, slot_id):
+        failures.append("a rebuild resurrected a slot booked while it was fetching")
+    # Booked before the rebuild started, but the event is not created yet
+    index.rebuild(gcal.query_busy, ids, day, 1)
+    if index.is_free(calendar_id, slot_id):
+        failures.append("a rebuild freed a slot whose event was not created yet")
+
+    # The fetch starts before the event is created and answers without it
+    def fetch_then_confirm(calendar_ids, start, end):
+        busy = gcal.query_busy(calendar_ids, start, end)
+        index.confirm([calendar_id], slot_id)
+        return busy
+
+    index.rebuild(fetch_then_confirm, ids, day, 1)
+    if index.is_free(calendar_id, slot_id):
+        failures.append("a rebuild freed a slot whose event was created while it was fetching")
+    if index.stats()["pending"]:
+        failures.append("a confirmed booking is still pending")
+    # Once confirmed, freebusy data decides: here the fake never stores the event
+    index.rebuild(gcal.query_busy, ids, day, 1)
+    if not index.is_free(calendar_id, slot_id):
+        failures.append("a confirmed booking stayed busy against freebusy data")
+
+    index.book([calendar_id], slot_id)
+    index.release([calendar_id], slot_id)
+    index.rebuild(gcal.query_busy, ids, day, 1)
+    if not index.is_free(calendar_id, slot_id) or index.stats()["pending"]:
+        failures.append("a rebuild after release kept the slot busy")
+
+
+def run(count: int, days: int, meetings: int, delay: float, repeat: int) -> int:
+    failures: list[str] = []
+    rng = random.Random(25)
+    calendars = make_calendars(count, days, meetings, rng)
+    ids = list(calendars)
+    service = FakeCalendarService(calendars=calendars)
+    gcal.get_service = lambda: service
+
+    index = AvailabilityIndex(SLOT_MINUTES)
+    started = time.perf_counter()
+    index.rebuild(gcal.query_busy, ids, START.date(), days)
+    rebuild = time.perf_counter() - started
+    check_slots(index, ids, days, failures)
+    check_bookings(index, ids, failures)
+
+    busy = gcal.query_busy(ids, START, START + timedelta(days=1))
+    day = START.date()
+    day_end = START + timedelta(days=1)
+    calendar_id = ids[0]
+    slot_id = make_slot_id(day, 20)
+    slot_start, slot_end = index.slot_bounds(slot_id)
+    label = index.label(slot_id)
+    service.delay = delay
+
+    def label_slots(slots):
+        return [f"{s[0].strftime('%I:%M %p')} - {s[1].strftime('%I:%M %p')}" for s in slots]
+
+    def parse_label():
+        start_str, end_str = [s.strip() for s in label.split("-")]
+        start_dt = datetime.strptime(start_str, "%I:%M %p")
+        end_dt = datetime.strptime(end_str, "%I:%M %p")
+        return (
+            START.replace(hour=start_dt.hour, minute=start_dt.minute),
+            START.replace(hour=end_dt.hour, minute=end_dt.minute),
+        )
+
+    cases = [
+        (
+            "day slots, one calendar",
+            lambda: label_slots(gcal.list_free_slots(calendar_id, START, day_end)),
+            lambda: label_slots(gcal._walk_slots(START, day_end, busy[calendar_id], SLOT_MINUTES)),
+            lambda: [index.label(s) for s in index.free_slot_ids([calendar_id], day)],
+        ),
+        (
+            "is slot free",
+            lambda: (slot_start, slot_end) in gcal.list_free_slots(calendar_id, START, day_end),
+            lambda: (slot_start, slot_end)
+            in gcal._walk_slots(START, day_end, busy[calendar_id], SLOT_MINUTES),
+            lambda: index.is_free(calendar_id, slot_id),
+        ),
+        (
+            f"team of {count}, any free",
+            lambda: gcal.team_free_slots(ids, START, day_end),
+            lambda: gcal.free_slots_from_busy(busy, START, day_end),
+            lambda: index.free_slot_ids(ids, day, gcal.ANY_FREE),
+        ),
+        (
+            f"team of {count}, all free",
+            lambda: gcal.team_free_slots(ids, START, day_end, mode=gcal.ALL_FREE),
+            lambda: gcal.free_slots_from_busy(busy, START, day_end, mode=gcal.ALL_FREE),
+            lambda: index.free_slot_ids(ids, day, gcal.ALL_FREE),
+        ),
+        ("slot to times", None, parse_label, lambda: index.slot_bounds(slot_id)),
+    ]
+    if parse_label() != (slot_start, slot_end):
+        failures.append("slot label parses to different times")
+
+    print(
+        f"{count} calendars, {days} days, {SLOT_MINUTES} min slots, "
+        f"Google round trip {delay * 1000:.0f}ms, rebuild {rebuild * 1000:.1f}ms"
+    )
+    print(f"{'operation':<26}{'fetch+walk us':>14}{'walk us':>10}{'index us':>10}{'speedup':>9}")
+    for name, fetch, walk, indexed in cases:
+        fetch_us = per_call(fetch, max(1, repeat // 10)) * 1e6 if fetch else None
+        walk_us = per_call(walk, repeat) * 1e6
+        index_us = per_call(indexed, repeat) * 1e6
+        fetch_col = f"{fetch_us:>14.1f}" if fetch_us is not None else f"{'-':>14}"
+        print(f"{name:<26}{fetch_col}{walk_us:>10.1f}{index_us:>10.2f}{walk_us / index_us:>8.0f}x")
+
+    print("ok" if not failures else "FAILED: " + "; ".join(failures))
+    return 1 if failures else 0
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calendars", type=int, default=50)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--meetings", type=int, default=20, help="average meetings per calendar")
+    parser.add_argument("--delay", type=float, default=0.0, help="fake Google round trip (s)")
+    parser.add_argument("--repeat", type=int, default=2000, help="calls timed per operation")
+    args = parser.parse_args()
+    sys.exit(run(args.calendars, args.days, args.meetings, args.delay, args.repeat))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,296 @@
+"""Benchmark: local barge-in detection on synthesized μ-law calls.
+
+Synthesizes labelled 8 kHz μ-law calls (voiced speech bursts with a
+syllabic envelope over line noise at several SNRs, plus stretches of pure
+noise and silence) and runs ``vad.VoiceActivityDetector`` over them frame
+by frame, reporting:
+
+* detection delay from each speech burst's onset to ``SPEECH_START``;
+* false triggers, starts that fall outside any burst;
+* misses, bursts that never triggered a start;
+* the per-frame cost.
+
+It then plays the same speech back attenuated by each ``--echo-loss`` (the
+bot's own reply leaking back through the caller's line, with no caller
+speech) and counts the starts it triggers. No recorded calls ship with the
+repo; real lines are checked with ``--crec``.
+
+Recordings made with ``CALL_RECORDING_DIR`` can be passed with ``--crec``;
+they carry no labels, so only the detected speech segments are listed.
+
+``--bridge`` replays a scripted call through ``main.bridge_call`` in real
+time: the caller starts talking while the bot's reply is playing and the
+server's ``speech_started`` arrives ``--server-delay-ms`` later. It reports
+the local onset-to-clear latency and checks that only one ``clear`` was
+sent.
+
+Usage::
+
+    python benchmarks/barge_in_vad.py --calls 20 --snr 30,20,10 --echo-loss 6,12,20
+    python benchmarks/barge_in_vad.py --crec recordings/call.crec
+    python benchmarks/barge_in_vad.py --bridge --server-delay-ms 400
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakes  # noqa: E402,F401
+
+import main  # noqa: E402
+import vad  # noqa: E402
+from call_recorder import TWILIO_MEDIA, CallRecorder, Replay, read_records  # noqa: E402
+from metrics import percentiles  # noqa: E402
+
+RATE = 8000
+FRAME = 160  # 20 ms
+FRAME_SECONDS = FRAME / RATE
+
+
+def ulaw_encode(sample: float) -> int:
+    """Encode one linear sample (-32768..32767) as a μ-law byte."""
+    value = max(-32635, min(32635, int(sample)))
+    sign = 0x80 if value < 0 else 0
+    value = abs(value) + 0x84
+    exponent = 7
+    mask = 0x4000
+    while exponent and not value & mask:
+        exponent -= 1
+        mask >>= 1
+    mantissa = (value >> (exponent + 3)) & 0x0F
+    return ~(sign | (exponent << 4) | mantissa) & 0xFF
+
+
+def synthesize_call(
+    seconds: float, snr_db: float, rng: random.Random, speech_level_db: float = -18.0
+) -> tuple[list[bytes], list[tuple[int, int]]]:
+    """Return μ-law frames and the ``(start, end)`` frame index of each burst."""
+    frames_total = int(seconds / FRAME_SECONDS)
+    bursts = []
+    frame = rng.randint(25, 75)
+    while frame < frames_total - 50:
+        length = rng.randint(30, 120)
+        bursts.append((frame, frame + length))
+        frame += length + rng.randint(40, 150)
+
+    speech_amp = 32768 * 10 ** (speech_level_db / 20)
+    noise_amp = speech_amp * 10 ** (-snr_db / 20)
+    frames = []
+    burst_index = 0
+    phase = 0.0
+    for index in range(frames_total):
+        while burst_index < len(bursts) and index >= bursts[burst_index][1]:
+            burst_index += 1
+        in_burst = burst_index < len(bursts) and bursts[burst_index][0] <= index
+        pitch = 110 + 40 * rng.random()
+        out = bytearray(FRAME)
+        for n in range(FRAME):
+            sample = rng.gauss(0, noise_amp / 2)
+            if in_burst:
+                t = (index - bursts[burst_index][0]) * FRAME_SECONDS + n / RATE
+                # ~4 syllables a second
+                envelope = 0.55 + 0.45 * math.sin(2 * math.pi * 4 * t)
+                phase += 2 * math.pi * pitch / RATE
+                voiced = sum(math.sin(h * phase) / h for h in (1, 2, 3, 4, 5))
+                sample += speech_amp * envelope * voiced / 1.5
+            out[n] = ulaw_encode(sample)
+        frames.append(bytes(out))
+    return frames, bursts
+
+
+def synthesize_echo(seconds: float, echo_loss_db: float, rng: random.Random) -> list[bytes]:
+    """Return μ-law frames of a reply heard back ``echo_loss_db`` below the speech level.
+
+    The line noise stays at the level of a 30 dB SNR call.
+    """
+    frames, _ = synthesize_call(
+        seconds, 30.0 - echo_loss_db, rng, speech_level_db=-18.0 - echo_loss_db
+    )
+    return frames
+
+
+def evaluate(
+    detector: vad.VoiceActivityDetector, frames: list[bytes], bursts: list[tuple[int, int]]
+) -> tuple[list[float], int, int]:
+    """Return detection delays (s), false triggers and missed bursts."""
+    delays = []
+    false_triggers = 0
+    detected = set()
+    for index, frame in enumerate(frames):
+        if detector.process(frame, index * FRAME_SECONDS) != vad.SPEECH_START:
+            continue
+        # The start fires at the end of the current frame
+        at = (index + 1) * FRAME_SECONDS
+        for number, (start, end) in enumerate(bursts):
+            # Hangover may carry a start just past a burst's last frame
+            if start <= index < end + detector.start_frames:
+                if number not in detected:
+                    detected.add(number)
+                    delays.append(at - start * FRAME_SECONDS)
+                break
+        else:
+            false_triggers += 1
+    return delays, false_triggers, len(bursts) - len(detected)
+
+
+def show_recording(path: str, detector: vad.VoiceActivityDetector) -> None:
+    start = None
+    frames = 0
+    for record in read_records(path):
+        if record.kind != TWILIO_MEDIA:
+            continue
+        now = record.t_ns / 1e9
+        frames += 1
+        event = detector.process(record.data, now)
+        if event == vad.SPEECH_START:
+            start = detector.onset_at
+        elif event == vad.SPEECH_END and start is not None:
+            print(f"  speech {start:8.2f}s - {now:8.2f}s")
+            start = None
+    if start is not None:
+        print(f"  speech {start:8.2f}s - end")
+    print(f"{path}: {frames} inbound frames")
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self) -> int:
+        return self.now
+
+
+def write_barge_in_call(path: str, server_delay: float, rng: random.Random) -> None:
+    """Record a call where the caller talks over the bot's reply."""
+    clock = _Clock()
+    recorder = CallRecorder(path, clock=clock)
+    step = int(FRAME_SECONDS * 1e9)
+    reply, _ = synthesize_call(4.0, 20.0, rng)
+    speech, bursts = synthesize_call(4.0, 30.0, rng)
+    # The caller's first burst, starting one second into the reply
+    caller = speech[bursts[0][0] : bursts[0][1]]
+    onset = 50
+    server_at = onset + round(server_delay / FRAME_SECONDS)
+    silence = b"\xff" * FRAME
+    recorder.openai_event(json.dumps({"type": "session.created", "session": {"id": "sess_vad"}}))
+    recorder.twilio_event(
+        json.dumps({"event": "start", "start": {"streamSid": "MZvad", "callSid": "CAvad"}})
+    )
+    for index in range(len(reply)):
+        clock.now += step
+        frame = caller[index - onset] if onset <= index < onset + len(caller) else silence
+        recorder.twilio_media(base64.b64encode(frame).decode())
+        if index == server_at:
+            recorder.openai_event(json.dumps({"type": "input_audio_buffer.speech_started"}))
+        recorder.openai_audio(base64.b64encode(reply[index]).decode())
+    recorder.close()
+
+
+async def bridge_barge_in(path: str, server_delay: float) -> int:
+    async def finalize(ctx):
+        pass
+
+    async def fixed_slots(ctx=None):
+        return ["10:00 AM - 10:30 AM"]
+
+    main.finalize_call = finalize
+    main.get_todays_free_slots = fixed_slots
+    main.BARGE_IN_VAD = True
+    session = Replay.from_file(path, speed=1.0)
+    ctx = main.CallContext()
+    await main.bridge_call(session.twilio, session.openai, ctx)
+
+    clears = sum(1 for m in session.twilio.sent if '"clear"' in m)
+    cancels = sum(1 for m in session.openai.sent if '"response.cancel"' in m)
+    barge_in = ctx.trace.barge_in
+    if not barge_in.count:
+        print("no local barge-in detected")
+        return 1
+    local_ms = barge_in.percentile(50) * 1000
+    print(
+        f"local onset-to-clear={local_ms:.0f}ms server speech_started={server_delay * 1000:.0f}ms "
+        f"saved={server_delay * 1000 - local_ms:.0f}ms clears={clears} cancels={cancels}"
+    )
+    return 0 if clears == 1 and cancels == 1 else 1
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=10, help="synthetic calls per SNR")
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--snr", default="30,20,10", help="comma-separated SNRs in dB")
+    parser.add_argument(
+        "--echo-loss", default="6,12,20", help="comma-separated echo return losses in dB"
+    )
+    parser.add_argument("--energy-db", type=float, default=-35.0)
+    parser.add_argument("--zcr-max", type=float, default=0.35)
+    parser.add_argument("--start-frames", type=int, default=3)
+    parser.add_argument("--hangover-frames", type=int, default=15)
+    parser.add_argument("--crec", nargs="*", default=[], help="recordings to scan instead")
+    parser.add_argument("--bridge", action="store_true", help="replay a barge-in through the bridge")
+    parser.add_argument("--server-delay-ms", type=float, default=400.0)
+    args = parser.parse_args()
+
+    def detector():
+        return vad.VoiceActivityDetector(
+            args.energy_db, args.zcr_max, args.start_frames, args.hangover_frames
+        )
+
+    print(f"backend={vad.BACKEND}")
+    if args.bridge:
+        main.VAD_ENERGY_DB, main.VAD_ZCR_MAX = args.energy_db, args.zcr_max
+        main.VAD_START_FRAMES, main.VAD_HANGOVER_FRAMES = args.start_frames, args.hangover_frames
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "barge_in.crec")
+            write_barge_in_call(path, args.server_delay_ms / 1000, random.Random(5))
+            sys.exit(asyncio.run(bridge_barge_in(path, args.server_delay_ms / 1000)))
+    if args.crec:
+        for path in args.crec:
+            show_recording(path, detector())
+        return
+
+    rng = random.Random(11)
+    silence = [bytes([0xFF]) * FRAME] * 500
+    print(f"{'snr dB':>7}{'bursts':>8}{'missed':>8}{'false':>7}{'p50 ms':>8}{'p99 ms':>8}{'us/frame':>10}")
+    for snr in (float(s) for s in args.snr.split(",")):
+        delays, false_triggers, missed, bursts, cost, frames_seen = [], 0, 0, 0, 0.0, 0
+        for _ in range(args.calls):
+            frames, labels = synthesize_call(args.seconds, snr, rng)
+            frames = silence + frames
+            labels = [(s + len(silence), e + len(silence)) for s, e in labels]
+            started = time.perf_counter()
+            d, f, m = evaluate(detector(), frames, labels)
+            cost += time.perf_counter() - started
+            frames_seen += len(frames)
+            delays += d
+            false_triggers += f
+            missed += m
+            bursts += len(labels)
+        p = percentiles(delays) if delays else {"p50": float("nan"), "p99": float("nan")}
+        print(
+            f"{snr:>7.0f}{bursts:>8}{missed:>8}{false_triggers:>7}"
+            f"{p['p50'] * 1000:>8.0f}{p['p99'] * 1000:>8.0f}{cost / frames_seen * 1e6:>10.1f}"
+        )
+
+    print(f"\n{'echo loss dB':>12}{'seconds':>9}{'false':>7}")
+    for loss in (float(s) for s in args.echo_loss.split(",")):
+        false_triggers = 0
+        for _ in range(args.calls):
+            frames = silence + synthesize_echo(args.seconds, loss, rng)
+            false_triggers += evaluate(detector(), frames, [])[1]
+        print(f"{loss:>12.0f}{args.calls * args.seconds:>9.0f}{false_triggers:>7}")
+
+
+if __name__ == "__main__":
+    main_cli()
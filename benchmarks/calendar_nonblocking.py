@@ -0,0 +1,87 @@
+"""Show that audio keeps flowing while a slow calendar call is in flight.
+
+Streams one fake call through ``main.bridge_call`` while a fake Calendar
+service takes ``--delay`` seconds per request. Ten concurrent freebusy
+lookups are issued mid-call through ``main.CALENDAR``; they should coalesce
+into a single request and the gap between echoed audio frames should stay
+near the 20 ms frame interval. For comparison the same run is repeated with
+the lookup executed inline on the event loop, as the handlers used to do.
+
+Usage::
+
+    python benchmarks/calendar_nonblocking.py --delay 0.5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timezone
+
+from fakes import FRAME_SECONDS, FakeCalendarService, FakeOpenAISocket, FakeTwilioSocket
+
+import structlog
+
+import gcal
+import main
+
+
+async def _discard(ctx):
+    pass
+
+
+async def run(delay: float, frames: int, inline: bool) -> tuple[float, int]:
+    service = FakeCalendarService(delay=delay)
+    gcal.get_service = lambda: service
+    main.CALENDAR_ID = "primary"
+    # Session updates are served from the cache so only the mid-call
+    # lookups reach the slow service.
+    today = datetime.now(timezone.utc).date()
+    gcal.SLOT_CACHE.put("primary", today, [])
+
+    twilio_ws = FakeTwilioSocket("CAcal", frames)
+    openai_ws = FakeOpenAISocket()
+    bridge = asyncio.create_task(
+        main.bridge_call(twilio_ws, openai_ws, main.CallContext())
+    )
+
+    await asyncio.sleep(frames * FRAME_SECONDS / 4)
+    start, end = gcal._day_bounds(today)
+    if inline:
+        gcal.list_free_slots("primary", start, end)
+    else:
+        await asyncio.gather(
+            *(main.CALENDAR.list_free_slots("primary", start, end) for _ in range(10))
+        )
+    await bridge
+
+    stamps = [
+        t for m, t in zip(twilio_ws.sent, twilio_ws.sent_at) if m.get("event") == "media"
+    ]
+    max_gap = max(b - a for a, b in zip(stamps, stamps[1:]))
+    return max_gap, service.freebusy_calls
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delay", type=float, default=0.5)
+    parser.add_argument("--frames", type=int, default=100)
+    args = parser.parse_args()
+    structlog.configure(logger_factory=structlog.ReturnLoggerFactory())
+    main.finalize_call = _discard
+
+    blocking_gap, _ = asyncio.run(run(args.delay, args.frames, inline=True))
+    gap, queries = asyncio.run(run(args.delay, args.frames, inline=False))
+    main.CALENDAR.shutdown()
+
+    print(f"calendar delay={args.delay * 1000:.0f}ms frame interval={FRAME_SECONDS * 1000:.0f}ms")
+    print(f"inline lookup:   max audio gap={blocking_gap * 1000:.0f}ms")
+    print(f"async facade:    max audio gap={gap * 1000:.0f}ms")
+    print(f"10 concurrent lookups -> {queries} freebusy request(s)")
+    ok = gap < args.delay / 2 and queries == 1
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main_cli()
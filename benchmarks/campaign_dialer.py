@@ -0,0 +1,215 @@
+"""Simulated-clock test of the campaign dialer.
+
+Runs ``campaign.Dialer`` against a fake Twilio endpoint on a simulated
+clock, so a campaign of thousands of numbers that would take hours
+finishes in seconds. The fake answers most calls, keeps them live for a
+random talk time and then reports ``completed``; some numbers are busy on
+their first attempts, some never answer, some fail, and a few status
+callbacks are lost. The script checks that:
+
+* no one-second window holds more dials than ``--cps`` allows;
+* live calls never exceed ``--max-live``;
+* busy and unanswered numbers are retried up to ``--max-attempts``;
+* every number ends completed or failed, with lost callbacks settled;
+
+and prints progress as the campaign runs. It also parses a CSV and a JSON
+campaign body. Exits non-zero on any failure.
+
+Usage::
+
+    python benchmarks/campaign_dialer.py --numbers 2000 --cps 5 --max-live 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import sys
+import time
+
+import structlog
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from campaign import COMPLETED, FAILED, Dialer, parse_numbers  # noqa: E402
+
+
+class SimClock:
+    """Discrete-event clock: sleeping jumps to the next due event."""
+
+    def __init__(self):
+        self.now = 0.0
+        self._events: list = []
+        self._seq = itertools.count()
+
+    def __call__(self) -> float:
+        return self.now
+
+    def at(self, when: float, action) -> None:
+        heapq.heappush(self._events, (when, next(self._seq), action))
+
+    async def sleep(self, seconds: float) -> None:
+        target = self.now + max(seconds, 0.0)
+        while self._events and self._events[0][0] <= target:
+            when, _, action = heapq.heappop(self._events)
+            self.now = max(self.now, when)
+            action()
+        self.now = target
+        # Let dial tasks started by the dialer run
+        await asyncio.sleep(0)
+
+
+class FakeTwilio:
+    """Outbound calls whose outcome depends on the number dialed."""
+
+    def __init__(self, clock: SimClock, rng: random.Random):
+        self.clock = clock
+        self.rng = rng
+        self.dialer: Dialer | None = None
+        self.live: set[str] = set()
+        self.dials: list[float] = []
+        self.attempts: dict[str, int] = {}
+        self.max_live = 0
+        self.lost_callbacks = 0
+        self._sids = itertools.count()
+
+    async def create_call(self, to: str) -> str:
+        sid = f"CA{next(self._sids):032d}"
+        now = self.clock()
+        self.dials.append(now)
+        attempt = self.attempts[to] = self.attempts.get(to, 0) + 1
+        kind = int(to[-1])
+        if kind == 1 and attempt < 3:
+            self.clock.at(now + 4, lambda: self.callback(sid, "busy"))
+        elif kind == 2:
+            self.clock.at(now + 30, lambda: self.callback(sid, "no-answer"))
+        elif kind == 3:
+            self.clock.at(now + 1, lambda: self.callback(sid, "failed"))
+        else:
+            talk = self.rng.uniform(20, 180)
+            self.clock.at(now + self.rng.uniform(3, 10), lambda: self.answer(sid))
+            # Every 50th number's status callback never arrives
+            lost = int(to[-3:-1]) % 50 == 0
+            self.clock.at(now + 10 + talk, lambda: self.hangup(sid, lost))
+        return sid
+
+    def answer(self, sid: str) -> None:
+        self.live.add(sid)
+        self.max_live = max(self.max_live, self.dialer.live())
+
+    def hangup(self, sid: str, lost: bool) -> None:
+        self.live.discard(sid)
+        if lost:
+            self.lost_callbacks += 1
+        else:
+            self.callback(sid, "completed")
+
+    def callback(self, sid: str, status: str) -> None:
+        self.dialer.call_status(sid, status)
+
+
+def check_parsing() -> list[str]:
+    failures = []
+    csv_body = "name,phone\nAda,+15550000001\nBob,+15550000002\nAda,+15550000001\n"
+    if parse_numbers(csv_body, "text/csv") != ["+15550000001", "+15550000002"]:
+        failures.append("CSV with a phone column")
+    if parse_numbers("+15550000001\n+15550000002\n") != ["+15550000001", "+15550000002"]:
+        failures.append("CSV without a header")
+    json_body = '[{"to": "+15550000001"}, "+15550000002", {"name": "x"}]'
+    if parse_numbers(json_body, "application/json") != ["+15550000001", "+15550000002"]:
+        failures.append("JSON list")
+    if parse_numbers('{"numbers": ["+15550000003"]}') != ["+15550000003"]:
+        failures.append("JSON object")
+    return failures
+
+
+async def run(numbers: int, cps: float, max_live: int, max_attempts: int) -> int:
+    rng = random.Random(21)
+    clock = SimClock()
+    twilio = FakeTwilio(clock, rng)
+    dialer = Dialer(
+        twilio.create_call,
+        twilio.live,
+        cps=cps,
+        max_live=max_live,
+        max_attempts=max_attempts,
+        retry_delay=60.0,
+        ring_timeout=90.0,
+        clock=clock,
+        sleep=clock.sleep,
+    )
+    twilio.dialer = dialer
+    # The last digit picks the outcome: 1 busy twice, 2 no answer, 3 failed
+    kinds = [0] * 16 + [1, 1, 2, 3]
+    campaign = dialer.submit([f"+1555{i:06d}{rng.choice(kinds)}" for i in range(numbers)])
+
+    started = time.perf_counter()
+    task = asyncio.ensure_future(dialer.run())
+    next_report = 0.0
+    while not campaign.done:
+        await asyncio.sleep(0)
+        if clock() >= next_report:
+            p = campaign.progress()
+            print(
+                f"t={clock() / 60:6.1f}min pending={p['pending']:>5} dialing={p['dialing']:>4} "
+                f"completed={p['completed']:>5} failed={p['failed']:>4} retries={p['retries']:>4}"
+            )
+            next_report += 600
+    task.cancel()
+    wall = time.perf_counter() - started
+
+    failures = check_parsing()
+    dials = twilio.dials
+    window = 0
+    start = 0
+    for end, at in enumerate(dials):
+        while at - dials[start] >= 1.0:
+            start += 1
+        window = max(window, end - start + 1)
+    if window > max(cps, 1.0) + 1:
+        failures.append(f"{window} dials within one second")
+    if twilio.max_live > max_live:
+        failures.append(f"{twilio.max_live} live calls")
+    targets = campaign.targets
+    if any(t.status not in (COMPLETED, FAILED) for t in targets):
+        failures.append("numbers left unfinished")
+    if any(t.attempts > max_attempts for t in targets):
+        failures.append("too many attempts")
+    busy = [t for t in targets if t.to.endswith("1")]
+    if busy and any(t.attempts != min(3, max_attempts) for t in busy):
+        failures.append("busy numbers were not retried")
+    unanswered = [t for t in targets if t.to.endswith("2")]
+    if any(t.status != FAILED or t.attempts != max_attempts for t in unanswered):
+        failures.append("unanswered numbers were not retried to the limit")
+
+    p = campaign.progress()
+    ideal = len(dials) / cps
+    print(
+        f"numbers={numbers} dials={len(dials)} simulated={clock() / 60:.1f}min "
+        f"(dialing at cps alone: {ideal / 60:.1f}min) wall={wall:.2f}s"
+    )
+    print(
+        f"max dials/s={window} max live={twilio.max_live}/{max_live} "
+        f"lost callbacks={twilio.lost_callbacks} results={p['results']}"
+    )
+    print("ok" if not failures else "FAILED: " + "; ".join(failures))
+    return 1 if failures else 0
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--numbers", type=int, default=2000)
+    parser.add_argument("--cps", type=float, default=5.0)
+    parser.add_argument("--max-live", type=int, default=50)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    args = parser.parse_args()
+    structlog.configure(logger_factory=structlog.ReturnLoggerFactory())
+    sys.exit(asyncio.run(run(args.numbers, args.cps, args.max_live, args.max_attempts)))
+
+
+if __name__ == "__main__":
+    main_cli()
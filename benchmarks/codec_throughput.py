@@ -0,0 +1,134 @@
+"""Benchmark suite: audio frames per second per core for each WebSocket leg.
+
+Compares the stdlib ``json`` round trip the bridge used to do for every
+frame with the template/peek fast path in ``codec``.
+
+Usage::
+
+    python benchmarks/codec_throughput.py --seconds 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec  # noqa: E402
+
+STREAM_SID = "MZ00000000000000000000000000000000"
+
+
+def twilio_media_message(frame_bytes: int) -> str:
+    return json.dumps(
+        {
+            "event": "media",
+            "sequenceNumber": "42",
+            "media": {
+                "track": "inbound",
+                "chunk": "41",
+                "timestamp": "820",
+                "payload": base64.b64encode(os.urandom(frame_bytes)).decode(),
+            },
+            "streamSid": STREAM_SID,
+        }
+    )
+
+
+def openai_delta_message(delta_bytes: int) -> str:
+    return json.dumps(
+        {
+            "type": "response.audio.delta",
+            "event_id": "event_AAAAAAAAAAAAAAAAAAAA",
+            "response_id": "resp_AAAAAAAAAAAAAAAAAAAA",
+            "item_id": "item_AAAAAAAAAAAAAAAAAAAA",
+            "output_index": 0,
+            "content_index": 0,
+            "delta": base64.b64encode(os.urandom(delta_bytes)).decode(),
+        }
+    )
+
+
+def inbound_json(message: str) -> str:
+    data = json.loads(message)
+    if data["event"] == "media":
+        return json.dumps(
+            {"type": "input_audio_buffer.append", "audio": data["media"]["payload"]}
+        )
+    return ""
+
+
+def inbound_codec(message: str) -> str:
+    if codec.peek_event(message) == "media":
+        return codec.audio_append_frame(codec.peek_string(message, "payload"))
+    return ""
+
+
+def outbound_json(message: str) -> str:
+    response = json.loads(message)
+    if response["type"] == "response.audio.delta":
+        return json.dumps(
+            {
+                "event": "media",
+                "streamSid": STREAM_SID,
+                "media": {"payload": response["delta"]},
+            }
+        )
+    return ""
+
+
+def outbound_codec(message: str) -> str:
+    if codec.peek_type(message) == "response.audio.delta":
+        return codec.twilio_media_frame(STREAM_SID, codec.peek_string(message, "delta"))
+    return ""
+
+
+def frames_per_second(func, message: str, seconds: float) -> float:
+    """Run ``func`` for about ``seconds`` of CPU time and return its rate."""
+    batch = 1000
+    count = 0
+    start = time.process_time()
+    while True:
+        for _ in range(batch):
+            func(message)
+        count += batch
+        elapsed = time.process_time() - start
+        if elapsed >= seconds:
+            return count / elapsed
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0)
+    parser.add_argument("--frame-bytes", type=int, default=160)
+    parser.add_argument("--delta-bytes", type=int, default=800)
+    args = parser.parse_args()
+
+    inbound = twilio_media_message(args.frame_bytes)
+    outbound = openai_delta_message(args.delta_bytes)
+    assert json.loads(inbound_codec(inbound)) == json.loads(inbound_json(inbound))
+    assert json.loads(outbound_codec(outbound)) == json.loads(outbound_json(outbound))
+
+    print(f"codec backend: {codec.BACKEND}")
+    print(f"{'leg':<22}{'json frames/s':>16}{'codec frames/s':>16}{'speedup':>10}")
+    codec_rates = []
+    for leg, message, old, new in (
+        ("Twilio -> OpenAI", inbound, inbound_json, inbound_codec),
+        ("OpenAI -> Twilio", outbound, outbound_json, outbound_codec),
+    ):
+        before = frames_per_second(old, message, args.seconds)
+        after = frames_per_second(new, message, args.seconds)
+        codec_rates.append(after)
+        print(f"{leg:<22}{before:>16,.0f}{after:>16,.0f}{after / before:>9.1f}x")
+
+    # Each call carries 50 frames/s in each direction
+    seconds_per_call = sum(50 / rate for rate in codec_rates)
+    print(f"codec-only ceiling: {1 / seconds_per_call:,.0f} calls per core")
+
+if __name__ == "__main__":
+    main_cli()
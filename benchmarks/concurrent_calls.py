@@ -0,0 +1,94 @@
+"""Load test: bridge N concurrent calls on one event loop.
+
+Drives ``main.bridge_call`` with in-process fake Twilio and OpenAI sockets.
+Each fake OpenAI peer echoes the caller's audio back as
+``response.audio.delta`` events and reports a per-call session ID, so any
+crosstalk between calls shows up as audio or state landing on the wrong call.
+
+Usage::
+
+    python benchmarks/concurrent_calls.py --calls 50 --frames 250
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import sys
+import time
+
+from fakes import FRAME_SECONDS, FakeOpenAISocket, FakeTwilioSocket
+
+import structlog
+
+import main
+
+
+async def _fixed_slots(ctx=None):
+    return ["10:00 AM - 10:30 AM"]
+
+
+async def run(calls: int, frames: int, pace: float) -> int:
+    finished: dict[str, main.CallContext] = {}
+    main.get_todays_free_slots = _fixed_slots
+
+    async def finalize(ctx):
+        finished[ctx.call_id] = ctx
+
+    main.finalize_call = finalize
+
+    peers = []
+    for i in range(calls):
+        sid = f"CA{i:05d}"
+        twilio_ws = FakeTwilioSocket(sid, frames, pace)
+        openai_ws = FakeOpenAISocket()
+        # Tag each call's session so mixed-up contexts are detectable
+        openai_ws.emit({"type": "session.created", "session": {"id": f"sess_{sid}"}})
+        peers.append((twilio_ws, openai_ws))
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(main.bridge_call(t, o, main.CallContext()) for t, o in peers)
+    )
+    elapsed = time.perf_counter() - started
+
+    errors = 0
+    for twilio_ws, _ in peers:
+        sid = twilio_ws.call_sid
+        media = twilio_ws.media()
+        foreign = [m for m in media if m["streamSid"] != f"MZ{sid}"]
+        # Compare the audio, not the messages, which INBOUND_COALESCE_MS may merge
+        echoed = b"".join(base64.b64decode(m["media"]["payload"]) for m in media)
+        expected = b"".join(base64.b64decode(twilio_ws.payload(seq)) for seq in range(frames))
+        ctx = finished.get(sid)
+        if foreign or ctx is None or ctx.session_id != f"sess_{sid}":
+            errors += 1
+        if echoed != expected:
+            errors += 1
+
+    audio_seconds = calls * frames * FRAME_SECONDS
+    print(f"calls={calls} frames/call={frames} elapsed={elapsed:.2f}s")
+    print(f"bridged audio={audio_seconds:.1f}s ({audio_seconds / elapsed:.1f}x realtime)")
+    print(f"active after run={len(main.CALLS)} calls with crosstalk or loss={errors}")
+    return errors
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--frames", type=int, default=250)
+    parser.add_argument(
+        "--pace",
+        type=float,
+        default=FRAME_SECONDS,
+        help="seconds between inbound frames (0 for as fast as possible)",
+    )
+    args = parser.parse_args()
+    structlog.configure(logger_factory=structlog.ReturnLoggerFactory())
+    errors = asyncio.run(run(args.calls, args.frames, args.pace))
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,364 @@
+"""In-process stand-ins for Twilio, OpenAI and Google used by the benchmarks.
+
+Importing this module sets dummy credentials so ``main`` can be imported
+without a ``.env`` file and points ``DATABASE_URL`` at a throwaway SQLite file.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("TWILIO_ACCOUNT_SID", "ACtest")
+os.environ.setdefault("TWILIO_AUTH_TOKEN", "test")
+os.environ.setdefault("TWILIO_PHONE_NUMBER", "+15550000000")
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'calls.db')}"
+)
+
+import websockets  # noqa: E402
+from fastapi.websockets import WebSocketDisconnect  # noqa: E402
+
+FRAME_SECONDS = 0.02
+# One 20 ms frame of 8 kHz μ-law audio
+FRAME_BYTES = 160
+
+logging.getLogger("websockets").setLevel(logging.WARNING)
+
+
+class FakeTwilioSocket:
+    """Plays a scripted media stream and records what the bridge sends back."""
+
+    def __init__(self, call_sid: str, frames: int, pace: float = FRAME_SECONDS):
+        self.call_sid = call_sid
+        self.frames = frames
+        self.pace = pace
+        self.sent: list[dict] = []
+        self.sent_at: list[float] = []
+
+    def payload(self, seq: int) -> str:
+        return base64.b64encode(f"{self.call_sid}:{seq}".encode()).decode()
+
+    async def iter_text(self):
+        yield json.dumps(
+            {
+                "event": "start",
+                "start": {"streamSid": f"MZ{self.call_sid}", "callSid": self.call_sid},
+            }
+        )
+        started = time.perf_counter()
+        for seq in range(self.frames):
+            yield json.dumps({"event": "media", "media": {"payload": self.payload(seq)}})
+            # Absolute schedule, like Twilio's, so sleep overshoot does not add up
+            due = started + (seq + 1) * self.pace
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        # Let the echoed audio drain before the caller hangs up
+        await asyncio.sleep(0.05)
+        raise WebSocketDisconnect()
+
+    async def send_text(self, data: str) -> None:
+        self.sent.append(json.loads(data))
+        self.sent_at.append(time.perf_counter())
+
+    async def send_json(self, data: dict) -> None:
+        self.sent.append(data)
+        self.sent_at.append(time.perf_counter())
+
+    async def close(self) -> None:
+        pass
+
+    def media(self) -> list[dict]:
+        return [m for m in self.sent if m.get("event") == "media"]
+
+
+class FakeOpenAISocket:
+    """Echoes ``input_audio_buffer.append`` frames back as audio deltas."""
+
+    def __init__(self):
+        self.open = True
+        self.received: list[dict] = []
+        self._events: asyncio.Queue = asyncio.Queue()
+
+    def emit(self, event: dict) -> None:
+        self._events.put_nowait(json.dumps(event))
+
+    async def send(self, message: str) -> None:
+        event = json.loads(message)
+        self.received.append(event)
+        if event["type"] == "input_audio_buffer.append":
+            self.emit({"type": "response.audio.delta", "delta": event["audio"]})
+
+    async def close(self) -> None:
+        if self.open:
+            self.open = False
+            await self._events.put(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        if not self.open and self._events.empty():
+            raise StopAsyncIteration
+        message = await self._events.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+
+class FakeRealtimeServer:
+    """Local stand-in for the OpenAI Realtime WebSocket endpoint.
+
+    ``handshake_delay`` stalls the opening handshake (TLS and routing on the
+    real service) and ``session_delay`` stalls ``session.created``. Audio
+    appended by the client is echoed back as ``response.audio.delta``.
+    """
+
+    def __init__(self, handshake_delay: float = 0.0, session_delay: float = 0.0):
+        self.handshake_delay = handshake_delay
+        self.session_delay = session_delay
+        self.connections = 0
+        self.session_updates = 0
+        self.appends = 0
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        port = self._server.sockets[0].getsockname()[1]
+        return f"ws://127.0.0.1:{port}/v1/realtime"
+
+    async def start(self) -> "FakeRealtimeServer":
+        self._server = await websockets.serve(
+            self._handle, "127.0.0.1", 0, process_request=self._delay_handshake
+        )
+        return self
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _delay_handshake(self, path, headers):
+        await asyncio.sleep(self.handshake_delay)
+        return None
+
+    async def _handle(self, ws, path=None):
+        self.connections += 1
+        session_id = f"sess_{self.connections}"
+        try:
+            await asyncio.sleep(self.session_delay)
+            await ws.send(
+                json.dumps({"type": "session.created", "session": {"id": session_id}})
+            )
+            async for message in ws:
+                event = json.loads(message)
+                if event["type"] == "session.update":
+                    self.session_updates += 1
+                    await ws.send(
+                        json.dumps({"type": "session.updated", "session": event["session"]})
+                    )
+                elif event["type"] == "input_audio_buffer.append":
+                    self.appends += 1
+                    await ws.send(
+                        json.dumps({"type": "response.audio.delta", "delta": event["audio"]})
+                    )
+        except websockets.ConnectionClosed:
+            pass
+
+
+class FakeCalendarService:
+    """Minimal googleapiclient Calendar service with a configurable delay.
+
+    ``calendars`` maps calendar IDs to their own busy periods; other IDs get
+    ``busy``. IDs in ``missing`` are answered with a ``notFound`` error.
+    """
+
+    def __init__(
+        self,
+        delay: float = 0.0,
+        busy: list[dict] | None = None,
+        calendars: dict[str, list[dict]] | None = None,
+        missing: set[str] | None = None,
+    ):
+        self.delay = delay
+        self.busy = busy or []
+        self.calendars = calendars or {}
+        self.missing = missing or set()
+        self.freebusy_calls = 0
+        self.max_items = 0
+        self.inserts = 0
+        self._lock = threading.Lock()
+
+    def freebusy(self):
+        return self
+
+    def events(self):
+        return self
+
+    def query(self, body):
+        return _Request(self._freebusy, body)
+
+    def insert(self, calendarId, body):
+        return _Request(self._insert, body)
+
+    def _freebusy(self, body):
+        with self._lock:
+            self.freebusy_calls += 1
+            self.max_items = max(self.max_items, len(body["items"]))
+        time.sleep(self.delay)
+        calendars = {}
+        for item in body["items"]:
+            if item["id"] in self.missing:
+                calendars[item["id"]] = {"errors": [{"domain": "global", "reason": "notFound"}]}
+            else:
+                calendars[item["id"]] = {"busy": self.calendars.get(item["id"], self.busy)}
+        return {"calendars": calendars}
+
+    def _insert(self, body):
+        self.inserts += 1
+        time.sleep(self.delay)
+        return {"id": f"evt{self.inserts}", **body}
+
+
+class _Request:
+    def __init__(self, func, body):
+        self._func = func
+        self._body = body
+
+    def execute(self):
+        return self._func(self._body)
+
+
+class ScriptedRealtimeServer(FakeRealtimeServer):
+    """Fake OpenAI Realtime endpoint that plays scripted conversation turns.
+
+    Each turn waits for ``speech_frames`` appended caller frames, emitting
+    ``speech_started`` after the first few and ``speech_stopped`` plus the
+    user's ``conversation.item.created`` at the end. It then streams
+    ``reply_frames`` audio deltas at ``reply_pace`` and finishes with the
+    assistant's ``conversation.item.created``, whose content walks the call
+    flow's intents. The next turn starts with the next caller frame.
+
+    Audio is tagged with 8-byte markers so the harness can match frames end
+    to end; coalesced appends are split back into :data:`FRAME_BYTES`
+    frames. :attr:`received` maps caller frame markers to their arrival time
+    and :attr:`sent` maps reply frame markers to their send time.
+    :attr:`turn_starts` maps the first reply marker of each turn to the time
+    ``speech_stopped`` was sent, for time-to-first-audio.
+    """
+
+    INTENTS = ("greeting", "ask_date")
+
+    def __init__(
+        self,
+        *,
+        speech_frames: int = 50,
+        reply_frames: int = 50,
+        reply_pace: float = FRAME_SECONDS,
+        handshake_delay: float = 0.0,
+        session_delay: float = 0.0,
+    ):
+        super().__init__(handshake_delay, session_delay)
+        self.speech_frames = speech_frames
+        self.reply_frames = reply_frames
+        self.reply_pace = reply_pace
+        self.received: dict[bytes, float] = {}
+        self.sent: dict[bytes, float] = {}
+        self.turn_starts: dict[bytes, float] = {}
+        self.turns = 0
+
+    @staticmethod
+    def reply_marker(connection: int, seq: int) -> bytes:
+        return struct.pack(">II", connection | 0x80000000, seq)
+
+    async def _handle(self, ws, path=None):
+        self.connections += 1
+        connection = self.connections
+        heard = 0
+        replying: asyncio.Task | None = None
+        reply_seq = 0
+
+        async def reply(turn: int) -> None:
+            nonlocal reply_seq
+            silence = b"\xff" * 152
+            start = time.perf_counter()
+            for i in range(self.reply_frames):
+                marker = self.reply_marker(connection, reply_seq)
+                reply_seq += 1
+                delta = base64.b64encode(marker + silence).decode()
+                self.sent[marker] = time.perf_counter()
+                try:
+                    await ws.send(json.dumps({"type": "response.audio.delta", "delta": delta}))
+                except websockets.ConnectionClosed:
+                    del self.sent[marker]
+                    return
+                # Absolute schedule so slow sends do not stretch the reply
+                due = start + (i + 1) * self.reply_pace
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            intent = self.INTENTS[min(turn, len(self.INTENTS) - 1)]
+            item = {
+                "type": "conversation.item.created",
+                "role": "assistant",
+                "content": json.dumps({"intent": intent, "text": "Sure."}),
+            }
+            try:
+                await ws.send(json.dumps(item))
+            except websockets.ConnectionClosed:
+                pass
+
+        try:
+            await asyncio.sleep(self.session_delay)
+            await ws.send(
+                json.dumps({"type": "session.created", "session": {"id": f"sess_{connection}"}})
+            )
+            turn = 0
+            async for message in ws:
+                now = time.perf_counter()
+                event = json.loads(message)
+                if event["type"] == "session.update":
+                    self.session_updates += 1
+                    await ws.send(json.dumps({"type": "session.updated", "session": event["session"]}))
+                    continue
+                if event["type"] != "input_audio_buffer.append":
+                    continue
+                self.appends += 1
+                # With INBOUND_COALESCE_MS one append carries several frames
+                audio = base64.b64decode(event["audio"])
+                frames = [audio[i : i + FRAME_BYTES] for i in range(0, len(audio), FRAME_BYTES)]
+                for frame in frames:
+                    self.received[frame[:8]] = now
+                for _ in frames:
+                    if replying is not None and not replying.done():
+                        break
+                    heard += 1
+                    if heard == 3:
+                        await ws.send(json.dumps({"type": "input_audio_buffer.speech_started"}))
+                    elif heard == self.speech_frames:
+                        heard = 0
+                        self.turns += 1
+                        await ws.send(json.dumps({"type": "input_audio_buffer.speech_stopped"}))
+                        self.turn_starts[self.reply_marker(connection, reply_seq)] = (
+                            time.perf_counter()
+                        )
+                        await ws.send(
+                            json.dumps(
+                                {"type": "conversation.item.created", "item": {"role": "user"}}
+                            )
+                        )
+                        replying = asyncio.create_task(reply(turn))
+                        turn += 1
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if replying is not None:
+                replying.cancel()
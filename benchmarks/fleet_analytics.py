@@ -0,0 +1,209 @@
+"""Benchmark: fleet analytics over many call records.
+
+Writes ``--calls`` synthetic call records spread over ``--days`` days with
+``metrics.append_call_records``. Then:
+
+* builds ``analytics.FleetAnalytics`` state from scratch;
+* appends one more day of calls plus a partial line, reloads the saved
+  state and updates it incrementally, then completes the partial line;
+* rebuilds from scratch in a second state directory and compares the
+  per-day statistics with the incremental ones;
+* times the vectorized grouped statistics against the pure-Python
+  fallback and checks them against ``metrics.percentiles`` per day.
+
+Exits non-zero if any check fails.
+
+Usage::
+
+    python benchmarks/fleet_analytics.py --calls 100000 --days 60
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from array import array
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics  # noqa: E402
+from analytics import (  # noqa: E402
+    BACKEND,
+    LATENCY_COLUMNS,
+    CallColumns,
+    FleetAnalytics,
+    day_stats,
+)
+from metrics import CALL_RECORDS_FILE, append_call_records, percentiles  # noqa: E402
+
+EPOCH = datetime(2026, 1, 1)
+
+
+def make_records(count: int, first_day: int, days: int, rng: random.Random) -> list[dict]:
+    records = []
+    for i in range(count):
+        day = first_day + rng.randrange(days)
+        start = EPOCH + timedelta(days=day, seconds=rng.randrange(86400))
+        turns = rng.choice((0, 3, 5, 8, 12))
+        items = turns * 2 + rng.randint(0, 3)
+        record = {
+            "call_id": f"CA{first_day:04d}{i:028x}",
+            "start": start.isoformat(),
+            "items": items,
+            "turns": turns,
+            "duration": rng.lognormvariate(4.5, 0.8),
+            "avg_latency": rng.lognormvariate(-0.7, 0.4),
+            "guardrail_rejects": 1 if rng.random() < 0.03 else 0,
+            "calendar_errors": rng.choice((1, 2)) if rng.random() < 0.02 else 0,
+            "setup_latency": rng.uniform(0.05, 0.6),
+        }
+        if rng.random() < 0.95:
+            record["first_audio"] = rng.lognormvariate(-0.5, 0.3)
+        records.append(record)
+    return records
+
+
+def expected_day_stats(records: list[dict]) -> dict:
+    """Per-day statistics computed directly from the records."""
+    by_day: dict[str, list[dict]] = {}
+    for record in records:
+        by_day.setdefault(record["start"][:10], []).append(record)
+    result = {}
+    for day, rows in by_day.items():
+        # Latency columns are stored in single precision
+        latency = {
+            "turn_latency": [r["avg_latency"] for r in rows if r["turns"]],
+            "first_audio": [r["first_audio"] for r in rows if "first_audio" in r],
+            "setup_latency": [r["setup_latency"] for r in rows],
+        }
+        entry = {"calls": len(rows)}
+        for name, value in percentiles([r["duration"] for r in rows]).items():
+            entry[f"duration_{name}"] = value
+        for name, values in latency.items():
+            rounded = array("f", values).tolist()
+            for q, value in percentiles(rounded).items():
+                entry[f"{name}_{q}"] = value if values else None
+        items = sum(r["items"] for r in rows)
+        entry["guardrail_reject_rate"] = sum(r["guardrail_rejects"] for r in rows) / items
+        entry["calendar_error_rate"] = sum(1 for r in rows if r["calendar_errors"]) / len(rows)
+        result[day] = entry
+    return result
+
+
+def compare(label: str, actual: dict, expected: dict, failures: list[str]) -> None:
+    if sorted(actual) != sorted(expected):
+        failures.append(f"{label}: days differ")
+        return
+    for day, entry in expected.items():
+        for key, value in entry.items():
+            got = actual[day][key]
+            if value is None or got is None:
+                ok = value is got
+            elif isinstance(value, list):
+                ok = value == got
+            else:
+                ok = math.isclose(got, value, rel_tol=1e-9, abs_tol=1e-12)
+            if not ok:
+                failures.append(f"{label}: {day} {key} {got!r} != {value!r}")
+                return
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def run(calls: int, days: int) -> int:
+    rng = random.Random(23)
+    failures: list[str] = []
+    with tempfile.TemporaryDirectory() as reports:
+        records = make_records(calls, 0, days, rng)
+        append_call_records(records, reports)
+        size = os.path.getsize(os.path.join(reports, CALL_RECORDS_FILE))
+        print(f"{calls} calls over {days} days, {size / 1e6:.1f} MB of records, backend={BACKEND}")
+
+        fleet = FleetAnalytics(reports)
+        update, build = timed(fleet.update)
+        print(
+            f"full build:         {build:7.3f}s  {update['calls']} calls, {update['days']} days, "
+            f"{fleet.columns.nbytes() / 1e6:.1f} MB of columns"
+        )
+        if update["calls"] != calls:
+            failures.append("full build missed calls")
+
+        new_day = make_records(max(1, calls // days), days, 1, rng)
+        partial = make_records(1, days, 1, rng)
+        append_call_records(new_day + partial, reports)
+        path = os.path.join(reports, CALL_RECORDS_FILE)
+        with open(path, "rb+") as f:
+            # Leave the last record half written
+            f.truncate(os.path.getsize(path) - 40)
+        loaded, load = timed(FleetAnalytics, reports)
+        update, incremental = timed(loaded.update)
+        print(
+            f"daily update:       {incremental:7.3f}s  {update['calls']} new calls, "
+            f"{update['days']} day recomputed (state load {load:.3f}s)"
+        )
+        if update["calls"] != len(new_day) or update["days"] != 1:
+            failures.append(f"incremental update ingested {update}")
+        with open(path, "ab") as f:
+            f.write(b"\n")
+        append_call_records(partial, reports)
+        update = FleetAnalytics(reports).update()
+        # The truncated line is skipped; the rewritten record is ingested
+        if update["calls"] != 1:
+            failures.append(f"completing the partial line ingested {update}")
+
+        full = FleetAnalytics(reports, os.path.join(reports, "rebuild"))
+        full.update()
+        incremental_days = FleetAnalytics(reports).days
+        if incremental_days != full.days:
+            failures.append("incremental statistics differ from a rebuild")
+
+        expected = expected_day_stats(records + new_day + partial)
+        compare(BACKEND, full.days, expected, failures)
+
+        columns: CallColumns = full.columns
+        vectorized, vector_time = timed(day_stats, columns)
+        numpy_module = analytics.np
+        analytics.np = None
+        try:
+            python, python_time = timed(day_stats, columns)
+        finally:
+            analytics.np = numpy_module
+        compare("python", python, expected, failures)
+        compare("vectorized vs python", vectorized, python, failures)
+        print(
+            f"stats, all days:    {vector_time:7.3f}s {BACKEND}, {python_time:.3f}s python "
+            f"({python_time / vector_time:.1f}x)"
+        )
+
+        report = full.report(3)
+        print(analytics.format_report(report))
+        fleet_entry = report["fleet"]
+        if fleet_entry["calls"] != len(columns):
+            failures.append("fleet totals")
+        if any(fleet_entry[f"{name}_count"] == 0 for name in LATENCY_COLUMNS):
+            failures.append("fleet latency counts")
+
+    print("ok" if not failures else "FAILED: " + "; ".join(failures[:5]))
+    return 1 if failures else 0
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=60)
+    args = parser.parse_args()
+    sys.exit(run(args.calls, args.days))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,127 @@
+"""Benchmark: inbound frame coalescing, throughput against added latency.
+
+For each window size, streams ``--seconds`` of 20 ms μ-law frames per call
+for ``--calls`` concurrent calls through ``audio.FrameCoalescer`` and
+``codec.audio_append_frame`` over real WebSocket connections to a local
+server, as fast as possible, and reports messages and bytes on the wire and
+the sender's CPU time per second of audio. The added latency is measured by
+replaying the same frames against a 20 ms arrival clock: each frame waits
+until its window is sent.
+
+A window of 20 ms is the old one-message-per-frame behaviour.
+
+Usage::
+
+    python benchmarks/inbound_coalescing.py --windows 20,40,60,100,200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import websockets  # noqa: E402
+
+import codec  # noqa: E402
+from audio import FrameCoalescer  # noqa: E402
+from fakes import FRAME_SECONDS  # noqa: E402
+from metrics import percentiles  # noqa: E402
+
+
+class CountingServer:
+    """Local WebSocket endpoint that counts what it receives."""
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    async def _handle(self, ws, path=None):
+        async for message in ws:
+            self.messages += 1
+            self.bytes += len(message)
+
+    async def start(self) -> str:
+        self._server = await websockets.serve(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"ws://127.0.0.1:{port}"
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+
+async def stream_call(url: str, frames: list[str], window_ms: int) -> float:
+    """Send one call's frames; return the CPU seconds spent forwarding."""
+    async with websockets.connect(url) as ws:
+        coalescer = FrameCoalescer(window_ms)
+        cpu = 0.0
+        for payload in frames:
+            started = time.process_time()
+            window = coalescer.add(payload, 0.0)
+            if window is not None:
+                await ws.send(codec.audio_append_frame(window))
+            cpu += time.process_time() - started
+        tail = coalescer.flush()
+        if tail is not None:
+            await ws.send(codec.audio_append_frame(tail))
+    return cpu
+
+
+def added_latency(frames: list[str], window_ms: int) -> list[float]:
+    """Seconds each frame waits for its window, with frames every 20 ms."""
+    coalescer = FrameCoalescer(window_ms)
+    arrivals: list[float] = []
+    waits = []
+    for seq, payload in enumerate(frames):
+        now = seq * FRAME_SECONDS
+        arrivals.append(now)
+        if coalescer.add(payload, now) is not None:
+            waits.extend(now - arrived for arrived in arrivals)
+            arrivals = []
+    return waits
+
+
+async def run(windows: list[int], calls: int, seconds: float) -> None:
+    frames = [
+        base64.b64encode(os.urandom(160)).decode() for _ in range(int(seconds / FRAME_SECONDS))
+    ]
+    audio_seconds = calls * len(frames) * FRAME_SECONDS
+    print(f"{calls} calls x {seconds:.0f}s of audio per window size")
+    print(
+        f"{'window ms':>10}{'msgs/s/call':>13}{'wire KB':>9}{'cpu us/audio s':>16}"
+        f"{'wall s':>8}{'wait p50 ms':>13}{'wait max ms':>13}"
+    )
+    for window_ms in windows:
+        server = CountingServer()
+        url = await server.start()
+        started = time.perf_counter()
+        cpu = sum(await asyncio.gather(*(stream_call(url, frames, window_ms) for _ in range(calls))))
+        wall = time.perf_counter() - started
+        await asyncio.sleep(0.05)
+        await server.stop()
+        waits = added_latency(frames, window_ms)
+        p = percentiles(waits)
+        print(
+            f"{window_ms:>10}{server.messages / calls / seconds:>13.1f}{server.bytes / 1024:>9.0f}"
+            f"{cpu / audio_seconds * 1e6:>16.0f}{wall:>8.2f}"
+            f"{p['p50'] * 1000:>13.0f}{max(waits) * 1000:>13.0f}"
+        )
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--windows", default="20,40,60,100,200", help="window sizes in ms")
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=60.0, help="audio per call")
+    args = parser.parse_args()
+    asyncio.run(run([int(w) for w in args.windows.split(",")], args.calls, args.seconds))
+
+
+if __name__ == "__main__":
+    main_cli()
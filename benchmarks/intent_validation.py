@@ -0,0 +1,82 @@
+"""Benchmark: intent validation time per conversation item.
+
+Validates a mix of items the bridge sees (plain transcript text, valid
+intent JSON, often repeated, and JSON with a disallowed intent) with the
+full ``main.intent_guard.parse`` and with ``main.INTENT_VALIDATOR``, and
+reports the mean and p99 time per item and which step handled each item.
+
+Usage::
+
+    python benchmarks/intent_validation.py --items 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+
+import fakes  # noqa: F401
+
+import main
+from intent_validation import IntentValidator
+from metrics import percentiles
+
+
+def make_items(count: int, rng: random.Random) -> list[str]:
+    items = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.4:
+            items.append("I'd like to book something for tomorrow afternoon.")
+        elif roll < 0.8:
+            intent = rng.choice(main.ALLOWED_INTENTS)
+            # Replies repeat often; a few are unique
+            text = "Sure, let me check." if rng.random() < 0.7 else f"Reply {i}"
+            items.append(json.dumps({"intent": intent, "text": text}))
+        elif roll < 0.95:
+            items.append(json.dumps({"intent": "greeting", "text": f"Hello {i}"}))
+        else:
+            items.append(json.dumps({"intent": "pricing", "text": "It costs..."}))
+    return items
+
+
+def timed(func, items: list[str]) -> list[float]:
+    durations = []
+    for item in items:
+        started = time.perf_counter()
+        func(item)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def full_guard(item: str) -> None:
+    try:
+        main.intent_guard.parse(item)
+    except Exception:
+        pass
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=2000)
+    args = parser.parse_args()
+    items = make_items(args.items, random.Random(3))
+
+    validator = IntentValidator(main.LLMOutput, main.ALLOWED_INTENTS, guard=main.intent_guard)
+    results = {
+        "guard.parse": timed(full_guard, items),
+        "IntentValidator": timed(validator.validate, items),
+    }
+    for name, durations in results.items():
+        p = percentiles(durations)
+        print(
+            f"{name:<16} mean={sum(durations) / len(durations) * 1e6:9.1f}us "
+            f"p50={p['p50'] * 1e6:9.1f}us p99={p['p99'] * 1e6:9.1f}us"
+        )
+    print(f"validator steps: {validator.stats()}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,369 @@
+"""End-to-end load harness: fake Twilio callers against the FastAPI app.
+
+Starts a :class:`fakes.ScriptedRealtimeServer` standing in for OpenAI and,
+unless ``--target`` is given, serves ``main.app`` with uvicorn on a
+dedicated thread pointed at it. ``--calls`` fake Twilio media-stream
+clients then connect to ``/media-stream`` over real WebSockets, ramp up over
+``--ramp`` seconds and stream 20 ms μ-law frames at real-time pacing for
+``--duration`` seconds while the fake OpenAI peer plays scripted turns.
+
+Every frame carries a marker, so the harness reports, per step:
+
+* sustained concurrent calls (lowest ``bridge_active_calls`` scraped from
+  ``/metrics`` while all callers were streaming),
+* frame loss in each direction,
+* p50/p99 forwarding latency in each direction and time to first audio,
+* CPU per call, from the app thread's CPU clock (in-process only, or
+  ``--pid`` of an external app on Linux).
+
+``--steps 10,25,50`` runs several load levels in turn; ``--json`` appends
+one JSON line per step so results can be tracked across releases. Exits
+non-zero if a call fails or frame loss in either direction exceeds
+``--max-loss``. Each caller hangs up only once every reply started for it
+has played in full.
+
+Usage::
+
+    python benchmarks/load_harness.py --steps 10,25 --duration 10
+    python benchmarks/load_harness.py --target ws://127.0.0.1:5050 --openai-port 9000 --calls 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+os.environ.setdefault("TRANSCRIPT_DIR", os.path.join(tempfile.mkdtemp(), "transcripts"))
+os.environ.setdefault("LOG_MODE", "production")
+
+from fakes import FRAME_SECONDS, ScriptedRealtimeServer  # noqa: E402
+
+import websockets  # noqa: E402
+
+SILENCE = b"\xff" * 152
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(len(ordered) * q / 100)) - 1]
+
+
+class TwilioCaller:
+    """One fake Twilio media stream: real-time frames out, media frames in."""
+
+    def __init__(self, index: int, url: str, duration: float, reply_frames: int):
+        self.index = index
+        self.url = url
+        self.duration = duration
+        self.reply_frames = reply_frames
+        self.sent: dict[bytes, float] = {}
+        self.received: dict[bytes, float] = {}
+        self.late_sends = 0
+        self.error: str | None = None
+
+    def marker(self, seq: int) -> bytes:
+        return struct.pack(">II", self.index, seq)
+
+    async def run(self, streaming: asyncio.Event) -> None:
+        call_sid = f"CA{self.index:032d}"
+        try:
+            async with websockets.connect(self.url, max_size=None) as ws:
+                reader = asyncio.create_task(self._read(ws))
+                await ws.send(
+                    json.dumps(
+                        {
+                            "event": "start",
+                            "start": {"streamSid": f"MZ{self.index:032d}", "callSid": call_sid},
+                        }
+                    )
+                )
+                streaming.set()
+                frames = int(self.duration / FRAME_SECONDS)
+                start = time.perf_counter()
+                for seq in range(frames):
+                    due = start + seq * FRAME_SECONDS
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    elif delay < -FRAME_SECONDS:
+                        self.late_sends += 1
+                    marker = self.marker(seq)
+                    payload = base64.b64encode(marker + SILENCE).decode()
+                    self.sent[marker] = time.perf_counter()
+                    await ws.send(
+                        json.dumps(
+                            {
+                                "event": "media",
+                                "streamSid": f"MZ{self.index:032d}",
+                                "media": {"payload": payload},
+                            }
+                        )
+                    )
+                # Hang up only once every started reply has played in full,
+                # so frames still streaming are not counted as lost
+                finished = time.perf_counter()
+                deadline = finished + self.reply_frames * FRAME_SECONDS + 2.0
+                while time.perf_counter() < deadline:
+                    # The last frames sent may still end a turn and start a reply
+                    last = max(self.received.values(), default=finished)
+                    quiet = time.perf_counter() - max(last, finished) > 0.3
+                    if quiet and len(self.received) % self.reply_frames == 0:
+                        break
+                    await asyncio.sleep(0.05)
+                await ws.send(json.dumps({"event": "stop"}))
+                reader.cancel()
+        except Exception as exc:
+            self.error = f"{type(exc).__name__}: {exc}"
+
+    async def _read(self, ws) -> None:
+        try:
+            async for message in ws:
+                now = time.perf_counter()
+                event = json.loads(message)
+                if event.get("event") == "media":
+                    payload = base64.b64decode(event["media"]["payload"])
+                    self.received[payload[:8]] = now
+        except websockets.ConnectionClosed:
+            pass
+
+
+class AppThread:
+    """Serve ``main.app`` with uvicorn on its own thread and event loop."""
+
+    def __init__(self, openai_url: str):
+        import uvicorn
+
+        import main
+
+        main.OPENAI_REALTIME_URL = openai_url
+        main.CALL_WRITER.reports_dir = os.path.join(tempfile.mkdtemp(), "reports")
+
+        async def fixed_slots(ctx=None):
+            return ["10:00 AM - 10:30 AM", "02:00 PM - 02:30 PM"]
+
+        main.get_todays_free_slots = fixed_slots
+        self.port = _free_port()
+        self.server = uvicorn.Server(
+            uvicorn.Config(main.app, host="127.0.0.1", port=self.port, log_level="warning")
+        )
+        self.thread = threading.Thread(target=self.server.run, name="app", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}"
+
+    def start(self) -> None:
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+        self._clock = time.pthread_getcpuclockid(self.thread.ident)
+
+    def cpu_seconds(self) -> float:
+        return time.clock_gettime(self._clock)
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(10)
+
+
+class ProcessCPU:
+    """CPU time of an external app process, read from ``/proc``."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.ticks = os.sysconf("SC_CLK_TCK")
+
+    def cpu_seconds(self) -> float:
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / self.ticks
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _scrape_active(metrics_url: str) -> int | None:
+    try:
+        with urllib.request.urlopen(metrics_url, timeout=2) as response:
+            for line in response.read().decode().splitlines():
+                if line.startswith("bridge_active_calls "):
+                    return int(float(line.split()[1]))
+    except Exception:
+        return None
+    return None
+
+
+async def run_step(calls: int, args, server: ScriptedRealtimeServer, base_url: str, cpu) -> dict:
+    server.received.clear()
+    server.sent.clear()
+    server.turn_starts.clear()
+    url = f"{base_url}/media-stream"
+    metrics_url = base_url.replace("ws://", "http://").replace("wss://", "https://") + "/metrics"
+    callers = [TwilioCaller(i, url, args.duration, args.reply_frames) for i in range(calls)]
+    started = [asyncio.Event() for _ in callers]
+
+    async def launch(i: int, caller: TwilioCaller) -> None:
+        await asyncio.sleep(args.ramp * i / max(calls, 1))
+        await caller.run(started[i])
+
+    cpu_before = cpu.cpu_seconds() if cpu else None
+    wall_before = time.perf_counter()
+    tasks = [asyncio.create_task(launch(i, c)) for i, c in enumerate(callers)]
+
+    # Sample concurrency while every caller is streaming
+    loop = asyncio.get_running_loop()
+    await asyncio.sleep(args.ramp + 1.0)
+    steady_until = time.perf_counter() + max(args.duration - args.ramp - 2.0, 0.5)
+    active: list[int] = []
+    while time.perf_counter() < steady_until:
+        value = await loop.run_in_executor(None, _scrape_active, metrics_url)
+        if value is not None:
+            active.append(value)
+        await asyncio.sleep(0.5)
+
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - wall_before
+    cpu_used = cpu.cpu_seconds() - cpu_before if cpu else None
+
+    inbound, outbound, ttfa = [], [], []
+    sent_in = received_in = 0
+    received_out: dict[bytes, float] = {}
+    for caller in callers:
+        received_out.update(caller.received)
+        for marker, sent_at in caller.sent.items():
+            sent_in += 1
+            arrived = server.received.get(marker)
+            if arrived is not None:
+                received_in += 1
+                inbound.append(arrived - sent_at)
+    for marker, sent_at in server.sent.items():
+        arrived = received_out.get(marker)
+        if arrived is not None:
+            outbound.append(arrived - sent_at)
+    for marker, stopped_at in server.turn_starts.items():
+        arrived = received_out.get(marker)
+        if arrived is not None:
+            ttfa.append(arrived - stopped_at)
+    sent_out = len(server.sent)
+    call_seconds = calls * args.duration
+
+    return {
+        "calls": calls,
+        "sustained_calls": min(active) if active else None,
+        "failed_calls": sum(1 for c in callers if c.error),
+        "frames_in": sent_in,
+        "frames_out": sent_out,
+        "loss_in": 1 - received_in / sent_in if sent_in else 0.0,
+        "loss_out": 1 - len(outbound) / sent_out if sent_out else 0.0,
+        "p50_in_ms": percentile(inbound, 50) * 1000,
+        "p99_in_ms": percentile(inbound, 99) * 1000,
+        "p50_out_ms": percentile(outbound, 50) * 1000,
+        "p99_out_ms": percentile(outbound, 99) * 1000,
+        "p99_ttfa_ms": percentile(ttfa, 99) * 1000,
+        "late_sends": sum(c.late_sends for c in callers),
+        "turns": server.turns,
+        "cpu_ms_per_call_second": cpu_used / call_seconds * 1000 if cpu_used is not None else None,
+        "wall_seconds": wall,
+        "errors": sorted({c.error for c in callers if c.error})[:3],
+    }
+
+
+def print_row(result: dict) -> None:
+    cpu = result["cpu_ms_per_call_second"]
+    sustained = result["sustained_calls"]
+    print(
+        f"{result['calls']:>6}{sustained if sustained is not None else '-':>10}"
+        f"{result['failed_calls']:>8}"
+        f"{result['loss_in'] * 100:>9.2f}%{result['loss_out'] * 100:>9.2f}%"
+        f"{result['p99_in_ms']:>10.2f}{result['p99_out_ms']:>10.2f}"
+        f"{result['p99_ttfa_ms']:>10.1f}"
+        f"{(f'{cpu:.2f}' if cpu is not None else '-'):>12}"
+    )
+    for error in result["errors"]:
+        print(f"        error: {error}")
+
+
+async def run(args) -> int:
+    server = ScriptedRealtimeServer(
+        speech_frames=args.speech_frames, reply_frames=args.reply_frames
+    )
+    if args.openai_port:
+        server._server = await websockets.serve(server._handle, "127.0.0.1", args.openai_port)
+    else:
+        await server.start()
+
+    app = None
+    cpu = None
+    if args.target:
+        base_url = args.target.rstrip("/")
+        if args.pid:
+            cpu = ProcessCPU(args.pid)
+        print(f"fake OpenAI realtime server: {server.url}")
+    else:
+        app = AppThread(server.url)
+        app.start()
+        base_url = app.base_url
+        cpu = app
+
+    steps = [int(s) for s in args.steps.split(",")] if args.steps else [args.calls]
+    print(
+        f"{'calls':>6}{'sustained':>10}{'failed':>8}{'loss in':>10}{'loss out':>10}"
+        f"{'p99 in':>10}{'p99 out':>10}{'p99 ttfa':>10}{'cpu ms/s':>12}"
+    )
+    results = []
+    for calls in steps:
+        result = await run_step(calls, args, server, base_url, cpu)
+        results.append(result)
+        print_row(result)
+        await asyncio.sleep(1.0)
+
+    if args.json:
+        with open(args.json, "a", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps({"timestamp": time.time(), **result}) + "\n")
+
+    if app is not None:
+        app.stop()
+    await server.stop()
+    failed = any(
+        r["failed_calls"] or r["loss_in"] > args.max_loss or r["loss_out"] > args.max_loss
+        for r in results
+    )
+    return 1 if failed else 0
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--steps", help="comma-separated call counts to run in turn")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds each call streams")
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds to start all calls")
+    parser.add_argument("--speech-frames", type=int, default=50)
+    parser.add_argument("--reply-frames", type=int, default=50)
+    parser.add_argument("--max-loss", type=float, default=0.001)
+    parser.add_argument("--target", help="base ws:// URL of an already running app")
+    parser.add_argument("--openai-port", type=int, help="fixed port for the fake OpenAI server")
+    parser.add_argument("--pid", type=int, help="PID of the --target app, for CPU per call")
+    parser.add_argument("--json", help="append one JSON result line per step to this file")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,135 @@
+"""Benchmark: per-event logging cost on the realtime event path.
+
+Logs the records ``send_to_twilio`` emits for a typical mix of realtime
+events (``openai.event`` with the full payload and ``conversation.item``)
+under each logging mode and reports the time spent in the logging call,
+which is time the event loop cannot forward audio. ``--slow-ms`` makes
+every write to the output stream sleep, standing in for a congested stdout
+or log shipper.
+
+Usage::
+
+    python benchmarks/logging_overhead.py --events 20000 --slow-ms 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import structlog  # noqa: E402
+
+import log_pipeline  # noqa: E402
+
+TEXT = "Sure, I can help you book that. " * 12
+
+
+def response_done(n: int) -> dict:
+    return {
+        "type": "response.done",
+        "event_id": f"event_{n}",
+        "response": {
+            "id": f"resp_{n}",
+            "status": "completed",
+            "output": [
+                {
+                    "id": f"item_{n}",
+                    "type": "message",
+                    "role": "assistant",
+                    "content": [{"type": "audio", "transcript": TEXT}],
+                }
+            ],
+            "usage": {"total_tokens": 812, "input_tokens": 640, "output_tokens": 172},
+        },
+    }
+
+
+def item_created(n: int) -> dict:
+    return {
+        "type": "conversation.item.created",
+        "event_id": f"event_{n}",
+        "item": {
+            "id": f"item_{n}",
+            "role": "assistant",
+            "content": [{"type": "text", "text": TEXT}],
+        },
+    }
+
+
+def rate_limits(n: int) -> dict:
+    return {
+        "type": "rate_limits.updated",
+        "event_id": f"event_{n}",
+        "rate_limits": [
+            {"name": "requests", "limit": 5000, "remaining": 4999, "reset_seconds": 0.012},
+            {"name": "tokens", "limit": 20000, "remaining": 19000, "reset_seconds": 3.0},
+        ],
+    }
+
+
+class SlowStream:
+    """Discards writes after sleeping ``delay`` seconds each."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+def run(mode: str, events: int, delay: float, rates: dict) -> dict:
+    stream = SlowStream(delay)
+    sink = log_pipeline.configure(mode, sample_rates=rates, stream=stream)
+    logger = structlog.get_logger()
+    makers = (response_done, item_created, rate_limits)
+    payloads = [makers[n % len(makers)](n) for n in range(events)]
+    worst = 0.0
+    started = time.perf_counter()
+    for payload in payloads:
+        t0 = time.perf_counter()
+        # Same calls as main.send_to_twilio
+        logger.info("openai.event", call_id="CA1", event_type=payload["type"], payload=payload)
+        if payload["type"] == "conversation.item.created":
+            logger.info("conversation.item", call_id="CA1", item=payload)
+        worst = max(worst, time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    stats = sink.stats() if sink is not None else {"dropped": 0}
+    if sink is not None:
+        sink.close()
+    return {"per_event_us": elapsed / events * 1e6, "worst_ms": worst * 1000, **stats}
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20_000)
+    parser.add_argument("--slow-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    delay = args.slow_ms / 1000
+    rates = {"rate_limits.updated": 0.0, "response.done": 0.25}
+
+    print(f"{'mode':<22}{'us/event':>10}{'worst ms':>10}{'dropped':>10}")
+    for label, mode, mode_rates in (
+        ("full", "full", {}),
+        ("production", "production", {}),
+        ("production+sampling", "production", rates),
+    ):
+        result = run(mode, args.events, delay, mode_rates)
+        print(
+            f"{label:<22}{result['per_event_us']:>10.1f}"
+            f"{result['worst_ms']:>10.2f}{result['dropped']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
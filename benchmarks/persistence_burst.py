@@ -0,0 +1,95 @@
+"""Burst of calls ending together: inline writes vs the background writer.
+
+Builds ``--calls`` finished call contexts and persists them two ways while
+a 5 ms ticker measures event-loop stalls: inline on the loop, as
+``handle_media_stream`` used to, and through ``persistence.CallWriter``.
+Reports and the database go to a temporary directory.
+
+Usage::
+
+    python benchmarks/persistence_burst.py --calls 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import fakes  # noqa: F401  (sets DATABASE_URL before db is imported)
+
+import structlog
+
+from call_context import CallContext
+from db import init_db
+from persistence import CallWriter
+
+
+def make_calls(prefix: str, calls: int) -> list[CallContext]:
+    return [
+        CallContext(
+            call_id=f"{prefix}{i:05d}",
+            session_id=f"sess_{i}",
+            start_ts="2026-01-01T10:00:00",
+            stop_ts="2026-01-01T10:05:00",
+            latencies=[0.4, 0.6, 0.5],
+        )
+        for i in range(calls)
+    ]
+
+
+async def _ticker(stop: asyncio.Event, stalls: list[float], interval: float = 0.005):
+    while not stop.is_set():
+        before = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - before - interval)
+
+
+async def run(contexts, writer: CallWriter, inline: bool):
+    stop = asyncio.Event()
+    stalls: list[float] = []
+    ticker = asyncio.create_task(_ticker(stop, stalls))
+    await asyncio.sleep(0.02)
+    started = time.perf_counter()
+    if inline:
+        for ctx in contexts:
+            writer._write_batch([(time.monotonic(), ctx)])
+            await asyncio.sleep(0)
+        submitted = time.perf_counter() - started
+    else:
+        for ctx in contexts:
+            await writer.submit(ctx)
+        submitted = time.perf_counter() - started
+        await writer.close()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    return submitted, elapsed, max(stalls, default=0.0)
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=20)
+    args = parser.parse_args()
+    structlog.configure(logger_factory=structlog.ReturnLoggerFactory())
+    init_db()
+
+    tmp = tempfile.mkdtemp()
+    for name, inline in (("inline", True), ("background", False)):
+        writer = CallWriter(os.path.join(tmp, name, "reports"), batch_size=args.batch_size)
+        contexts = make_calls(f"CA{name[0]}", args.calls)
+        submitted, elapsed, stall = asyncio.run(run(contexts, writer, inline))
+        stats = writer.stats()
+        print(
+            f"{name:<11} hand-off={submitted * 1000:8.1f}ms total={elapsed * 1000:8.1f}ms "
+            f"max loop stall={stall * 1000:7.1f}ms batches={stats['batches']} "
+            f"max write={stats['max_write_seconds'] * 1000:.1f}ms "
+            f"max queue wait={stats['max_queue_wait_seconds'] * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
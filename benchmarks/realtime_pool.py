@@ -0,0 +1,96 @@
+"""Setup latency of OpenAI Realtime sessions: cold connect vs warm pool.
+
+Runs ``main.connect_openai``/``main.configure_openai`` against a local
+``FakeRealtimeServer`` that delays the handshake and ``session.created``,
+then checks out ``--calls`` sessions with the pool disabled and enabled.
+Also exercises health checks and recycling with a short ``max_age``.
+
+Usage::
+
+    python benchmarks/realtime_pool.py --calls 10 --handshake-delay 0.15
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+
+from fakes import FakeRealtimeServer
+
+import structlog
+
+import main
+from realtime_pool import RealtimePool
+
+
+async def _fixed_slots(ctx=None):
+    return ["10:00 AM - 10:30 AM"]
+
+
+async def checkout_latencies(pool: RealtimePool, calls: int, interval: float) -> list[float]:
+    latencies = []
+    for _ in range(calls):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        session = await pool.checkout()
+        latencies.append(loop.time() - start)
+        await session.ws.close()
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run(args) -> int:
+    server = await FakeRealtimeServer(args.handshake_delay, args.session_delay).start()
+    main.OPENAI_REALTIME_URL = server.url
+    main.get_todays_free_slots = _fixed_slots
+
+    cold = RealtimePool(main.connect_openai, main.configure_openai, size=0)
+    cold_latencies = await checkout_latencies(cold, args.calls, args.interval)
+
+    warm = RealtimePool(main.connect_openai, main.configure_openai, size=args.size)
+    await warm.start()
+    await asyncio.sleep(args.handshake_delay + args.session_delay + 0.2)
+    warm_latencies = await checkout_latencies(warm, args.calls, args.interval)
+    warm_stats = warm.stats()
+    await warm.close()
+
+    recycling = RealtimePool(
+        main.connect_openai,
+        main.configure_openai,
+        size=2,
+        max_age=0.3,
+        health_interval=0.1,
+    )
+    await recycling.start()
+    await asyncio.sleep(1.5)
+    recycle_stats = recycling.stats()
+    await recycling.close()
+    await server.stop()
+
+    for name, latencies in (("cold", cold_latencies), ("pooled", warm_latencies)):
+        print(
+            f"{name:<7} median={statistics.median(latencies) * 1000:7.1f}ms "
+            f"max={max(latencies) * 1000:7.1f}ms"
+        )
+    print(f"pool stats: {warm_stats}")
+    print(f"recycling (max_age=0.3s): {recycle_stats}")
+    ok = warm_stats["hits"] == args.calls and recycle_stats["recycled"] > 0
+    return 0 if ok else 1
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--size", type=int, default=2)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between calls")
+    parser.add_argument("--handshake-delay", type=float, default=0.15)
+    parser.add_argument("--session-delay", type=float, default=0.1)
+    args = parser.parse_args()
+    structlog.configure(logger_factory=structlog.ReturnLoggerFactory())
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,159 @@
+"""Replay a call recording through ``main.bridge_call``.
+
+Recordings are written by ``call_recorder.CallRecorder`` when
+``CALL_RECORDING_DIR`` is set. ``--synthesize`` writes a scripted recording
+(caller speech, OpenAI turns and reply audio) to use as a fixture when no
+production recording is at hand.
+
+The replay reports the wall time, events per second and frames forwarded in
+each direction, and checks that every recorded audio frame came out the
+other side, so a recording doubles as a performance regression fixture.
+
+Usage::
+
+    python benchmarks/replay_call.py --synthesize /tmp/call.crec --seconds 60
+    python benchmarks/replay_call.py /tmp/call.crec --speed 0
+    python benchmarks/replay_call.py /tmp/call.crec --speed 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("TRANSCRIPT_DIR", os.path.join(tempfile.mkdtemp(), "transcripts"))
+os.environ.setdefault("LOG_MODE", "production")
+
+from fakes import FRAME_SECONDS  # noqa: E402
+
+import codec  # noqa: E402
+import main  # noqa: E402
+from call_recorder import (  # noqa: E402
+    OPENAI_AUDIO,
+    TWILIO_MEDIA,
+    CallRecorder,
+    Replay,
+    read_records,
+)
+
+SILENCE = b"\xff" * 160
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self) -> int:
+        return self.now
+
+
+def synthesize(path: str, seconds: float, speech_frames: int = 50, reply_frames: int = 50) -> None:
+    """Write a scripted call recording to ``path``."""
+    clock = _Clock()
+    recorder = CallRecorder(path, clock=clock)
+    step = int(FRAME_SECONDS * 1e9)
+    payload = base64.b64encode(SILENCE).decode()
+    recorder.openai_event(json.dumps({"type": "session.created", "session": {"id": "sess_replay"}}))
+    recorder.twilio_event(
+        json.dumps({"event": "start", "start": {"streamSid": "MZreplay", "callSid": "CAreplay"}})
+    )
+    heard = reply_left = turn = 0
+    intents = ("greeting", "ask_date")
+    for _ in range(int(seconds / FRAME_SECONDS)):
+        clock.now += step
+        recorder.twilio_media(payload)
+        if reply_left:
+            recorder.openai_audio(payload)
+            reply_left -= 1
+            if not reply_left:
+                content = json.dumps({"intent": intents[min(turn, 1)], "text": "Sure."})
+                recorder.openai_event(
+                    json.dumps(
+                        {"type": "conversation.item.created", "role": "assistant", "content": content}
+                    )
+                )
+                turn += 1
+            continue
+        heard += 1
+        if heard == 3:
+            recorder.openai_event(json.dumps({"type": "input_audio_buffer.speech_started"}))
+        elif heard == speech_frames:
+            heard = 0
+            recorder.openai_event(json.dumps({"type": "input_audio_buffer.speech_stopped"}))
+            recorder.openai_event(
+                json.dumps({"type": "conversation.item.created", "item": {"role": "user"}})
+            )
+            reply_left = reply_frames
+    recorder.close()
+
+
+async def _fixed_slots(ctx=None):
+    return ["10:00 AM - 10:30 AM"]
+
+
+async def replay(path: str, speed: float) -> int:
+    main.get_todays_free_slots = _fixed_slots
+    finished = []
+
+    async def finalize(ctx):
+        finished.append(ctx)
+
+    main.finalize_call = finalize
+    records = list(read_records(path))
+    inbound = sum(1 for r in records if r.kind == TWILIO_MEDIA)
+    inbound_bytes = sum(len(r.data) for r in records if r.kind == TWILIO_MEDIA)
+    outbound = sum(1 for r in records if r.kind == OPENAI_AUDIO)
+    session = Replay(records, speed)
+    ctx = main.CallContext()
+
+    started = time.perf_counter()
+    await main.bridge_call(session.twilio, session.openai, ctx)
+    elapsed = time.perf_counter() - started
+
+    appends = [codec.loads(m) for m in session.openai.sent if '"input_audio_buffer.append"' in m]
+    # INBOUND_COALESCE_MS may merge frames, so compare the audio forwarded
+    appended_bytes = sum(len(base64.b64decode(m["audio"])) for m in appends)
+    played = sum(1 for m in session.twilio.sent if m.startswith('{"event":"media"'))
+    recorded = (records[-1].t_ns - records[0].t_ns) / 1e9 if records else 0.0
+    print(f"records={len(records)} recorded={recorded:.1f}s replayed={elapsed:.3f}s "
+          f"({len(records) / elapsed:,.0f} events/s, speed={speed or 'max'})")
+    print(
+        f"inbound frames  recorded={inbound} forwarded={len(appends)} messages, "
+        f"{appended_bytes}/{inbound_bytes} bytes"
+    )
+    print(f"outbound frames recorded={outbound} forwarded={played}")
+    for stage, histogram in ctx.trace.histograms().items():
+        if histogram.count:
+            print(
+                f"{stage:<12} p50={histogram.percentile(50) * 1000:7.3f}ms "
+                f"p99={histogram.percentile(99) * 1000:7.3f}ms n={histogram.count}"
+            )
+    print(f"state={ctx.state} guardrail_rejects={ctx.guardrail_rejects}")
+    return 0 if appended_bytes == inbound_bytes and played == outbound else 1
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", nargs="?")
+    parser.add_argument("--speed", type=float, default=0.0, help="1 = real time, 0 = max")
+    parser.add_argument("--synthesize", metavar="PATH", help="write a scripted recording")
+    parser.add_argument("--seconds", type=float, default=60.0)
+    args = parser.parse_args()
+    if args.synthesize:
+        synthesize(args.synthesize, args.seconds)
+        print(f"wrote {args.synthesize} ({os.path.getsize(args.synthesize):,} bytes)")
+        if not args.recording:
+            return
+    if not args.recording:
+        parser.error("a recording path or --synthesize is required")
+    sys.exit(asyncio.run(replay(args.recording, args.speed)))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,190 @@
+"""Load test: one slow WebSocket peer under each queue overflow policy.
+
+Bridges a call through ``main.bridge_call`` with fake peers. The fake
+OpenAI socket takes ``--send-delay-ms`` to accept each message, which is
+slower than Twilio's 20 ms frames. It also streams its own reply audio
+every 20 ms and asks for a barge-in halfway through. For each
+``LEG_QUEUE_POLICY`` this checks:
+
+* ``drop_oldest``: the Twilio read loop keeps up, inbound audio is dropped,
+  and the queue never grows past ``--queue-size``;
+* ``block``: nothing is dropped, and the Twilio read loop is pushed back
+  instead;
+* ``hangup``: the call is hung up once the queue overflows;
+
+and, for every policy, that reply audio still reaches Twilio promptly,
+because the slow OpenAI leg no longer stalls the opposite direction.
+
+Usage::
+
+    python benchmarks/slow_peer.py --send-delay-ms 40 --queue-size 25
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import sys
+import time
+
+from fakes import FRAME_SECONDS, FakeOpenAISocket, FakeTwilioSocket
+
+import main
+from leg_writer import BLOCK, DROP_OLDEST, HANGUP, LegWriter
+from metrics import percentiles
+
+
+class TimedTwilioSocket(FakeTwilioSocket):
+    """Records how late the bridge reads each frame against its 20 ms schedule."""
+
+    def __init__(self, call_sid: str, frames: int):
+        super().__init__(call_sid, frames)
+        self.read_lag: list[float] = []
+
+    async def iter_text(self):
+        started = time.perf_counter()
+        stream = super().iter_text()
+        seq = -1
+        async for message in stream:
+            if seq >= 0:
+                self.read_lag.append(time.perf_counter() - started - seq * FRAME_SECONDS)
+            seq += 1
+            yield message
+
+
+class SlowOpenAISocket(FakeOpenAISocket):
+    """Accepts each message after a delay and plays a scripted reply."""
+
+    def __init__(self, send_delay: float, reply_frames: int):
+        super().__init__()
+        self.send_delay = send_delay
+        self.reply_frames = reply_frames
+        self.emitted_at: dict[str, float] = {}
+        self.appends = 0
+
+    async def send(self, message: str) -> None:
+        await asyncio.sleep(self.send_delay)
+        if '"input_audio_buffer.append"' in message:
+            self.appends += 1
+        else:
+            self.received.append(json.loads(message))
+
+    async def play(self, delay: float) -> None:
+        # Start once the bridge is past its initial session.update
+        await asyncio.sleep(delay)
+        for seq in range(self.reply_frames):
+            if not self.open:
+                return
+            delta = base64.b64encode(f"reply:{seq:05d}".encode()).decode()
+            self.emitted_at[delta] = time.perf_counter()
+            self.emit({"type": "response.audio.delta", "delta": delta})
+            if seq == self.reply_frames // 2:
+                self.emit({"type": "input_audio_buffer.speech_started"})
+            await asyncio.sleep(FRAME_SECONDS)
+
+
+async def run_policy(policy: str, frames: int, send_delay: float, queue_size: int) -> dict:
+    main.LEG_QUEUE_POLICY = policy
+    main.LEG_QUEUE_SIZE = queue_size
+    finished: list[main.CallContext] = []
+    hangups: list[str] = []
+
+    async def finalize(ctx):
+        finished.append(ctx)
+
+    async def hangup(call_sid):
+        hangups.append(call_sid)
+
+    async def fixed_slots(ctx=None):
+        return ["10:00 AM - 10:30 AM"]
+
+    main.finalize_call = finalize
+    main.get_todays_free_slots = fixed_slots
+    main.TWILIO.hangup = hangup
+
+    twilio_ws = TimedTwilioSocket("CAslow", frames)
+    openai_ws = SlowOpenAISocket(send_delay, frames // 2)
+    openai_ws.emit({"type": "session.created", "session": {"id": "sess_slow"}})
+    player = asyncio.ensure_future(openai_ws.play(send_delay + 0.05))
+    started = time.perf_counter()
+    await main.bridge_call(twilio_ws, openai_ws, main.CallContext())
+    elapsed = time.perf_counter() - started
+    player.cancel()
+
+    ctx = finished[0]
+    writer: LegWriter = ctx.to_openai
+    forwarded = []
+    for message, sent_at in zip(twilio_ws.sent, twilio_ws.sent_at):
+        if message.get("event") == "media":
+            emitted = openai_ws.emitted_at.get(message["media"]["payload"])
+            if emitted is not None:
+                forwarded.append(sent_at - emitted)
+    return {
+        "policy": policy,
+        "elapsed": elapsed,
+        "read_lag_max": max(twilio_ws.read_lag, default=0.0),
+        "max_depth": writer.max_seen,
+        "dropped": writer.dropped,
+        "appends": openai_ws.appends,
+        "cancels": sum(1 for e in openai_ws.received if e["type"] == "response.cancel"),
+        "hangups": len(hangups),
+        "reply_p99": percentiles(forwarded)["p99"] if forwarded else float("nan"),
+        "reply_frames": len(forwarded),
+    }
+
+
+def check(result: dict, queue_size: int) -> list[str]:
+    failures = []
+    policy = result["policy"]
+    if result["max_depth"] > queue_size:
+        failures.append("queue grew past its bound")
+    if policy != HANGUP and result["reply_p99"] > 0.01:
+        failures.append("reply audio was delayed by the slow OpenAI leg")
+    if policy == DROP_OLDEST:
+        if result["read_lag_max"] > 0.1:
+            failures.append("Twilio read loop stalled")
+        if not result["dropped"]:
+            failures.append("no inbound audio was dropped")
+        if not result["cancels"]:
+            failures.append("response.cancel was dropped")
+    elif policy == BLOCK:
+        if result["dropped"]:
+            failures.append("audio was dropped")
+        if result["read_lag_max"] < 0.1:
+            failures.append("Twilio read loop was not pushed back")
+    elif policy == HANGUP and result["hangups"] != 1:
+        failures.append("call was not hung up")
+    return failures
+
+
+async def run(frames: int, send_delay: float, queue_size: int) -> int:
+    print(f"{frames} frames, OpenAI accepts one message per {send_delay * 1000:.0f}ms, "
+          f"queue size {queue_size}")
+    print(f"{'policy':<12}{'read lag ms':>12}{'max depth':>10}{'dropped':>9}{'appends':>9}"
+          f"{'hangups':>9}{'reply p99 ms':>14}  result")
+    errors = 0
+    for policy in (DROP_OLDEST, BLOCK, HANGUP):
+        result = await run_policy(policy, frames, send_delay, queue_size)
+        failures = check(result, queue_size)
+        errors += bool(failures)
+        print(
+            f"{policy:<12}{result['read_lag_max'] * 1000:>12.0f}{result['max_depth']:>10}"
+            f"{result['dropped']:>9}{result['appends']:>9}{result['hangups']:>9}"
+            f"{result['reply_p99'] * 1000:>14.2f}  {'; '.join(failures) or 'ok'}"
+        )
+    return errors
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--send-delay-ms", type=float, default=40.0)
+    parser.add_argument("--queue-size", type=int, default=25)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.frames, args.send_delay_ms / 1000, args.queue_size)))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,226 @@
+"""Benchmark: call summary insert throughput and indexed queries.
+
+Writes ``--calls`` summaries to throwaway SQLite files with:
+
+* ``session/row``: a new session and commit per call, as ``db.py`` used to
+  (run on ``--legacy-calls`` rows, it is slow);
+* ``merge/batch``: ``Session.merge`` per row, one commit per batch;
+* ``upsert/batch``: ``db.save_call_summaries`` with multi-row upserts in
+  WAL mode, as ``persistence.CallWriter`` writes them, for each ``--batch``
+  size, then again over the same IDs to exercise the conflict path.
+
+Then pages through one outcome over a date range with
+``query_call_summaries``, with the indexes and after dropping them, and
+prints SQLite's query plan. Exits non-zero if a store loses or duplicates
+rows, the second upsert does not update them, the indexed plan scans the
+table, or pagination skips or repeats a row.
+
+Usage::
+
+    python benchmarks/summary_store.py --calls 20000 --batch 20,500
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from db import (  # noqa: E402
+    CallSummary,
+    init_db,
+    make_engine,
+    query_call_summaries,
+    save_call_summaries,
+)
+
+OUTCOMES = ("completed", "scheduled", "no_answer", "hangup", "derailed")
+
+
+def make_rows(count: int, rng: random.Random) -> list[dict]:
+    start = datetime(2026, 1, 1)
+    return [
+        {
+            "call_id": f"CA{i:032x}",
+            "duration": rng.uniform(10, 600),
+            "outcome": rng.choice(OUTCOMES),
+            "scheduled_time": start + timedelta(seconds=rng.randint(0, 90 * 86400)),
+            "transcript_path": f"transcripts/CA{i:032x}.jsonl",
+        }
+        for i in range(count)
+    ]
+
+
+def fresh_engine(directory: str, name: str, wal: bool):
+    engine = make_engine(f"sqlite:///{os.path.join(directory, name)}", wal=wal)
+    init_db(engine)
+    return engine
+
+
+def session_per_row(engine, rows: list[dict]) -> None:
+    factory = sessionmaker(bind=engine)
+    for row in rows:
+        session = factory()
+        try:
+            session.merge(_summary(row))
+            session.commit()
+        finally:
+            session.close()
+
+
+def merge_batches(engine, rows: list[dict], batch: int) -> None:
+    factory = sessionmaker(bind=engine)
+    for start in range(0, len(rows), batch):
+        session = factory()
+        try:
+            for row in rows[start : start + batch]:
+                session.merge(_summary(row))
+            session.commit()
+        finally:
+            session.close()
+
+
+def _summary(row: dict) -> CallSummary:
+    return CallSummary(
+        id=row["call_id"],
+        duration=row["duration"],
+        outcome=row["outcome"],
+        scheduled_time=row["scheduled_time"],
+        transcript_path=row["transcript_path"],
+    )
+
+
+def upsert_batches(engine, rows: list[dict], batch: int) -> int:
+    written = 0
+    for start in range(0, len(rows), batch):
+        written += save_call_summaries(rows[start : start + batch], bind=engine)
+    return written
+
+
+def report(name: str, rows: int, seconds: float) -> None:
+    print(f"{name:<24}{rows:>8}{seconds:>10.2f}{rows / seconds:>12,.0f}")
+
+
+def count_rows(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(CallSummary.__table__)).scalar()
+
+
+def page_through(engine, outcome: str, start: datetime, end: datetime, limit: int):
+    ids: list[str] = []
+    pages = 0
+    after = None
+    first_page = None
+    while True:
+        began = time.perf_counter()
+        items, after = query_call_summaries(
+            start=start, end=end, outcome=outcome, limit=limit, after=after, bind=engine
+        )
+        if first_page is None:
+            first_page = time.perf_counter() - began
+        pages += 1
+        ids.extend(item["id"] for item in items)
+        if after is None:
+            return pages, ids, first_page
+
+
+def query_plan(engine, outcome: str, start: datetime, end: datetime) -> str:
+    table = CallSummary.__table__
+    stmt = (
+        select(table)
+        .where(table.c.outcome == outcome, table.c.scheduled_time >= start,
+               table.c.scheduled_time < end)
+        .order_by(table.c.scheduled_time, table.c.id)
+    )
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        return "; ".join(row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql)))
+
+
+def run(calls: int, legacy_calls: int, batches: list[int]) -> int:
+    rows = make_rows(calls, random.Random(5))
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'mode':<24}{'rows':>8}{'seconds':>10}{'rows/s':>12}")
+        legacy = rows[:legacy_calls]
+        engine = fresh_engine(directory, "legacy.db", wal=False)
+        started = time.perf_counter()
+        session_per_row(engine, legacy)
+        report("session/row", len(legacy), time.perf_counter() - started)
+
+        engine = fresh_engine(directory, "merge.db", wal=False)
+        started = time.perf_counter()
+        merge_batches(engine, rows, batches[0])
+        report(f"merge/batch {batches[0]}", len(rows), time.perf_counter() - started)
+        if count_rows(engine) != len(rows):
+            failures.append("merge/batch row count")
+
+        for batch in batches:
+            engine = fresh_engine(directory, f"upsert_{batch}.db", wal=True)
+            started = time.perf_counter()
+            written = upsert_batches(engine, rows, batch)
+            report(f"upsert/batch {batch}", len(rows), time.perf_counter() - started)
+            updated = [dict(row, outcome="completed") for row in rows]
+            started = time.perf_counter()
+            written += upsert_batches(engine, updated, batch)
+            report(f"upsert/batch {batch} again", len(rows), time.perf_counter() - started)
+            if count_rows(engine) != len(rows) or written != 2 * len(rows):
+                failures.append(f"upsert/batch {batch} row count")
+            items, _ = query_call_summaries(outcome="completed", limit=len(rows), bind=engine)
+            if len(items) != len(rows):
+                failures.append(f"upsert/batch {batch} did not update rows")
+            # Restore the original outcomes for the queries below
+            save_call_summaries(rows, bind=engine)
+
+        query_start = datetime(2026, 2, 1)
+        query_end = query_start + timedelta(days=7)
+        expected = sorted(
+            (row["scheduled_time"], row["call_id"])
+            for row in rows
+            if row["outcome"] == "scheduled" and query_start <= row["scheduled_time"] < query_end
+        )
+        expected_ids = [call_id for _, call_id in expected]
+        print(f"\n{'query':<24}{'pages':>8}{'rows':>8}{'first page ms':>15}{'all pages ms':>14}")
+        for label in ("indexed", "no indexes"):
+            if label == "no indexes":
+                with engine.begin() as conn:
+                    for index in CallSummary.__table__.indexes:
+                        if index.name != "ix_call_summaries_id":
+                            conn.execute(text(f"DROP INDEX {index.name}"))
+                # Pooled connections keep statements planned with the indexes
+                engine.dispose()
+            plan = query_plan(engine, "scheduled", query_start, query_end)
+            started = time.perf_counter()
+            pages, ids, first = page_through(engine, "scheduled", query_start, query_end, 50)
+            elapsed = time.perf_counter() - started
+            print(f"{label:<24}{pages:>8}{len(ids):>8}{first * 1000:>15.2f}{elapsed * 1000:>14.1f}")
+            print(f"  plan: {plan}")
+            if ids != expected_ids:
+                failures.append(f"{label} pagination returned the wrong rows")
+            if label == "indexed" and "USING INDEX ix_call_summaries_outcome" not in plan:
+                failures.append("indexed query does not use the outcome index")
+    print("ok" if not failures else "FAILED: " + "; ".join(failures))
+    return 1 if failures else 0
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--legacy-calls", type=int, default=2000)
+    parser.add_argument("--batch", default="20,500", help="comma-separated batch sizes")
+    args = parser.parse_args()
+    batches = [int(b) for b in args.batch.split(",")]
+    sys.exit(run(args.calls, min(args.legacy_calls, args.calls), batches))
+
+
+if __name__ == "__main__":
+    main_cli()
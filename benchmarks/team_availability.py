@@ -0,0 +1,209 @@
+"""Scaling test: team availability across hundreds of calendars.
+
+For each ``--calendars`` count, gives every fake calendar random meetings
+(some overlapping) over ``--days`` days, then:
+
+* checks ``gcal.team_free_slots`` in both modes against a minute-grid
+  brute force, including the calendars listed as free for each slot and a
+  calendar Google answers with an error;
+* checks that ``AsyncCalendar.team_free_slots`` needs one freebusy request
+  per ``gcal.FREEBUSY_MAX_CALENDARS`` calendars, against one per calendar
+  when ``AsyncCalendar.list_free_slots`` is called for each rep, with a
+  fake Google round trip of ``--delay`` seconds;
+* times the merge alone.
+
+Exits non-zero on any mismatch.
+
+Usage::
+
+    python benchmarks/team_availability.py --calendars 100,300,1000 --days 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from fakes import FakeCalendarService
+
+import gcal
+
+START = datetime(2026, 3, 2, tzinfo=timezone.utc)
+SLOT_MINUTES = 30
+
+
+def make_calendars(count: int, days: int, meetings: int, rng: random.Random) -> dict:
+    calendars = {}
+    for c in range(count):
+        busy = []
+        for _ in range(rng.randint(meetings // 2, meetings * 3 // 2)):
+            begin = START + timedelta(minutes=15 * rng.randrange(days * 96))
+            length = timedelta(minutes=rng.choice((15, 30, 45, 60, 90, 120)))
+            busy.append({"start": begin.isoformat(), "end": (begin + length).isoformat()})
+        # Google returns periods in order; overlaps are left in to exercise the merge
+        busy.sort(key=lambda p: p["start"])
+        calendars[f"rep{c:04d}@example.com"] = busy
+    return calendars
+
+
+def brute_force(ids: list, calendars: dict, missing: set, days: int, mode: str) -> list:
+    """Team slots computed on a one-minute grid."""
+    minutes = days * 1440
+    busy = {}
+    for calendar_id in ids:
+        grid = bytearray(minutes)
+        if calendar_id in missing:
+            grid = bytearray(b"\x01" * minutes)
+        for period in calendars.get(calendar_id, []):
+            a = int((gcal._parse_google_dt(period["start"]) - START).total_seconds() // 60)
+            b = int((gcal._parse_google_dt(period["end"]) - START).total_seconds() // 60)
+            grid[max(a, 0) : min(b, minutes)] = b"\x01" * (min(b, minutes) - max(a, 0))
+        busy[calendar_id] = grid
+    grids = list(busy.values())
+    if mode == gcal.ALL_FREE:
+        grids = [bytearray(any(g[m] for g in grids) for m in range(minutes))]
+    slots = []
+    current = 0
+    while current + SLOT_MINUTES <= minutes:
+        resume = None
+        for grid in grids:
+            window = grid[current : current + SLOT_MINUTES]
+            if not any(window):
+                break
+            # This calendar could be free again once its busy run ends
+            first = current + window.index(1)
+            while first < minutes and grid[first]:
+                first += 1
+            resume = first if resume is None else min(resume, first)
+        else:
+            current = resume
+            continue
+        free = tuple(
+            calendar_id
+            for calendar_id, grid in busy.items()
+            if not any(grid[current : current + SLOT_MINUTES])
+        )
+        slots.append(
+            (
+                START + timedelta(minutes=current),
+                START + timedelta(minutes=current + SLOT_MINUTES),
+                free,
+            )
+        )
+        current += SLOT_MINUTES
+    return slots
+
+
+async def per_rep(calendar: gcal.AsyncCalendar, ids: list, start, end) -> list:
+    return await asyncio.gather(*(calendar.list_free_slots(c, start, end) for c in ids))
+
+
+def check_staggered() -> list[str]:
+    """Two reps who are each busy for half of a slot must not offer it."""
+    nine = START.replace(hour=9)
+    busy = {
+        "a": [(nine, nine + timedelta(minutes=15))],
+        "b": [(nine + timedelta(minutes=15), nine + timedelta(minutes=30))],
+    }
+    slots = gcal.free_slots_from_busy(busy, nine, nine + timedelta(hours=1), slot_minutes=30)
+    # The walk resumes when a frees up and offers the slot on a alone
+    expected = [(nine + timedelta(minutes=15), nine + timedelta(minutes=45), ("a",))]
+    return [] if slots == expected else [f"staggered busy periods gave {slots}"]
+
+
+def run_size(
+    count: int, days: int, meetings: int, all_team: int, delay: float, verify: bool
+) -> list[str]:
+    failures = []
+    rng = random.Random(count)
+    calendars = make_calendars(count, days, meetings, rng)
+    missing = {"former-rep@example.com"}
+    ids = list(calendars) + sorted(missing)
+    periods = sum(len(p) for p in calendars.values())
+    start, end = START, START + timedelta(days=days)
+
+    service = FakeCalendarService(calendars=calendars, missing=missing)
+    gcal.get_service = lambda: service
+    # Everyone is rarely free on a large team, so "all" also runs on a small one
+    teams = {gcal.ANY_FREE: ids, gcal.ALL_FREE: ids[:all_team]}
+    results = {}
+    for mode, team in teams.items():
+        results[mode] = gcal.team_free_slots(team, start, end, mode=mode, slot_minutes=SLOT_MINUTES)
+        if verify and results[mode] != brute_force(team, calendars, missing, days, mode):
+            failures.append(f"{count} calendars: {mode} slots differ from brute force")
+    if gcal.team_free_slots(ids, start, end, mode=gcal.ALL_FREE):
+        failures.append("a calendar Google could not read was treated as free")
+    if any(not free for _, _, free in results[gcal.ANY_FREE]):
+        failures.append(f"{count} calendars: a slot was offered with no free calendar")
+    expected_requests = 2 * math.ceil(len(ids) / gcal.FREEBUSY_MAX_CALENDARS) + 1
+    if service.freebusy_calls != expected_requests:
+        failures.append(f"{service.freebusy_calls} freebusy requests, expected {expected_requests}")
+    if service.max_items > gcal.FREEBUSY_MAX_CALENDARS:
+        failures.append(f"{service.max_items} calendars in one request")
+
+    busy = gcal.query_busy(ids, start, end)
+    merge = {}
+    for mode in gcal.TEAM_MODES:
+        started = time.perf_counter()
+        gcal.free_slots_from_busy(busy, start, end, mode=mode, slot_minutes=SLOT_MINUTES)
+        merge[mode] = time.perf_counter() - started
+
+    service = FakeCalendarService(delay=delay, calendars=calendars, missing=missing)
+    gcal.get_service = lambda: service
+    calendar = gcal.AsyncCalendar(max_workers=4)
+    started = time.perf_counter()
+    team = asyncio.run(calendar.team_free_slots(ids, start, end, slot_minutes=SLOT_MINUTES))
+    team_seconds = time.perf_counter() - started
+    team_requests = service.freebusy_calls
+    if team != results[gcal.ANY_FREE]:
+        failures.append(f"{count} calendars: async team slots differ")
+    service.freebusy_calls = 0
+    started = time.perf_counter()
+    asyncio.run(per_rep(calendar, ids, start, end))
+    rep_seconds = time.perf_counter() - started
+    calendar.shutdown()
+
+    any_slots = results[gcal.ANY_FREE]
+    print(
+        f"{count:>9}{periods:>9}{len(any_slots):>9}{len(results[gcal.ALL_FREE]):>9}"
+        f"{merge[gcal.ANY_FREE] * 1000:>11.1f}{merge[gcal.ALL_FREE] * 1000:>11.1f}"
+        f"{team_requests:>8}{team_seconds:>9.2f}{service.freebusy_calls:>8}{rep_seconds:>9.2f}"
+    )
+    return failures
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calendars", default="100,300,1000")
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--meetings", type=int, default=12, help="average meetings per calendar")
+    parser.add_argument("--delay", type=float, default=0.05, help="fake Google round trip (s)")
+    parser.add_argument("--all-team", type=int, default=4, help="team size for the all-free mode")
+    parser.add_argument(
+        "--verify-max", type=int, default=300, help="largest size checked by brute force"
+    )
+    args = parser.parse_args()
+    print(
+        f"{args.days} days, {SLOT_MINUTES} min slots, all-free team of {args.all_team}, "
+        f"Google round trip {args.delay * 1000:.0f}ms"
+    )
+    print(
+        f"{'calendars':>9}{'periods':>9}{'any':>9}{'all':>9}{'merge any':>11}{'merge all':>11}"
+        f"{'team rq':>8}{'team s':>9}{'rep rq':>8}{'rep s':>9}"
+    )
+    failures = check_staggered()
+    for count in (int(c) for c in args.calendars.split(",")):
+        failures += run_size(
+            count, args.days, args.meetings, args.all_team, args.delay, count <= args.verify_max
+        )
+    print("ok" if not failures else "FAILED: " + "; ".join(failures))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,113 @@
+"""Benchmark: disallowed-topic matching cost per streamed delta.
+
+Streams a long assistant transcript in ``--delta-chars`` fragments and
+measures, for topic lists of increasing size:
+
+* ``regex/buffer``: the ``DISALLOWED_TOPICS_REGEX`` alternation re-run over
+  the accumulated text after every delta, which is what streaming with a
+  regex takes to catch topics split across deltas;
+* ``regex/item``: one regex search over the finished item, as the bridge
+  used to do (cost per delta amortised, but the match comes too late);
+* ``automaton``: ``topic_guard.TopicStream.feed`` on each delta.
+
+Usage::
+
+    python benchmarks/topic_guard.py --topics 10,100,1000,5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from topic_guard import TopicMatcher  # noqa: E402
+
+WORDS = (
+    "sure i can help you book a meeting today we have a few open slots this afternoon "
+    "would ten thirty work for you or would you prefer later in the day let me check "
+    "the calendar and confirm the time with you before i schedule the invite"
+).split()
+
+
+def make_topics(count: int, rng: random.Random) -> list[str]:
+    topics = set()
+    while len(topics) < count:
+        words = rng.randint(1, 3)
+        topics.add(
+            " ".join(
+                "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+                for _ in range(words)
+            )
+        )
+    return sorted(topics)
+
+
+def make_deltas(chars: int, delta_chars: int, rng: random.Random) -> list[str]:
+    words = []
+    while sum(len(w) + 1 for w in words) < chars:
+        words.append(rng.choice(WORDS))
+    text = " ".join(words)
+    return [text[i : i + delta_chars] for i in range(0, len(text), delta_chars)]
+
+
+def per_delta_us(func, deltas: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(deltas)
+        best = min(best, time.perf_counter() - started)
+    return best / len(deltas) * 1e6
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--topics", default="10,100,1000,5000")
+    parser.add_argument("--chars", type=int, default=2000, help="transcript length")
+    parser.add_argument("--delta-chars", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    rng = random.Random(7)
+    deltas = make_deltas(args.chars, args.delta_chars, rng)
+
+    print(f"{len(deltas)} deltas of ~{args.delta_chars} chars; microseconds per delta")
+    print(f"{'topics':>7}{'states':>9}{'build ms':>10}{'regex/buffer':>14}{'regex/item':>12}{'automaton':>11}")
+    for count in (int(c) for c in args.topics.split(",")):
+        topics = make_topics(count, rng)
+        pattern = re.compile("|".join(map(re.escape, topics)), re.IGNORECASE)
+        started = time.perf_counter()
+        matcher = TopicMatcher(topics)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        def regex_buffer(chunks):
+            text = ""
+            for chunk in chunks:
+                text += chunk
+                if pattern.search(text):
+                    break
+
+        def regex_item(chunks):
+            pattern.search("".join(chunks))
+
+        def automaton(chunks):
+            stream = matcher.stream()
+            for chunk in chunks:
+                if stream.feed(chunk):
+                    break
+
+        print(
+            f"{count:>7}{matcher.states:>9}{build_ms:>10.1f}"
+            f"{per_delta_us(regex_buffer, deltas, args.repeat):>14.2f}"
+            f"{per_delta_us(regex_item, deltas, args.repeat):>12.2f}"
+            f"{per_delta_us(automaton, deltas, args.repeat):>11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
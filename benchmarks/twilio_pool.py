@@ -0,0 +1,176 @@
+"""Hangup latency and event-loop blocking: per-call Client vs shared pool.
+
+Starts a local stand-in for the Twilio REST API and issues ``--hangups``
+hangups two ways: the old pattern (a new ``twilio.rest.Client`` per
+request, called synchronously inside a coroutine) and ``AsyncTwilio``.
+Reports per-hangup latency, the worst event-loop stall seen by a 5 ms
+ticker, and how many TCP connections the server accepted. With
+``--throttle-every N`` every Nth request is answered with 429 to exercise
+retries.
+
+Usage::
+
+    python benchmarks/twilio_pool.py --hangups 200 --delay 0.02
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twilio.rest import Client  # noqa: E402
+from twilio.twiml.voice_response import VoiceResponse  # noqa: E402
+
+from twilio_client import AsyncTwilio  # noqa: E402
+
+ACCOUNT_SID = "AC" + "0" * 32
+
+
+class StandInTwilio(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, delay: float, throttle_every: int):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.delay = delay
+        self.throttle_every = throttle_every
+        self.connections = 0
+        self.requests = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.requests += 1
+            throttle = (
+                self.server.throttle_every
+                and self.server.requests % self.server.throttle_every == 0
+            )
+            if throttle:
+                self.server.throttled += 1
+        time.sleep(self.server.delay)
+        if throttle:
+            self._reply(429, {"code": 20429, "message": "Too Many Requests"})
+            return
+        call_sid = self.path.rstrip("/").rsplit("/", 1)[-1].removesuffix(".json")
+        self._reply(200, {"sid": call_sid, "account_sid": ACCOUNT_SID, "status": "completed"})
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+async def _ticker(stop: asyncio.Event, stalls: list[float], interval: float = 0.005):
+    while not stop.is_set():
+        before = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - before - interval)
+
+
+async def legacy_hangup(base_url: str, call_sid: str) -> None:
+    client = Client(ACCOUNT_SID, "token")
+    client.api.base_url = base_url
+    vr = VoiceResponse()
+    vr.hangup()
+    client.calls(call_sid).update(twiml=str(vr))
+
+
+async def measure(hangup, hangups: int, concurrency: int):
+    stop = asyncio.Event()
+    stalls: list[float] = []
+    ticker = asyncio.create_task(_ticker(stop, stalls))
+    latencies: list[float] = []
+    failures = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await hangup(f"CA{i:032d}")
+            except Exception:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(hangups)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    return latencies, max(stalls, default=0.0), elapsed, failures
+
+
+def report(name: str, server: StandInTwilio, latencies, stall, elapsed, failures) -> None:
+    q = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name:<12} p50={q[49] * 1000:6.1f}ms p99={q[98] * 1000:6.1f}ms "
+        f"total={elapsed:5.2f}s max loop stall={stall * 1000:6.1f}ms "
+        f"connections={server.connections} requests={server.requests} "
+        f"throttled={server.throttled} failed={failures}"
+    )
+
+
+def run_server(delay: float, throttle_every: int) -> StandInTwilio:
+    server = StandInTwilio(delay, throttle_every)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hangups", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--delay", type=float, default=0.02, help="server latency (s)")
+    parser.add_argument("--throttle-every", type=int, default=0)
+    args = parser.parse_args()
+
+    server = run_server(args.delay, args.throttle_every)
+    result = asyncio.run(
+        measure(lambda sid: legacy_hangup(server.url, sid), args.hangups, args.concurrency)
+    )
+    report("per-call", server, *result)
+    server.shutdown()
+
+    server = run_server(args.delay, args.throttle_every)
+    pool = AsyncTwilio(
+        ACCOUNT_SID, "token", max_workers=args.concurrency, base_url=server.url
+    )
+    result = asyncio.run(measure(pool.hangup, args.hangups, args.concurrency))
+    report("pooled", server, *result)
+    pool.shutdown()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,99 @@
+"""Per-call state for the Twilio <-> OpenAI bridge.
+
+Each ``/media-stream`` connection gets its own :class:`CallContext`, and
+contexts are tracked in a :class:`CallRegistry` keyed by Twilio call SID so a
+single worker can bridge many calls at once without sharing mutable state.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from call_flow import INITIAL_STATE
+from call_recorder import CallRecorder
+from latency import CallTrace
+from leg_writer import LegWriter
+from topic_guard import TopicStream
+from vad import VoiceActivityDetector
+from transcript_sink import TranscriptSink
+
+
+@dataclass
+class CallContext:
+    """State, counters, latencies and transcripts for one bridged call."""
+
+    call_id: Optional[str] = None
+    stream_sid: Optional[str] = None
+    session_id: Optional[str] = None
+    start_ts: Optional[str] = None
+    stop_ts: Optional[str] = None
+    state: str = INITIAL_STATE
+    digits: str = ""
+    # Streaming transcript, opened on the first conversation item
+    transcript: Optional[TranscriptSink] = None
+    silence_count: int = 0
+    derailment_count: int = 0
+    # Disallowed-topic matcher state for the response being streamed
+    topics: Optional[TopicStream] = None
+    guardrail_rejects: int = 0
+    calendar_errors: int = 0
+    latencies: List[float] = field(default_factory=list)
+    speech_start_time: Optional[float] = None
+    # Local barge-in detection; playback_until estimates when Twilio
+    # finishes playing the audio sent so far
+    vad: Optional[VoiceActivityDetector] = None
+    playback_until: float = 0.0
+    barged_in: bool = False
+    openai_setup_seconds: float = 0.0
+    # Stage timestamps and latency histograms for each turn
+    trace: CallTrace = field(default_factory=CallTrace)
+    # Outgoing queues and writer tasks for each WebSocket leg
+    to_openai: Optional[LegWriter] = None
+    to_twilio: Optional[LegWriter] = None
+    # Opt-in binary recording of every inbound event
+    recorder: Optional[CallRecorder] = None
+    # Session fields last sent to the realtime socket
+    session_fields: Dict[str, object] = field(default_factory=dict)
+    session_updates: int = 0
+    session_update_bytes: int = 0
+
+
+class CallRegistry:
+    """Active calls keyed by call SID."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, CallContext] = {}
+
+    def register(self, ctx: CallContext) -> None:
+        """Track ``ctx`` under its call SID."""
+        if not ctx.call_id:
+            raise ValueError("CallContext has no call_id")
+        self._calls[ctx.call_id] = ctx
+
+    def unregister(self, call_id: Optional[str]) -> Optional[CallContext]:
+        """Stop tracking ``call_id`` and return its context, if any."""
+        if not call_id:
+            return None
+        return self._calls.pop(call_id, None)
+
+    def get(self, call_id: Optional[str]) -> Optional[CallContext]:
+        """Return the context for ``call_id`` or ``None``."""
+        if not call_id:
+            return None
+        return self._calls.get(call_id)
+
+    def only(self) -> Optional[CallContext]:
+        """Return the single active call, or ``None`` if zero or several."""
+        if len(self._calls) == 1:
+            return next(iter(self._calls.values()))
+        return None
+
+    def __contains__(self, call_id: object) -> bool:
+        return call_id in self._calls
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def __iter__(self) -> Iterator[CallContext]:
+        return iter(list(self._calls.values()))
@@ -0,0 +1,87 @@
+"""Declarative call flow and session rendering.
+
+:data:`FLOW` maps each call state to the intents that advance it, the
+intents it tolerates, and which ``session.update`` fields a transition may
+change. :func:`render_session` builds the session fields for a state and
+caches the rendered instructions, so a transition only has to diff a few
+small fields against what the realtime session already has.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, FrozenSet, Optional, Tuple
+
+INITIAL_STATE = "awaiting_greeting"
+
+
+@dataclass(frozen=True)
+class Transition:
+    """Move to ``target`` and refresh the session fields in ``updates``."""
+
+    target: str
+    updates: Tuple[str, ...] = ("state", "instructions")
+
+
+@dataclass(frozen=True)
+class State:
+    """A call state.
+
+    ``transitions`` maps an intent to the :class:`Transition` it triggers.
+    Intents in ``tolerated`` are ignored; any other intent is a state
+    violation unless ``strict`` is false.
+    """
+
+    transitions: Dict[str, Transition] = field(default_factory=dict)
+    tolerated: FrozenSet[str] = frozenset()
+    strict: bool = True
+    instructions: str = ""
+
+    def on(self, intent: str) -> Optional[Transition]:
+        """Return the transition for ``intent``, if any."""
+        return self.transitions.get(intent)
+
+    def rejects(self, intent: str) -> bool:
+        """Return True if ``intent`` violates this state."""
+        return self.strict and intent not in self.transitions and intent not in self.tolerated
+
+
+FLOW: Dict[str, State] = {
+    "awaiting_greeting": State(
+        transitions={"greeting": Transition("awaiting_date")},
+    ),
+    "awaiting_date": State(
+        transitions={"ask_date": Transition("complete")},
+        tolerated=frozenset({"greeting"}),
+    ),
+    "complete": State(strict=False),
+}
+
+
+@lru_cache(maxsize=64)
+def render_instructions(system_message: str, state: str, slots: Tuple[str, ...]) -> str:
+    """Return the instructions for ``state`` given today's ``slots``."""
+    instructions = system_message
+    extra = FLOW[state].instructions
+    if extra:
+        instructions += f"\n\n{extra}"
+    if slots:
+        formatted = "\n".join(f"- {s}" for s in slots)
+        instructions += f"\n\nToday's available slots:\n{formatted}"
+    return instructions
+
+
+def render_session(
+    system_message: str, state: str, slots: Tuple[str, ...], voice: str
+) -> Dict[str, object]:
+    """Return every ``session.update`` field for ``state``."""
+    return {
+        "input_audio_format": "g711_ulaw",
+        "output_audio_format": "g711_ulaw",
+        "voice": voice,
+        "instructions": render_instructions(system_message, state, slots),
+        "modalities": ["text", "audio"],
+        "temperature": 0.2,
+        "state": state,
+    }
@@ -0,0 +1,256 @@
+"""Compact recordings of a call's inbound events, and deterministic replay.
+
+:class:`CallRecorder` appends every message the bridge receives from Twilio
+and from OpenAI to a length-prefixed binary file. Each record is a 13-byte
+header (kind, nanoseconds since the recording started, length) followed by
+the data: raw μ-law bytes for audio frames, which would otherwise be base64
+inside JSON, and the original text for every other event.
+
+:class:`Replay` reads a recording back and provides stand-ins for the Twilio
+and OpenAI sockets that play the records to :func:`main.bridge_call` in
+their original order, either at recorded speed or as fast as possible.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import binascii
+import json
+import os
+import struct
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Set
+
+import structlog
+from fastapi.websockets import WebSocketDisconnect
+
+import codec
+
+logger = structlog.get_logger()
+
+MAGIC = b"CREC\x01"
+_HEADER = struct.Struct("<BQI")
+
+META = 0
+TWILIO_EVENT = 1
+TWILIO_MEDIA = 2
+OPENAI_EVENT = 3
+OPENAI_AUDIO = 4
+
+TWILIO = "twilio"
+OPENAI = "openai"
+_LEGS = {TWILIO_EVENT: TWILIO, TWILIO_MEDIA: TWILIO, OPENAI_EVENT: OPENAI, OPENAI_AUDIO: OPENAI}
+
+
+class CallRecorder:
+    """Append-only binary recording of the events a call receives.
+
+    Writes go through a large file buffer, so recording a frame costs a
+    base64 decode, a header pack and a memory copy on the event loop.
+    Errors stop the recording and are logged once; the call carries on.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        buffer_size: int = 256 * 1024,
+        clock: Callable[[], int] = time.monotonic_ns,
+    ):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.records = 0
+        self.failed = False
+        self._clock = clock
+        self._start = clock()
+        self._file = open(path, "wb", buffering=buffer_size)
+        self._file.write(MAGIC)
+        self._write(META, json.dumps({"started_at": time.time()}).encode())
+
+    def twilio_event(self, message: str) -> None:
+        """Record a non-media Twilio message."""
+        self._write(TWILIO_EVENT, message.encode())
+
+    def twilio_media(self, payload: str) -> None:
+        """Record a Twilio media frame's base64 ``payload`` as raw bytes."""
+        self._write(TWILIO_MEDIA, binascii.a2b_base64(payload))
+
+    def openai_event(self, message: str) -> None:
+        """Record a non-audio OpenAI event."""
+        self._write(OPENAI_EVENT, message.encode())
+
+    def openai_audio(self, delta: str) -> None:
+        """Record a ``response.audio.delta`` payload as raw bytes."""
+        self._write(OPENAI_AUDIO, binascii.a2b_base64(delta))
+
+    def close(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def _write(self, kind: int, data: bytes) -> None:
+        if self._file is None:
+            return
+        try:
+            self._file.write(_HEADER.pack(kind, self._clock() - self._start, len(data)) + data)
+            self.records += 1
+        except (OSError, ValueError) as exc:
+            self.failed = True
+            logger.error("recorder.write_failed", path=self.path, error=str(exc))
+            self.close()
+
+
+@dataclass(frozen=True)
+class Record:
+    """One recorded event."""
+
+    kind: int
+    t_ns: int
+    data: bytes
+
+    @property
+    def leg(self) -> Optional[str]:
+        return _LEGS.get(self.kind)
+
+    def message(self, stream_sid: Optional[str] = None) -> str:
+        """Return the event as the text the bridge originally received."""
+        if self.kind == TWILIO_MEDIA:
+            payload = binascii.b2a_base64(self.data, newline=False).decode("ascii")
+            return codec.twilio_media_frame(stream_sid, payload)
+        if self.kind == OPENAI_AUDIO:
+            delta = binascii.b2a_base64(self.data, newline=False).decode("ascii")
+            return '{"type":"response.audio.delta","delta":"' + delta + '"}'
+        return self.data.decode()
+
+
+def read_records(path: str) -> Iterator[Record]:
+    """Yield the records of a recording; a truncated tail is ignored."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a call recording")
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            kind, t_ns, length = _HEADER.unpack(header)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            yield Record(kind, t_ns, data)
+
+
+class Replay:
+    """Play a recording to the bridge through fake Twilio and OpenAI sockets.
+
+    ``speed`` scales the recorded timing (``1.0`` is real time); ``0``
+    replays as fast as possible. Either way each leg only receives its next
+    record once every earlier record of the other leg has been delivered,
+    so the bridge sees the original interleaving.
+    """
+
+    def __init__(self, records: List[Record], speed: float = 1.0):
+        self.records = [r for r in records if r.leg is not None]
+        self.speed = speed
+        self.twilio = ReplayTwilioSocket(self)
+        self.openai = ReplayOpenAISocket(self)
+        self._pos = 0
+        self._closed: Set[str] = set()
+        self._changed = asyncio.Event()
+        self._started: Optional[float] = None
+        self._origin = self.records[0].t_ns if self.records else 0
+
+    @classmethod
+    def from_file(cls, path: str, speed: float = 1.0) -> "Replay":
+        return cls(list(read_records(path)), speed)
+
+    async def next(self, leg: str) -> Optional[Record]:
+        """Return ``leg``'s next record when it is due, or ``None`` at the end."""
+        while True:
+            while self._pos < len(self.records) and self.records[self._pos].leg in self._closed:
+                self._pos += 1
+            if self._pos >= len(self.records) or leg in self._closed:
+                return None
+            record = self.records[self._pos]
+            if record.leg == leg:
+                break
+            await self._changed.wait()
+        if self.speed > 0:
+            loop = asyncio.get_running_loop()
+            if self._started is None:
+                self._started = loop.time()
+            due = self._started + (record.t_ns - self._origin) / 1e9 / self.speed
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        self._pos += 1
+        self._notify()
+        return record
+
+    def close(self, leg: str) -> None:
+        self._closed.add(leg)
+        self._notify()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+
+class ReplayTwilioSocket:
+    """Stand-in for the Twilio media-stream WebSocket during a replay."""
+
+    def __init__(self, replay: Replay):
+        self._replay = replay
+        self.stream_sid: Optional[str] = None
+        self.sent: List[str] = []
+
+    async def iter_text(self):
+        while True:
+            record = await self._replay.next(TWILIO)
+            if record is None:
+                break
+            if record.kind == TWILIO_EVENT and self.stream_sid is None:
+                event = codec.loads(record.data)
+                if event.get("event") == "start":
+                    self.stream_sid = event["start"].get("streamSid")
+            yield record.message(self.stream_sid)
+        self._replay.close(TWILIO)
+        raise WebSocketDisconnect()
+
+    async def send_text(self, data: str) -> None:
+        self.sent.append(data)
+
+    async def close(self) -> None:
+        self._replay.close(TWILIO)
+
+
+class ReplayOpenAISocket:
+    """Stand-in for the OpenAI Realtime WebSocket during a replay."""
+
+    def __init__(self, replay: Replay):
+        self._replay = replay
+        self.open = True
+        self.sent: List[str] = []
+        self._closed = asyncio.Event()
+
+    async def send(self, message: str) -> None:
+        self.sent.append(message)
+
+    async def close(self) -> None:
+        self.open = False
+        self._closed.set()
+        self._replay.close(OPENAI)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        record = await self._replay.next(OPENAI)
+        if record is None:
+            # Like the real socket, stay open until the bridge closes it
+            await self._closed.wait()
+            raise StopAsyncIteration
+        return record.message()
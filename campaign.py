@@ -0,0 +1,398 @@
+"""Rate-paced bulk outbound dialing.
+
+A campaign is a list of numbers to call. One :class:`Dialer` per process
+dials every campaign's numbers from a shared schedule, capped by
+
+* a :class:`TokenBucket` of outbound calls per second, matching Twilio's
+  per-account CPS limit, and
+* the number of live calls: active ``/media-stream`` sessions plus calls
+  this dialer placed that are still ringing.
+
+Final call statuses arrive through Twilio's status callback and are passed
+to :meth:`Dialer.call_status`. ``busy`` and ``no-answer`` are retried after
+``retry_delay`` until ``max_attempts`` is reached. Campaigns live in memory
+only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import heapq
+import io
+import itertools
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger()
+
+PENDING = "pending"
+DIALING = "dialing"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELED = "canceled"
+
+# Final Twilio call statuses worth another attempt
+RETRY_STATUSES = frozenset({"busy", "no-answer"})
+FINAL_STATUSES = frozenset({"completed", "busy", "no-answer", "failed", "canceled"})
+
+_NUMBER_COLUMNS = ("to", "phone", "phone_number", "number")
+
+Sleep = Callable[[float], Awaitable[Any]]
+
+
+def parse_numbers(body: str, content_type: str = "") -> List[str]:
+    """Return the phone numbers in a CSV or JSON campaign body.
+
+    JSON may be a list of numbers, a list of objects with a ``to`` or
+    ``phone`` key, or an object with a ``numbers`` list. CSV uses the
+    ``to``/``phone``/``phone_number``/``number`` column when there is a
+    header, else the first column. Blank entries and duplicates are dropped.
+    """
+    text = body.strip()
+    if "json" in content_type or text[:1] in ("[", "{"):
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("numbers", [])
+        if not isinstance(data, list):
+            raise ValueError("Expected a JSON list of numbers")
+        entries = [_entry_number(entry) for entry in data]
+    else:
+        rows = [row for row in csv.reader(io.StringIO(text)) if row]
+        column = 0
+        if rows:
+            header = [cell.strip().lower() for cell in rows[0]]
+            named = [name for name in _NUMBER_COLUMNS if name in header]
+            if named:
+                column = header.index(named[0])
+                rows = rows[1:]
+            elif not _looks_like_number(rows[0][0]):
+                rows = rows[1:]
+        entries = [row[column] if column < len(row) else "" for row in rows]
+    return list(dict.fromkeys(e.strip() for e in entries if e and e.strip()))
+
+
+def _entry_number(entry: Any) -> str:
+    if isinstance(entry, dict):
+        for name in _NUMBER_COLUMNS:
+            if entry.get(name):
+                return str(entry[name])
+        return ""
+    return str(entry)
+
+
+def _looks_like_number(cell: str) -> bool:
+    return any(ch.isdigit() for ch in cell)
+
+
+# Slack for float rounding in the refill, so a wait of exactly 1/rate
+# always yields a token
+_EPSILON = 1e-9
+
+
+class TokenBucket:
+    """Token bucket refilled at ``rate`` tokens per second up to ``burst``."""
+
+    def __init__(self, rate: float, burst: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available (``0`` if one is now)."""
+        self._refill()
+        return 0.0 if self._tokens >= 1 - _EPSILON else (1 - self._tokens) / self.rate
+
+    def take(self) -> bool:
+        """Take a token if one is available."""
+        self._refill()
+        if self._tokens >= 1 - _EPSILON:
+            self._tokens = max(self._tokens - 1, 0.0)
+            return True
+        return False
+
+
+@dataclass
+class Target:
+    """One number of a campaign and its dialing history."""
+
+    to: str
+    status: str = PENDING
+    attempts: int = 0
+    call_sid: Optional[str] = None
+    last_result: Optional[str] = None
+    next_at: float = 0.0
+    dialed_at: float = 0.0
+    seen_live: bool = False
+
+
+@dataclass
+class Campaign:
+    """A list of numbers dialed by the :class:`Dialer`."""
+
+    targets: List[Target]
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    created_at: float = 0.0
+    finished_at: Optional[float] = None
+    canceled: bool = False
+    retries: int = 0
+
+    @property
+    def done(self) -> bool:
+        return all(t.status in (COMPLETED, FAILED, CANCELED) for t in self.targets)
+
+    def progress(self) -> Dict[str, Any]:
+        """Counts by status and dialing results, for the progress endpoint."""
+        counts = {PENDING: 0, DIALING: 0, COMPLETED: 0, FAILED: 0, CANCELED: 0}
+        results: Dict[str, int] = {}
+        for target in self.targets:
+            counts[target.status] += 1
+            if target.last_result:
+                results[target.last_result] = results.get(target.last_result, 0) + 1
+        return {
+            "campaign_id": self.id,
+            "total": len(self.targets),
+            **counts,
+            "attempts": sum(t.attempts for t in self.targets),
+            "retries": self.retries,
+            "results": results,
+            "done": self.done,
+        }
+
+
+class Dialer:
+    """Shared, paced dialing schedule for all campaigns.
+
+    Parameters
+    ----------
+    create_call: coroutine function
+        ``create_call(to)`` places a call and returns its SID.
+    calls: container
+        Active calls; supports ``len()`` and ``call_sid in calls``, e.g.
+        :class:`call_context.CallRegistry`.
+    cps: float
+        Outbound calls per second.
+    max_live: int
+        Cap on active calls plus calls this dialer placed that are ringing.
+    max_attempts: int
+        Attempts per number, including the first.
+    retry_delay: float
+        Seconds before a busy or unanswered number is dialed again.
+    ring_timeout: float
+        Seconds after which a call that neither connected nor reported a
+        final status is treated as unanswered.
+    poll_interval: float
+        Seconds between checks while waiting for live-call capacity.
+    clock, sleep:
+        Time source and sleep coroutine; a simulated pair lets tests run a
+        campaign without waiting.
+    """
+
+    def __init__(
+        self,
+        create_call: Callable[[str], Awaitable[str]],
+        calls: Any,
+        *,
+        cps: float = 1.0,
+        max_live: int = 10,
+        max_attempts: int = 3,
+        retry_delay: float = 300.0,
+        ring_timeout: float = 90.0,
+        poll_interval: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Sleep = asyncio.sleep,
+    ):
+        self.create_call = create_call
+        self.calls = calls
+        self.max_live = max_live
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.ring_timeout = ring_timeout
+        self.poll_interval = poll_interval
+        self.bucket = TokenBucket(cps, 1.0, clock)
+        self._clock = clock
+        self._sleep = sleep
+        self.campaigns: Dict[str, Campaign] = {}
+        # (next_at, seq, campaign, target)
+        self._schedule: List[Tuple[float, int, Campaign, Target]] = []
+        self._seq = itertools.count()
+        self._outstanding: Dict[str, Tuple[Campaign, Target]] = {}
+        self._in_flight = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.dialed = 0
+        self.errors = 0
+
+    def submit(self, numbers: List[str]) -> Campaign:
+        """Queue a campaign for ``numbers`` and return it."""
+        now = self._clock()
+        campaign = Campaign([Target(to) for to in numbers], created_at=now)
+        self.campaigns[campaign.id] = campaign
+        for target in campaign.targets:
+            self._push(campaign, target, now)
+        logger.info("campaign.submitted", campaign_id=campaign.id, total=len(numbers))
+        self._wakeup.set()
+        return campaign
+
+    def cancel(self, campaign_id: str) -> Optional[Campaign]:
+        """Stop dialing a campaign's pending numbers; live calls carry on."""
+        campaign = self.campaigns.get(campaign_id)
+        if campaign is None:
+            return None
+        campaign.canceled = True
+        for target in campaign.targets:
+            if target.status == PENDING:
+                target.status = CANCELED
+        self._check_finished(campaign)
+        return campaign
+
+    def call_status(self, call_sid: str, status: str) -> bool:
+        """Apply a Twilio status callback; return whether the call was ours."""
+        if status not in FINAL_STATUSES:
+            return call_sid in self._outstanding
+        entry = self._outstanding.pop(call_sid, None)
+        if entry is None:
+            return False
+        campaign, target = entry
+        self._finish(campaign, target, status)
+        return True
+
+    def live(self) -> int:
+        """Active calls plus calls this dialer placed that have not connected."""
+        ringing = sum(1 for sid in self._outstanding if sid not in self.calls)
+        return len(self.calls) + ringing + self._in_flight
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "campaigns": len(self.campaigns),
+            "scheduled": len(self._schedule),
+            "outstanding": len(self._outstanding),
+            "live": self.live(),
+            "dialed": self.dialed,
+            "errors": self.errors,
+        }
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self) -> None:
+        """Dial scheduled numbers as rate and live-call limits allow."""
+        while True:
+            self._sweep()
+            if not self._schedule:
+                if not self._outstanding:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                else:
+                    await self._sleep(self.poll_interval)
+                continue
+            next_at, _, campaign, target = self._schedule[0]
+            if target.status != PENDING:
+                heapq.heappop(self._schedule)
+                continue
+            now = self._clock()
+            if next_at > now:
+                await self._sleep(min(next_at - now, self.poll_interval))
+                continue
+            if self.live() >= self.max_live:
+                await self._sleep(self.poll_interval)
+                continue
+            delay = self.bucket.delay()
+            if delay > 0:
+                await self._sleep(delay)
+                continue
+            self.bucket.take()
+            heapq.heappop(self._schedule)
+            target.status = DIALING
+            target.attempts += 1
+            target.dialed_at = now
+            self._in_flight += 1
+            asyncio.ensure_future(self._dial(campaign, target))
+            # Let the dial start before checking capacity again
+            await asyncio.sleep(0)
+
+    async def _dial(self, campaign: Campaign, target: Target) -> None:
+        try:
+            call_sid = await self.create_call(target.to)
+        except Exception as exc:
+            self.errors += 1
+            logger.error(
+                "campaign.dial_failed", campaign_id=campaign.id, to=target.to, error=str(exc)
+            )
+            self._finish(campaign, target, "error")
+            return
+        finally:
+            self._in_flight -= 1
+        self.dialed += 1
+        target.call_sid = call_sid
+        self._outstanding[call_sid] = (campaign, target)
+        logger.info(
+            "campaign.dialed",
+            campaign_id=campaign.id,
+            call_id=call_sid,
+            to=target.to,
+            attempt=target.attempts,
+        )
+
+    def _finish(self, campaign: Campaign, target: Target, result: str) -> None:
+        target.last_result = result
+        retry = result in RETRY_STATUSES or result == "error"
+        if retry and target.attempts < self.max_attempts and not campaign.canceled:
+            campaign.retries += 1
+            target.status = PENDING
+            self._push(campaign, target, self._clock() + self.retry_delay)
+            self._wakeup.set()
+        elif result == "completed":
+            target.status = COMPLETED
+        elif campaign.canceled:
+            target.status = CANCELED
+        else:
+            target.status = FAILED
+        self._check_finished(campaign)
+
+    def _check_finished(self, campaign: Campaign) -> None:
+        if campaign.finished_at is None and campaign.done:
+            campaign.finished_at = self._clock()
+            logger.info("campaign.finished", **campaign.progress())
+
+    def _push(self, campaign: Campaign, target: Target, at: float) -> None:
+        target.next_at = at
+        heapq.heappush(self._schedule, (at, next(self._seq), campaign, target))
+
+    def _sweep(self) -> None:
+        """Settle calls whose status callback was missed."""
+        now = self._clock()
+        for call_sid, (campaign, target) in list(self._outstanding.items()):
+            if call_sid in self.calls:
+                target.seen_live = True
+            elif target.seen_live:
+                # Connected and has since ended
+                del self._outstanding[call_sid]
+                self._finish(campaign, target, "completed")
+            elif now - target.dialed_at > self.ring_timeout:
+                del self._outstanding[call_sid]
+                self._finish(campaign, target, "no-answer")
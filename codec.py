@@ -0,0 +1,106 @@
+"""Message codec for the Twilio and OpenAI WebSocket legs.
+
+Uses ``orjson`` when it is installed and falls back to the standard library
+``json`` module otherwise. Audio frames are the bulk of the traffic on both
+legs, so they are built from string templates, and their routing keys and
+payloads are read by scanning the text instead of decoding the whole
+message. Base64 payloads never contain quotes or backslashes, which keeps
+both shortcuts safe.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from functools import lru_cache
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+_EVENT_RE = re.compile(r'"event"\s*:\s*"([^"]*)"')
+_TYPE_RE = re.compile(r'"type"\s*:\s*"([^"]*)"')
+
+_APPEND_PREFIX = '{"type":"input_audio_buffer.append","audio":"'
+_MEDIA_PREFIX = '{"event":"media","streamSid":'
+_MEDIA_MIDDLE = ',"media":{"payload":"'
+
+
+if orjson is not None:
+
+    def dumps(obj: Any) -> str:
+        """Serialize ``obj`` to a compact JSON string."""
+        return orjson.dumps(obj).decode("utf-8")
+
+    def loads(data: str | bytes) -> Any:
+        """Parse a JSON document."""
+        return orjson.loads(data)
+
+else:
+
+    def dumps(obj: Any) -> str:
+        """Serialize ``obj`` to a compact JSON string."""
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+    def loads(data: str | bytes) -> Any:
+        """Parse a JSON document."""
+        return json.loads(data)
+
+
+def peek_event(message: str) -> Optional[str]:
+    """Return the ``event`` of a Twilio message without parsing it."""
+    match = _EVENT_RE.search(message)
+    return match.group(1) if match else None
+
+
+def peek_type(message: str) -> Optional[str]:
+    """Return the ``type`` of an OpenAI event without parsing it.
+
+    Realtime events put ``type`` before any nested object, so the first
+    match is the top-level event type.
+    """
+    match = _TYPE_RE.search(message)
+    return match.group(1) if match else None
+
+
+def peek_string(message: str, key: str) -> Optional[str]:
+    """Return the first string value stored under ``key`` in ``message``.
+
+    Only meant for escape-free values such as base64 audio payloads;
+    ``None`` is returned when the key is missing, the value is not a
+    string or it contains escapes.
+    """
+    marker = '"' + key + '"'
+    start = message.find(marker)
+    if start < 0:
+        return None
+    start += len(marker)
+    quote = message.find('"', start)
+    if quote < 0 or message[start:quote].strip() != ":":
+        return None
+    end = message.find('"', quote + 1)
+    if end < 0:
+        return None
+    value = message[quote + 1:end]
+    if "\\" in value:
+        return None
+    return value
+
+
+def audio_append_frame(payload: str) -> str:
+    """Return an ``input_audio_buffer.append`` event for a base64 payload."""
+    return _APPEND_PREFIX + payload + '"}'
+
+
+@lru_cache(maxsize=1024)
+def _twilio_media_prefix(stream_sid: Optional[str]) -> str:
+    return _MEDIA_PREFIX + dumps(stream_sid) + _MEDIA_MIDDLE
+
+
+def twilio_media_frame(stream_sid: Optional[str], payload: str) -> str:
+    """Return a Twilio ``media`` message for a base64 payload."""
+    return _twilio_media_prefix(stream_sid) + payload + '"}}'
@@ -1,14 +1,39 @@
+"""Call summary storage.
+
+Summaries are written as one batched upsert (``INSERT ... ON CONFLICT DO
+UPDATE`` executed over all rows) on SQLite and PostgreSQL, and fall back to
+``Session.merge`` on other databases. SQLite connections run in WAL mode
+so the query endpoint can read while a batch is being written.
+:func:`save_call_summaries` is called from the
+:class:`~persistence.CallWriter` thread; :class:`AsyncCallStore` runs
+paginated queries on a separate worker thread for async callers.
+"""
+
 from __future__ import annotations
 
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-from sqlalchemy import Column, DateTime, Float, String, Text, create_engine
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    Index,
+    String,
+    Text,
+    and_,
+    create_engine,
+    event,
+    or_,
+    select,
+)
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./calls.db")
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(bind=engine)
 
 Base = declarative_base()
 
@@ -19,13 +44,42 @@ class CallSummary(Base):
     id = Column(String, primary_key=True, index=True)
     duration = Column(Float, nullable=False)
     outcome = Column(Text)
-    scheduled_time = Column(DateTime)
+    scheduled_time = Column(DateTime, index=True)
     transcript_path = Column(String)
 
+    # Serves outcome lookups alone and outcome plus date range together
+    __table_args__ = (
+        Index("ix_call_summaries_outcome_scheduled_time", "outcome", "scheduled_time"),
+    )
+
+
+def _enable_wal(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # Durable at checkpoints; a crash can lose only the last transactions
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def make_engine(url: str, *, wal: bool = True) -> Engine:
+    """Create an engine for ``url``; SQLite connections use WAL mode."""
+    engine = create_engine(url)
+    if wal and engine.dialect.name == "sqlite" and ":memory:" not in url:
+        event.listen(engine, "connect", _enable_wal)
+    return engine
+
+
+engine = make_engine(DATABASE_URL)
+SessionLocal = sessionmaker(bind=engine)
 
-def init_db() -> None:
-    """Create database tables if they don't exist."""
-    Base.metadata.create_all(bind=engine)
+
+def init_db(bind: Optional[Engine] = None) -> None:
+    """Create database tables and indexes if they don't exist."""
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    # create_all skips indexes of tables created before they were declared
+    for index in CallSummary.__table__.indexes:
+        index.create(bind=bind, checkfirst=True)
 
 
 def save_call_summary(
@@ -36,16 +90,148 @@ def save_call_summary(
     transcript_path: str | None,
 ) -> None:
     """Persist a call summary record."""
-    session = SessionLocal()
+    save_call_summaries(
+        [
+            {
+                "call_id": call_id,
+                "duration": duration,
+                "outcome": outcome,
+                "scheduled_time": scheduled_time,
+                "transcript_path": transcript_path,
+            }
+        ]
+    )
+
+
+def save_call_summaries(rows: Iterable[dict], bind: Optional[Engine] = None) -> int:
+    """Upsert many call summaries in one transaction and return the count.
+
+    Each row takes the keyword arguments of :func:`save_call_summary`. A
+    call ID repeated in ``rows`` keeps its last row.
+    """
+    bind = bind or engine
+    values = {}
+    for row in rows:
+        values[row["call_id"]] = {
+            "id": row["call_id"],
+            "duration": row["duration"],
+            "outcome": row.get("outcome"),
+            "scheduled_time": row.get("scheduled_time"),
+            "transcript_path": row.get("transcript_path"),
+        }
+    if not values:
+        return 0
+    records = list(values.values())
+    insert = _dialect_insert(bind.dialect.name)
+    if insert is None:
+        _merge(bind, records)
+        return len(records)
+    table = CallSummary.__table__
+    # One cached statement executed over every row, rather than a
+    # multi-VALUES statement that is recompiled for each batch size
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={name: stmt.excluded[name] for name in records[0] if name != "id"},
+    )
+    with bind.begin() as conn:
+        conn.execute(stmt, records)
+    return len(records)
+
+
+def _dialect_insert(dialect: str):
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert
+
+
+def _merge(bind: Engine, records: List[dict]) -> None:
+    session = sessionmaker(bind=bind)()
     try:
-        summary = CallSummary(
-            id=call_id,
-            duration=duration,
-            outcome=outcome,
-            scheduled_time=scheduled_time,
-            transcript_path=transcript_path,
-        )
-        session.merge(summary)
+        for record in records:
+            session.merge(CallSummary(**record))
         session.commit()
     finally:
         session.close()
+
+
+def query_call_summaries(
+    *,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    outcome: Optional[str] = None,
+    limit: int = 50,
+    after: Optional[Tuple[datetime, str]] = None,
+    bind: Optional[Engine] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[Tuple[datetime, str]]]:
+    """Return one page of summaries ordered by scheduled time and call ID.
+
+    ``start`` is inclusive and ``end`` exclusive. Pages are keyset
+    paginated: pass the returned key as ``after`` to get the next page; it
+    is ``None`` on the last page. Summaries without a scheduled time are
+    not listed.
+    """
+    bind = bind or engine
+    table = CallSummary.__table__
+    conditions = [table.c.scheduled_time.isnot(None)]
+    if start is not None:
+        conditions.append(table.c.scheduled_time >= start)
+    if end is not None:
+        conditions.append(table.c.scheduled_time < end)
+    if outcome is not None:
+        conditions.append(table.c.outcome == outcome)
+    if after is not None:
+        after_time, after_id = after
+        conditions.append(
+            or_(
+                table.c.scheduled_time > after_time,
+                and_(table.c.scheduled_time == after_time, table.c.id > after_id),
+            )
+        )
+    stmt = (
+        select(table)
+        .where(*conditions)
+        .order_by(table.c.scheduled_time, table.c.id)
+        .limit(limit + 1)
+    )
+    with bind.connect() as conn:
+        rows = [dict(row._mapping) for row in conn.execute(stmt)]
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_key = (rows[-1]["scheduled_time"], rows[-1]["id"])
+    return rows, next_key
+
+
+class AsyncCallStore:
+    """Async, read-only facade over the summary table.
+
+    Queries run on their own worker thread, so a slow disk never blocks the
+    event loop. Summaries are written by :class:`persistence.CallWriter` on
+    its thread; in WAL mode these reads do not wait for its batches.
+    """
+
+    def __init__(self, bind: Optional[Engine] = None):
+        self.bind = bind or engine
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+        return self._executor
+
+    async def _run(self, func, *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), lambda: func(*args, **kwargs))
+
+    async def query(self, **kwargs: Any):
+        """Async :func:`query_call_summaries`."""
+        return await self._run(query_call_summaries, bind=self.bind, **kwargs)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
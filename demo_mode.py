@@ -1,5 +1,4 @@
 import asyncio
-import json
 import base64
 import os
 import audioop
@@ -9,6 +8,8 @@ import websockets
 import structlog
 from dotenv import load_dotenv
 
+import codec
+
 
 def load_prompt(file_name: str) -> str:
     path = os.path.join(os.path.dirname(__file__), "prompts", f"{file_name}.txt")
@@ -46,7 +47,7 @@ async def send_session_update(ws):
             "temperature": 0.2,
         },
     }
-    await ws.send(json.dumps(session_update))
+    await ws.send(codec.dumps(session_update))
 
 
 def encode_chunk(data: bytes) -> str:
@@ -91,17 +92,14 @@ async def demo_conversation():
                 async def sender():
                     while True:
                         chunk = await q.get()
-                        payload = {
-                            "type": "input_audio_buffer.append",
-                            "audio": encode_chunk(chunk),
-                        }
-                        await ws.send(json.dumps(payload))
+                        await ws.send(codec.audio_append_frame(encode_chunk(chunk)))
 
                 async def receiver():
                     async for message in ws:
-                        resp = json.loads(message)
-                        if resp["type"] == "response.audio.delta" and resp.get("data"):
-                            out.write(decode_chunk(resp["data"]))
+                        if codec.peek_type(message) == "response.audio.delta":
+                            delta = codec.peek_string(message, "delta")
+                            if delta:
+                                out.write(decode_chunk(delta))
 
                 await asyncio.gather(sender(), receiver())
 
@@ -1,21 +1,185 @@
 """Google Calendar helper module.
 
 Provides authentication using a service account and utility functions
-for querying free time slots and creating events.
+for querying free time slots and creating events. Whole-day slot lookups,
+for one calendar or a team, are cached in :data:`SLOT_CACHE` and
+invalidated when an event is booked.
+:func:`team_free_slots` finds the slots of many calendars at once: their
+busy periods come from one freebusy request per 50 calendars and are
+walked together in one pass over their sorted periods.
+:class:`AsyncCalendar` runs the blocking API calls on a bounded thread pool
+so async handlers never wait on Google's HTTP round trips.
 """
 
 from __future__ import annotations
 
+import asyncio
 import json
 import os
-from datetime import datetime, timedelta
-from typing import List, Tuple
+import threading
+import time
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Mapping, Optional, Sequence, Tuple
 
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 
+from latency import LatencyHistogram
+
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
-_SERVICE = None
+_CREDENTIALS = None
+_CREDENTIALS_LOCK = threading.Lock()
+# googleapiclient services wrap httplib2, which is not thread-safe, so each
+# executor thread builds its own service from the shared credentials.
+_LOCAL = threading.local()
+
+Slot = Tuple[datetime, datetime]
+# Slot start and end plus the calendars free for all of it
+TeamSlot = Tuple[datetime, datetime, Tuple[str, ...]]
+
+# Google answers at most 50 calendars per freebusy query
+FREEBUSY_MAX_CALENDARS = 50
+
+# Team availability modes: someone is free (round-robin) or everyone is
+ANY_FREE = "any"
+ALL_FREE = "all"
+TEAM_MODES = (ANY_FREE, ALL_FREE)
+
+
+class SlotCache:
+    """TTL cache of free slots keyed by calendar ID and day.
+
+    Team slots are cached too, keyed by the team's calendars, availability
+    mode and day. Entries expire after ``ttl`` seconds and are dropped
+    immediately when :func:`create_event` books time on that calendar, or
+    one of the team's calendars, and day.
+    """
+
+    def __init__(self, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: Dict[Tuple[str, date, int], Tuple[float, List[Slot]]] = {}
+        self._team_entries: Dict[
+            Tuple[Tuple[str, ...], str, date, int], Tuple[float, List[TeamSlot]]
+        ] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, calendar_id: str, day: date, slot_minutes: int = 30) -> Optional[List[Slot]]:
+        """Return cached slots or ``None`` when missing or expired."""
+        return self._lookup(self._entries, (calendar_id, day, slot_minutes))
+
+    def get_team(
+        self, calendar_ids: Tuple[str, ...], day: date, mode: str, slot_minutes: int = 30
+    ) -> Optional[List[TeamSlot]]:
+        """Return cached team slots or ``None`` when missing or expired."""
+        return self._lookup(self._team_entries, (calendar_ids, mode, day, slot_minutes))
+
+    def _lookup(self, entries: dict, key: tuple) -> Optional[list]:
+        with self._lock:
+            entry = entries.get(key)
+            if entry is not None and self._clock() < entry[0]:
+                self.hits += 1
+                return list(entry[1])
+            if entry is not None:
+                del entries[key]
+            self.misses += 1
+            return None
+
+    def generation(self, calendar_id: str) -> int:
+        """Return a counter bumped whenever ``calendar_id`` is invalidated."""
+        with self._lock:
+            return self._generations.get(calendar_id, 0)
+
+    def team_generation(self, calendar_ids: Iterable[str]) -> int:
+        """Return a counter that grows whenever one of ``calendar_ids`` is invalidated."""
+        with self._lock:
+            return sum(self._generations.get(c, 0) for c in calendar_ids)
+
+    def put(
+        self,
+        calendar_id: str,
+        day: date,
+        slots: List[Slot],
+        slot_minutes: int = 30,
+        *,
+        generation: Optional[int] = None,
+    ) -> None:
+        """Store ``slots`` for ``calendar_id`` on ``day``.
+
+        When ``generation`` is given the entry is discarded if the calendar
+        was invalidated after the lookup started, so a booking racing an
+        in-flight freebusy query never leaves stale slots behind.
+        """
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generations.get(calendar_id, 0):
+                return
+            self._entries[(calendar_id, day, slot_minutes)] = (
+                self._clock() + self.ttl,
+                list(slots),
+            )
+
+    def put_team(
+        self,
+        calendar_ids: Tuple[str, ...],
+        day: date,
+        mode: str,
+        slots: List[TeamSlot],
+        slot_minutes: int = 30,
+        *,
+        generation: Optional[int] = None,
+    ) -> None:
+        """Store team ``slots`` on ``day``; ``generation`` is as for :meth:`put`."""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            current = sum(self._generations.get(c, 0) for c in calendar_ids)
+            if generation is not None and generation != current:
+                return
+            self._team_entries[(calendar_ids, mode, day, slot_minutes)] = (
+                self._clock() + self.ttl,
+                list(slots),
+            )
+
+    def invalidate(self, calendar_id: str, day: Optional[date] = None) -> None:
+        """Drop entries for ``calendar_id``, and teams including it, optionally only for ``day``."""
+        with self._lock:
+            stale = [
+                key
+                for key in self._entries
+                if key[0] == calendar_id and (day is None or key[1] == day)
+            ]
+            for key in stale:
+                del self._entries[key]
+            stale_teams = [
+                key
+                for key in self._team_entries
+                if calendar_id in key[0] and (day is None or key[2] == day)
+            ]
+            for key in stale_teams:
+                del self._team_entries[key]
+            self.invalidations += len(stale) + len(stale_teams)
+            self._generations[calendar_id] = self._generations.get(calendar_id, 0) + 1
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current entry counts."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "team_entries": len(self._team_entries),
+            }
+
+
+SLOT_CACHE = SlotCache(float(os.getenv("SLOT_CACHE_TTL", "60")))
 
 
 def _load_credentials() -> service_account.Credentials:
@@ -35,12 +199,16 @@ def _load_credentials() -> service_account.Credentials:
 
 
 def get_service():
-    """Return an authenticated Calendar API service instance."""
-    global _SERVICE
-    if _SERVICE is None:
-        creds = _load_credentials()
-        _SERVICE = build("calendar", "v3", credentials=creds)
-    return _SERVICE
+    """Return an authenticated Calendar API service for the calling thread."""
+    global _CREDENTIALS
+    service = getattr(_LOCAL, "service", None)
+    if service is None:
+        with _CREDENTIALS_LOCK:
+            if _CREDENTIALS is None:
+                _CREDENTIALS = _load_credentials()
+        service = build("calendar", "v3", credentials=_CREDENTIALS)
+        _LOCAL.service = service
+    return service
 
 
 def _parse_google_dt(value: str) -> datetime:
@@ -81,6 +249,17 @@ def list_free_slots(
         ( _parse_google_dt(p["start"]), _parse_google_dt(p["end"]) )
         for p in busy_periods
     ]
+    return _walk_slots(start, end, busy_periods, slot_minutes)
+
+
+def _walk_slots(
+    start: datetime, end: datetime, busy_periods: Sequence[Slot], slot_minutes: int
+) -> List[Slot]:
+    """Return ``slot_minutes`` slots between ``start`` and ``end``.
+
+    Slots avoid the sorted ``busy_periods``; the slot after a busy period
+    starts where it ends.
+    """
     slots = []
     slot_delta = timedelta(minutes=slot_minutes)
     current = start
@@ -98,6 +277,183 @@ def list_free_slots(
     return slots
 
 
+def query_busy(
+    calendar_ids: Sequence[str], start: datetime, end: datetime
+) -> Dict[str, List[Slot]]:
+    """Return the busy periods of each calendar between ``start`` and ``end``.
+
+    Calendars are sent :data:`FREEBUSY_MAX_CALENDARS` per freebusy request.
+    A calendar Google reports errors for, e.g. one not shared with the
+    service account, is busy for the whole range.
+    """
+    ids = list(dict.fromkeys(calendar_ids))
+    busy: Dict[str, List[Slot]] = {}
+    for i in range(0, len(ids), FREEBUSY_MAX_CALENDARS):
+        busy.update(_query_busy_chunk(ids[i : i + FREEBUSY_MAX_CALENDARS], start, end))
+    return busy
+
+
+def _query_busy_chunk(
+    calendar_ids: Sequence[str], start: datetime, end: datetime
+) -> Dict[str, List[Slot]]:
+    service = get_service()
+    body = {
+        "timeMin": start.isoformat(),
+        "timeMax": end.isoformat(),
+        "items": [{"id": calendar_id} for calendar_id in calendar_ids],
+    }
+    response = service.freebusy().query(body=body).execute()
+    calendars = response.get("calendars", {})
+    busy = {}
+    for calendar_id in calendar_ids:
+        entry = calendars.get(calendar_id)
+        if entry is None or entry.get("errors"):
+            busy[calendar_id] = [(start, end)]
+            continue
+        busy[calendar_id] = [
+            (_parse_google_dt(p["start"]), _parse_google_dt(p["end"]))
+            for p in entry.get("busy", [])
+        ]
+    return busy
+
+
+def merge_intervals(periods: Iterable[Slot]) -> List[Slot]:
+    """Return the union of ``periods`` as sorted, non-overlapping intervals."""
+    merged: List[Slot] = []
+    for start, end in sorted(periods):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _walk_team_slots(
+    start: datetime, end: datetime, busy: Sequence[List[Slot]], slot_minutes: int
+) -> List[Slot]:
+    """Return ``slot_minutes`` slots for which at least one calendar of ``busy`` is free.
+
+    ``busy`` holds each calendar's merged periods. When every calendar is
+    busy during a slot, the walk resumes at the earliest end of the periods
+    blocking it, as :func:`_walk_slots` does for one calendar.
+    """
+    slots = []
+    slot_delta = timedelta(minutes=slot_minutes)
+    positions = [0] * len(busy)
+    current = start
+    while current + slot_delta <= end:
+        slot_end = current + slot_delta
+        resume = None
+        for k, periods in enumerate(busy):
+            idx = positions[k]
+            while idx < len(periods) and periods[idx][1] <= current:
+                idx += 1
+            positions[k] = idx
+            if idx == len(periods) or periods[idx][0] >= slot_end:
+                break
+            if resume is None or periods[idx][1] < resume:
+                resume = periods[idx][1]
+        else:
+            current = resume
+            continue
+        slots.append((current, slot_end))
+        current = slot_end
+    return slots
+
+
+def _free_calendars(
+    calendar_ids: Sequence[str], busy: Sequence[List[Slot]], slots: Sequence[Slot]
+) -> List[Tuple[str, ...]]:
+    """Return, for each slot, the calendars with no busy period overlapping it."""
+    free: List[List[str]] = [[] for _ in slots]
+    for calendar_id, periods in zip(calendar_ids, busy):
+        idx = 0
+        for k, (start, end) in enumerate(slots):
+            while idx < len(periods) and periods[idx][1] <= start:
+                idx += 1
+            if idx == len(periods) or periods[idx][0] >= end:
+                free[k].append(calendar_id)
+    return [tuple(ids) for ids in free]
+
+
+def free_slots_from_busy(
+    busy: Mapping[str, Sequence[Slot]],
+    start: datetime,
+    end: datetime,
+    *,
+    mode: str = ANY_FREE,
+    slot_minutes: int = 30,
+) -> List[TeamSlot]:
+    """Return team slots between ``start`` and ``end`` from per-calendar busy periods.
+
+    With :data:`ANY_FREE` a slot is offered when at least one calendar is
+    free for all of it; with :data:`ALL_FREE` only when every calendar is.
+    Each slot lists the calendars free for it, in ``busy`` order.
+    """
+    if mode not in TEAM_MODES:
+        raise ValueError(f"Unknown availability mode {mode!r}; expected one of {TEAM_MODES}")
+    if not busy:
+        return []
+    calendar_ids = list(busy)
+    merged = [merge_intervals(periods) for periods in busy.values()]
+    if mode == ALL_FREE:
+        blocked = merge_intervals(period for periods in merged for period in periods)
+        everyone = tuple(calendar_ids)
+        slots = _walk_slots(start, end, blocked, slot_minutes)
+        return [(slot_start, slot_end, everyone) for slot_start, slot_end in slots]
+    slots = _walk_team_slots(start, end, merged, slot_minutes)
+    free = _free_calendars(calendar_ids, merged, slots)
+    return [(slot_start, slot_end, ids) for (slot_start, slot_end), ids in zip(slots, free)]
+
+
+def team_free_slots(
+    calendar_ids: Sequence[str],
+    start: datetime,
+    end: datetime,
+    *,
+    mode: str = ANY_FREE,
+    slot_minutes: int = 30,
+) -> List[TeamSlot]:
+    """Return free slots of a team of calendars between ``start`` and ``end``.
+
+    One freebusy request covers up to :data:`FREEBUSY_MAX_CALENDARS`
+    calendars; see :func:`free_slots_from_busy` for ``mode``.
+    """
+    busy = query_busy(calendar_ids, start, end)
+    return free_slots_from_busy(busy, start, end, mode=mode, slot_minutes=slot_minutes)
+
+
+def _day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """Return the UTC start and end of ``day``."""
+    start = datetime.combine(day, dt_time.min, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def free_slots_for_day(
+    calendar_id: str,
+    day: date,
+    *,
+    slot_minutes: int = 30,
+) -> List[Tuple[datetime, datetime]]:
+    """Return free slots for the whole UTC ``day``, using :data:`SLOT_CACHE`."""
+    slots = SLOT_CACHE.get(calendar_id, day, slot_minutes)
+    if slots is None:
+        slots = _fetch_day(calendar_id, day, slot_minutes)
+    return slots
+
+
+def _fetch_day(calendar_id: str, day: date, slot_minutes: int) -> List[Slot]:
+    """Query Google for ``day`` and store the result in :data:`SLOT_CACHE`."""
+    generation = SLOT_CACHE.generation(calendar_id)
+    start, end = _day_bounds(day)
+    slots = list_free_slots(calendar_id, start, end, slot_minutes=slot_minutes)
+    SLOT_CACHE.put(calendar_id, day, slots, slot_minutes, generation=generation)
+    return slots
+
+
 def create_event(
     calendar_id: str,
     start: datetime,
@@ -111,6 +467,163 @@ def create_event(
         "start": {"dateTime": start.isoformat()},
         "end": {"dateTime": end.isoformat()},
     }
-    return service.events().insert(calendarId=calendar_id, body=body).execute()
+    event = service.events().insert(calendarId=calendar_id, body=body).execute()
+    day = start.astimezone(timezone.utc).date()
+    last_day = end.astimezone(timezone.utc).date()
+    while day <= last_day:
+        SLOT_CACHE.invalidate(calendar_id, day)
+        day += timedelta(days=1)
+    return event
+
+
+class AsyncCalendar:
+    """Async facade over the blocking calendar helpers.
+
+    Calls run on a bounded :class:`ThreadPoolExecutor` so the event loop keeps
+    forwarding audio while Google responds. Concurrent identical freebusy
+    lookups share a single in-flight request. Request latency and failures
+    are recorded in :attr:`latency` and :attr:`failures`.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+        self.failures = 0
+        self.latency = LatencyHistogram()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="gcal"
+            )
+        return self._executor
+
+    async def _run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        try:
+            return await loop.run_in_executor(
+                self._get_executor(), lambda: func(*args, **kwargs)
+            )
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self.latency.record(time.monotonic() - started)
+
+    async def _coalesce(self, key: Hashable, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        future = asyncio.ensure_future(self._run(func, *args, **kwargs))
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def list_free_slots(
+        self,
+        calendar_id: str,
+        start: datetime,
+        end: datetime,
+        *,
+        slot_minutes: int = 30,
+    ) -> List[Slot]:
+        """Async :func:`list_free_slots` with request coalescing."""
+        key = ("range", calendar_id, start, end, slot_minutes)
+        slots = await self._coalesce(
+            key, list_free_slots, calendar_id, start, end, slot_minutes=slot_minutes
+        )
+        return list(slots)
+
+    async def free_slots_for_day(
+        self,
+        calendar_id: str,
+        day: date,
+        *,
+        slot_minutes: int = 30,
+    ) -> List[Slot]:
+        """Async :func:`free_slots_for_day`; cache hits never leave the loop."""
+        slots = SLOT_CACHE.get(calendar_id, day, slot_minutes)
+        if slots is not None:
+            return slots
+        key = ("day", calendar_id, day, slot_minutes)
+        slots = await self._coalesce(key, _fetch_day, calendar_id, day, slot_minutes)
+        return list(slots)
+
+    async def team_free_slots(
+        self,
+        calendar_ids: Sequence[str],
+        start: datetime,
+        end: datetime,
+        *,
+        mode: str = ANY_FREE,
+        slot_minutes: int = 30,
+    ) -> List[TeamSlot]:
+        """Async :func:`team_free_slots`.
+
+        The freebusy requests for each :data:`FREEBUSY_MAX_CALENDARS`
+        calendars run concurrently, and the merge runs off the event loop.
+        """
+        ids = tuple(dict.fromkeys(calendar_ids))
+        chunks = [
+            ids[i : i + FREEBUSY_MAX_CALENDARS]
+            for i in range(0, len(ids), FREEBUSY_MAX_CALENDARS)
+        ]
+        results = await asyncio.gather(
+            *(
+                self._coalesce(("busy", chunk, start, end), _query_busy_chunk, chunk, start, end)
+                for chunk in chunks
+            )
+        )
+        busy: Dict[str, List[Slot]] = {}
+        for result in results:
+            busy.update(result)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(),
+            lambda: free_slots_from_busy(busy, start, end, mode=mode, slot_minutes=slot_minutes),
+        )
+
+    async def team_free_slots_for_day(
+        self,
+        calendar_ids: Sequence[str],
+        day: date,
+        *,
+        mode: str = ANY_FREE,
+        slot_minutes: int = 30,
+    ) -> List[TeamSlot]:
+        """:meth:`team_free_slots` for the whole UTC ``day``, using :data:`SLOT_CACHE`."""
+        ids = tuple(dict.fromkeys(calendar_ids))
+        slots = SLOT_CACHE.get_team(ids, day, mode, slot_minutes)
+        if slots is not None:
+            return slots
+        generation = SLOT_CACHE.team_generation(ids)
+        start, end = _day_bounds(day)
+        slots = await self.team_free_slots(ids, start, end, mode=mode, slot_minutes=slot_minutes)
+        SLOT_CACHE.put_team(ids, day, mode, slots, slot_minutes, generation=generation)
+        return slots
+
+    async def rebuild_index(
+        self, index: Any, calendar_ids: Sequence[str], first_day: date, days: int = 1
+    ) -> int:
+        """Rebuild an ``availability.AvailabilityIndex`` from freebusy data off the event loop."""
+        return await self._run(index.rebuild, query_busy, calendar_ids, first_day, days)
 
+    async def create_event(
+        self,
+        calendar_id: str,
+        start: datetime,
+        end: datetime,
+        summary: str,
+    ) -> dict:
+        """Async :func:`create_event`."""
+        return await self._run(create_event, calendar_id, start, end, summary)
 
+    def shutdown(self) -> None:
+        """Stop the worker threads once in-flight calls finish."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,124 @@
+"""Fast intent validation for conversation items.
+
+Running every item through ``Guard.parse`` costs milliseconds on the event
+loop. :class:`IntentValidator` puts three cheaper steps in front of it:
+
+1. a pre-filter that skips content which is not a JSON object and so can
+   never carry an intent;
+2. a bounded LRU cache of results keyed by the content;
+3. pydantic's compiled ``model_validate_json`` plus the intent whitelist.
+
+Only content that fails the fast path goes to the full guard, which stays
+the authority on what is rejected and why.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+
+SKIPPED = "skipped"
+CACHED = "cached"
+FAST = "fast"
+GUARD = "guard"
+
+
+@dataclass(frozen=True)
+class IntentResult:
+    """Outcome of validating one item.
+
+    ``intent`` is set when the content passed; ``error`` when it was
+    rejected. Both are ``None`` for content the pre-filter skipped.
+    ``source`` tells which step produced the result.
+    """
+
+    intent: Optional[str] = None
+    error: Optional[str] = None
+    source: str = SKIPPED
+
+
+class IntentValidator:
+    """Validate LLM output against ``model`` and an intent whitelist.
+
+    Parameters
+    ----------
+    model: pydantic model
+        Model with an ``intent`` field, e.g. ``main.LLMOutput``.
+    intents: iterable of str
+        Allowed intents.
+    guard: optional
+        Object with a ``parse(text)`` method returning a guardrails
+        ``ValidationOutcome``; used when the fast path fails.
+    cache_size: int
+        Results kept in the LRU cache; ``0`` disables caching.
+    """
+
+    def __init__(
+        self,
+        model: Type[BaseModel],
+        intents: Iterable[str],
+        *,
+        guard: Any = None,
+        cache_size: int = 512,
+    ):
+        self.model = model
+        self.intents = frozenset(intents)
+        self.guard = guard
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, IntentResult]" = OrderedDict()
+        self.counts: Dict[str, int] = {SKIPPED: 0, CACHED: 0, FAST: 0, GUARD: 0}
+
+    def validate(self, content: str) -> IntentResult:
+        """Return the :class:`IntentResult` for ``content``."""
+        if not content or not content.lstrip().startswith("{"):
+            self.counts[SKIPPED] += 1
+            return IntentResult()
+
+        cached = self._cache.get(content)
+        if cached is not None:
+            self._cache.move_to_end(content)
+            self.counts[CACHED] += 1
+            return cached
+
+        result = self._fast(content)
+        if result is None:
+            result = self._full(content)
+        if self.cache_size > 0:
+            self._cache[content] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """Return how many items each step handled and the cache size."""
+        return {**self.counts, "cache_entries": len(self._cache)}
+
+    def _fast(self, content: str) -> Optional[IntentResult]:
+        try:
+            output = self.model.model_validate_json(content)
+        except ValidationError:
+            return None
+        intent = getattr(output, "intent", None)
+        if intent not in self.intents:
+            return None
+        self.counts[FAST] += 1
+        return IntentResult(intent=intent, source=FAST)
+
+    def _full(self, content: str) -> IntentResult:
+        self.counts[GUARD] += 1
+        if self.guard is None:
+            return IntentResult(error="Content failed validation", source=GUARD)
+        try:
+            outcome = self.guard.parse(content)
+        except Exception as exc:
+            return IntentResult(error=str(exc), source=GUARD)
+        output = outcome.validated_output
+        if outcome.validation_passed and isinstance(output, dict):
+            intent = output.get("intent")
+            if intent in self.intents:
+                return IntentResult(intent=intent, source=GUARD)
+        error = outcome.error or f"Validation failed for {content[:80]!r}"
+        return IntentResult(error=str(error), source=GUARD)
@@ -0,0 +1,181 @@
+"""Per-call latency histograms for the stages of a conversational turn.
+
+A turn moves through these stages:
+
+1. a Twilio media frame is received,
+2. the frame is forwarded to OpenAI,
+3. OpenAI reports ``input_audio_buffer.speech_stopped``,
+4. the first ``response.audio.delta`` of the reply arrives,
+5. the first reply frame is sent back to Twilio.
+
+:class:`CallTrace` records the gaps between them in
+:class:`LatencyHistogram` objects, which keep fixed-size log-scale buckets so
+the memory used per call does not depend on call length and percentiles are
+cheap to read at the end of the call.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+# Bucket bounds grow by 5% from 10 µs to 60 s
+_MIN_SECONDS = 1e-5
+_GROWTH = 1.05
+_BUCKETS = int(math.log(60.0 / _MIN_SECONDS, _GROWTH)) + 2
+_LOG_GROWTH = math.log(_GROWTH)
+
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram of durations in seconds.
+
+    Percentiles are accurate to the bucket width (5%); ``min``, ``max`` and
+    ``mean`` are exact.
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Add one observation."""
+        if seconds < 0:
+            seconds = 0.0
+        if seconds <= _MIN_SECONDS:
+            index = 0
+        else:
+            index = min(int(math.log(seconds / _MIN_SECONDS) / _LOG_GROWTH) + 1, _BUCKETS - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add every observation of ``other`` to this histogram."""
+        for i, n in enumerate(other.counts):
+            if n:
+                self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def cumulative(self, bounds: Sequence[float]) -> List[int]:
+        """Return observation counts at or below each of ``bounds`` (ascending)."""
+        result = []
+        seen = 0
+        index = 0
+        for bound in bounds:
+            while index < _BUCKETS and _MIN_SECONDS * _GROWTH ** index <= bound * (1 + 1e-9):
+                seen += self.counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Return the ``q``-th percentile (0-100), or 0.0 when empty."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                upper = _MIN_SECONDS * _GROWTH ** index
+                # Clamp the bucket bound to what was actually observed
+                return min(max(upper, self.min), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """Return count, mean, max and the :data:`PERCENTILES`."""
+        result = {"count": self.count, "mean": self.mean, "max": self.max}
+        for q in PERCENTILES:
+            result[f"p{q}"] = self.percentile(q)
+        return result
+
+
+@dataclass
+class CallTrace:
+    """Stage timestamps and latency histograms for one call.
+
+    Timestamps come from :func:`time.monotonic`. Histograms:
+
+    ``inbound``
+        Twilio frame received until it was queued for OpenAI.
+    ``outbound``
+        ``response.audio.delta`` received until the frame was queued for
+        Twilio.
+    ``inbound_queue`` / ``outbound_queue``
+        Time a message waited in the leg's outgoing queue before its writer
+        sent it.
+    ``response``
+        ``speech_stopped`` until the first audio delta of the reply.
+    ``first_audio``
+        ``speech_stopped`` until the first reply frame was sent to Twilio,
+        i.e. time to first audio as the caller hears it.
+    ``validation``
+        Intent validation time per conversation item.
+    ``barge_in``
+        Caller speech onset, as seen by the local detector, until playback
+        was cleared.
+    """
+
+    inbound: LatencyHistogram = field(default_factory=LatencyHistogram)
+    outbound: LatencyHistogram = field(default_factory=LatencyHistogram)
+    response: LatencyHistogram = field(default_factory=LatencyHistogram)
+    first_audio: LatencyHistogram = field(default_factory=LatencyHistogram)
+    validation: LatencyHistogram = field(default_factory=LatencyHistogram)
+    barge_in: LatencyHistogram = field(default_factory=LatencyHistogram)
+    inbound_queue: LatencyHistogram = field(default_factory=LatencyHistogram)
+    outbound_queue: LatencyHistogram = field(default_factory=LatencyHistogram)
+    speech_stopped_at: Optional[float] = None
+    first_delta_at: Optional[float] = None
+
+    def frame_forwarded(self, received: float, sent: float) -> None:
+        """Record an inbound frame forwarded to OpenAI."""
+        self.inbound.record(sent - received)
+
+    def speech_stopped(self, now: float) -> None:
+        """Start timing the reply to the caller's last utterance."""
+        self.speech_stopped_at = now
+        self.first_delta_at = None
+
+    def audio_delta(self, received: float) -> None:
+        """Note an audio delta from OpenAI arriving."""
+        if self.speech_stopped_at is not None and self.first_delta_at is None:
+            self.first_delta_at = received
+            self.response.record(received - self.speech_stopped_at)
+
+    def audio_sent(self, received: float, sent: float) -> None:
+        """Record an outbound frame sent to Twilio."""
+        self.outbound.record(sent - received)
+        if self.speech_stopped_at is not None:
+            self.first_audio.record(sent - self.speech_stopped_at)
+            self.speech_stopped_at = None
+
+    def histograms(self) -> Dict[str, LatencyHistogram]:
+        return {
+            "inbound": self.inbound,
+            "outbound": self.outbound,
+            "response": self.response,
+            "first_audio": self.first_audio,
+            "validation": self.validation,
+            "barge_in": self.barge_in,
+            "inbound_queue": self.inbound_queue,
+            "outbound_queue": self.outbound_queue,
+        }
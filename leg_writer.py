@@ -0,0 +1,200 @@
+"""Bounded outgoing queues between the two WebSocket legs of a call.
+
+Each direction of the bridge writes through a :class:`LegWriter`: the read
+loop enqueues messages and a dedicated task sends them, so a slow peer on
+one leg no longer stalls the loop reading the other leg. When the queue is
+full the overflow policy decides what happens:
+
+``drop_oldest``
+    Drop the oldest queued audio message to make room. Control messages
+    (``clear``, ``response.cancel``, ``session.update``) are never dropped;
+    if no audio is queued the caller waits as with ``block``.
+``block``
+    Wait for the writer to make room, pushing back on the read loop.
+``hangup``
+    Drop the message and call ``on_overflow`` once, e.g. to end the call.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+import structlog
+
+from latency import LatencyHistogram
+
+logger = structlog.get_logger()
+
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+HANGUP = "hangup"
+POLICIES = (DROP_OLDEST, BLOCK, HANGUP)
+
+
+class LegWriter:
+    """Bounded queue and writer task for one outgoing WebSocket leg.
+
+    Parameters
+    ----------
+    name: str
+        Leg name used in logs and metrics, e.g. ``"openai"``.
+    send: coroutine function
+        Sends one text message to the peer.
+    max_depth: int
+        Messages queued before the overflow policy applies.
+    policy: str
+        One of :data:`POLICIES`.
+    on_overflow: callable, optional
+        Called once when the ``hangup`` policy overflows.
+    wait: LatencyHistogram, optional
+        Records how long each message waited in the queue.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        send: Callable[[str], Awaitable[Any]],
+        *,
+        max_depth: int = 200,
+        policy: str = DROP_OLDEST,
+        on_overflow: Optional[Callable[[], Any]] = None,
+        wait: Optional[LatencyHistogram] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}; expected one of {POLICIES}")
+        if max_depth < 1:
+            raise ValueError("max_depth must be at least 1")
+        self.name = name
+        self.policy = policy
+        self.max_depth = max_depth
+        self.on_overflow = on_overflow
+        self.wait = wait if wait is not None else LatencyHistogram()
+        self._send = send
+        self._clock = clock
+        # (message, is_audio, enqueued_at)
+        self._queue: Deque[Tuple[str, bool, float]] = deque()
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.overflowed = False
+        self.sent = 0
+        self.dropped = 0
+        self.discarded = 0
+        self.max_seen = 0
+        self.blocked_seconds = 0.0
+        self.error: Optional[str] = None
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def start(self) -> "LegWriter":
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        return self
+
+    async def send(self, message: str, audio: bool = False) -> None:
+        """Queue ``message``, applying the overflow policy when full."""
+        if self.closed:
+            self.discarded += 1
+            return
+        if len(self._queue) >= self.max_depth:
+            if self.policy == HANGUP:
+                self.dropped += 1
+                if not self.overflowed:
+                    self.overflowed = True
+                    logger.warning("queue.overflow", leg=self.name, depth=len(self._queue))
+                    if self.on_overflow is not None:
+                        self.on_overflow()
+                return
+            if self.policy == DROP_OLDEST and self._drop_oldest_audio():
+                pass
+            else:
+                await self._wait_for_space()
+                if self.closed:
+                    self.discarded += 1
+                    return
+        self._queue.append((message, audio, self._clock()))
+        if len(self._queue) > self.max_seen:
+            self.max_seen = len(self._queue)
+        self._ready.set()
+
+    def discard_audio(self) -> int:
+        """Drop every queued audio message, e.g. before a Twilio ``clear``."""
+        before = len(self._queue)
+        self._queue = deque(item for item in self._queue if not item[1])
+        removed = before - len(self._queue)
+        self.discarded += removed
+        if removed:
+            self._space.set()
+        return removed
+
+    async def close(self, timeout: float = 1.0) -> None:
+        """Let queued messages drain for up to ``timeout`` seconds, then stop."""
+        if self._task is not None and not self._task.done() and self._queue:
+            deadline = self._clock() + timeout
+            while self._queue and not self._task.done() and self._clock() < deadline:
+                await asyncio.sleep(0.005)
+        self.closed = True
+        self.discarded += len(self._queue)
+        self._queue.clear()
+        self._space.set()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self._queue),
+            "max_depth": self.max_seen,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "discarded": self.discarded,
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "wait_p99_ms": round(self.wait.percentile(99) * 1000, 2),
+        }
+
+    def _drop_oldest_audio(self) -> bool:
+        for index, item in enumerate(self._queue):
+            if item[1]:
+                del self._queue[index]
+                self.dropped += 1
+                return True
+        return False
+
+    async def _wait_for_space(self) -> None:
+        started = self._clock()
+        while len(self._queue) >= self.max_depth and not self.closed:
+            self._space.clear()
+            await self._space.wait()
+        self.blocked_seconds += self._clock() - started
+
+    async def _run(self) -> None:
+        while True:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            message, _, enqueued_at = self._queue.popleft()
+            self._space.set()
+            self.wait.record(self._clock() - enqueued_at)
+            try:
+                await self._send(message)
+            except Exception as exc:
+                # The peer is gone; stop sending and drop what is left
+                self.error = str(exc)
+                self.closed = True
+                self.discarded += len(self._queue)
+                self._queue.clear()
+                self._space.set()
+                logger.info("queue.send_failed", leg=self.name, error=self.error)
+                return
+            self.sent += 1
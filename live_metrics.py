@@ -0,0 +1,290 @@
+"""Process-wide live metrics in Prometheus text format.
+
+Nothing here runs on the per-frame path. Calls keep counting on their own
+:class:`~call_context.CallContext` (single-threaded, so no locks), and
+:class:`LiveMetrics` sums the active contexts with the totals folded in
+from finished calls whenever ``/metrics`` is scraped. Only totals are
+exported, so any number of scrapers see the same values; frame rates come
+from ``rate(bridge_frames_total[1m])`` on the Prometheus side.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Tuple
+
+from call_context import CallContext, CallRegistry
+from latency import LatencyHistogram
+
+# Histogram bucket bounds in seconds exposed to Prometheus
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_COUNTER_FIELDS = ("guardrail_rejects", "calendar_errors")
+
+
+def _frames(ctx: CallContext) -> Tuple[int, int]:
+    # Every forwarded frame is one observation in the forwarding histograms
+    return ctx.trace.inbound.count, ctx.trace.outbound.count
+
+
+def _queue(writer: Any) -> Tuple[int, int]:
+    # (depth, dropped) of a leg writer, which is unset before the bridge starts
+    if writer is None:
+        return 0, 0
+    return writer.depth, writer.dropped
+
+
+class LiveMetrics:
+    """Aggregate per-call counters and histograms across the process.
+
+    Parameters
+    ----------
+    calls: CallRegistry
+        Registry of active calls.
+    calendar: optional
+        Object with ``latency`` (:class:`LatencyHistogram`) and ``failures``,
+        e.g. :class:`gcal.AsyncCalendar`.
+    realtime_pool: optional
+        Object with ``connect_latency``, e.g.
+        :class:`realtime_pool.RealtimePool`.
+    writer: optional
+        Object with ``queue_depth``, ``written``, ``batches``, ``errors``,
+        ``write_latency`` and ``queue_wait``, e.g.
+        :class:`persistence.CallWriter`.
+    """
+
+    def __init__(
+        self,
+        calls: CallRegistry,
+        *,
+        calendar: Any = None,
+        realtime_pool: Any = None,
+        writer: Any = None,
+    ):
+        self.calls = calls
+        self.calendar = calendar
+        self.realtime_pool = realtime_pool
+        self.writer = writer
+        self.calls_total = 0
+        self.frames_in = 0
+        self.frames_out = 0
+        self.dropped_in = 0
+        self.dropped_out = 0
+        self.counters: Dict[str, int] = {name: 0 for name in _COUNTER_FIELDS}
+        self.turn_latency = LatencyHistogram()
+        self.first_audio = LatencyHistogram()
+        self.openai_checkout = LatencyHistogram()
+
+    def call_started(self, ctx: CallContext) -> None:
+        """Record the OpenAI session checkout time of a new call."""
+        self.calls_total += 1
+        self.openai_checkout.record(ctx.openai_setup_seconds)
+
+    def call_finished(self, ctx: CallContext) -> None:
+        """Fold a finished call's counters into the process totals."""
+        frames_in, frames_out = _frames(ctx)
+        self.frames_in += frames_in
+        self.frames_out += frames_out
+        self.dropped_in += _queue(ctx.to_openai)[1]
+        self.dropped_out += _queue(ctx.to_twilio)[1]
+        for name in _COUNTER_FIELDS:
+            self.counters[name] += getattr(ctx, name)
+        for latency in ctx.latencies:
+            self.turn_latency.record(latency)
+        self.first_audio.merge(ctx.trace.first_audio)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return totals including calls still in progress."""
+        active = list(self.calls)
+        frames_in, frames_out = self.frames_in, self.frames_out
+        dropped_in, dropped_out = self.dropped_in, self.dropped_out
+        depth_in = depth_out = 0
+        counters = dict(self.counters)
+        turn_latency = LatencyHistogram()
+        turn_latency.merge(self.turn_latency)
+        first_audio = LatencyHistogram()
+        first_audio.merge(self.first_audio)
+        for ctx in active:
+            call_in, call_out = _frames(ctx)
+            frames_in += call_in
+            frames_out += call_out
+            call_depth, call_dropped = _queue(ctx.to_openai)
+            depth_in += call_depth
+            dropped_in += call_dropped
+            call_depth, call_dropped = _queue(ctx.to_twilio)
+            depth_out += call_depth
+            dropped_out += call_dropped
+            for name in _COUNTER_FIELDS:
+                counters[name] += getattr(ctx, name)
+            for latency in ctx.latencies:
+                turn_latency.record(latency)
+            first_audio.merge(ctx.trace.first_audio)
+
+        return {
+            "active_calls": len(active),
+            "frames_in": frames_in,
+            "frames_out": frames_out,
+            "queue_depth_in": depth_in,
+            "queue_depth_out": depth_out,
+            "dropped_in": dropped_in,
+            "dropped_out": dropped_out,
+            "counters": counters,
+            "turn_latency": turn_latency,
+            "first_audio": first_audio,
+        }
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        snap = self.snapshot()
+        lines: List[str] = []
+        _gauge(
+            lines, "bridge_active_calls", "Calls currently bridged.", [((), snap["active_calls"])]
+        )
+        _counter(
+            lines, "bridge_calls_total", "Calls accepted since start.", [((), self.calls_total)]
+        )
+        _counter(
+            lines,
+            "bridge_frames_total",
+            "Audio frames forwarded.",
+            _directions(snap["frames_in"], snap["frames_out"]),
+        )
+        _gauge(
+            lines,
+            "bridge_queue_depth",
+            "Messages waiting in the outgoing queues of active calls.",
+            _directions(snap["queue_depth_in"], snap["queue_depth_out"]),
+        )
+        _counter(
+            lines,
+            "bridge_queue_dropped_total",
+            "Audio messages dropped because an outgoing queue was full.",
+            _directions(snap["dropped_in"], snap["dropped_out"]),
+        )
+        _counter(
+            lines,
+            "bridge_guardrail_rejects_total",
+            "Responses rejected by guardrails.",
+            [((), snap["counters"]["guardrail_rejects"])],
+        )
+        _counter(
+            lines,
+            "bridge_calendar_errors_total",
+            "Calendar lookups that failed during calls.",
+            [((), snap["counters"]["calendar_errors"])],
+        )
+        if self.calendar is not None:
+            _counter(
+                lines,
+                "calendar_request_failures_total",
+                "Google Calendar requests that raised.",
+                [((), self.calendar.failures)],
+            )
+            _histogram(
+                lines,
+                "calendar_request_seconds",
+                "Google Calendar request latency.",
+                self.calendar.latency,
+            )
+        if self.realtime_pool is not None:
+            _histogram(
+                lines,
+                "openai_connect_seconds",
+                "OpenAI Realtime connect and configure time.",
+                self.realtime_pool.connect_latency,
+            )
+        if self.writer is not None:
+            _gauge(
+                lines,
+                "persist_queue_depth",
+                "Finished calls waiting for the background writer.",
+                [((), self.writer.queue_depth)],
+            )
+            _counter(
+                lines,
+                "persist_calls_written_total",
+                "Finished calls saved to the database.",
+                [((), self.writer.written)],
+            )
+            _counter(
+                lines,
+                "persist_batches_total",
+                "Batches written by the background writer.",
+                [((), self.writer.batches)],
+            )
+            _counter(
+                lines,
+                "persist_errors_total",
+                "Finished calls that failed to persist.",
+                [((), self.writer.errors)],
+            )
+            _histogram(
+                lines,
+                "persist_write_seconds",
+                "Time to write one batch of finished calls.",
+                self.writer.write_latency,
+            )
+            _histogram(
+                lines,
+                "persist_queue_wait_seconds",
+                "Time a finished call waited before its batch was written.",
+                self.writer.queue_wait,
+            )
+        _histogram(
+            lines,
+            "openai_checkout_seconds",
+            "Time a new call waited for a ready OpenAI session.",
+            self.openai_checkout,
+        )
+        _histogram(
+            lines,
+            "bridge_turn_latency_seconds",
+            "Caller speech start to assistant reply item.",
+            snap["turn_latency"],
+        )
+        _histogram(
+            lines,
+            "bridge_time_to_first_audio_seconds",
+            "Caller speech stop to first reply frame sent to Twilio.",
+            snap["first_audio"],
+        )
+        return "\n".join(lines) + "\n"
+
+
+def _directions(inbound: float, outbound: float) -> list:
+    return [((("direction", "inbound"),), inbound), ((("direction", "outbound"),), outbound)]
+
+
+def _labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = ",".join(f'{name}="{value}"' for name, value in labels)
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _format(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def _samples(lines: List[str], name: str, help_text: str, kind: str, samples) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(labels)} {_format(value)}")
+
+
+def _gauge(lines: List[str], name: str, help_text: str, samples) -> None:
+    _samples(lines, name, help_text, "gauge", samples)
+
+
+def _counter(lines: List[str], name: str, help_text: str, samples) -> None:
+    _samples(lines, name, help_text, "counter", samples)
+
+
+def _histogram(lines: List[str], name: str, help_text: str, histogram: LatencyHistogram) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for bound, count in zip(BUCKETS, histogram.cumulative(BUCKETS)):
+        lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+    lines.append(f'{name}_bucket{{le="+Inf"}} {histogram.count}')
+    lines.append(f"{name}_sum {_format(histogram.total)}")
+    lines.append(f"{name}_count {histogram.count}")
@@ -0,0 +1,281 @@
+"""Structlog configuration for the realtime event path.
+
+``full`` mode keeps the original behaviour: every record is rendered with the
+JSON renderer and printed synchronously. ``production`` mode is meant for
+busy workers:
+
+* :class:`PayloadTrimmer` keeps only allow-listed keys of dict values such as
+  ``payload=`` and ``item=`` and truncates long strings and lists.
+* :class:`EventSampler` keeps a configured fraction of each event type.
+* :class:`QueueSink` hands rendered lines to a writer thread through a
+  bounded queue, dropping and counting records when the queue is full so
+  the event loop never waits on stdout.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import sys
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Optional, TextIO
+
+import structlog
+
+import codec
+
+# Keys kept from dict-valued log fields in production mode
+DEFAULT_ALLOWED_KEYS = frozenset(
+    {
+        "type",
+        "event_id",
+        "id",
+        "item_id",
+        "response_id",
+        "status",
+        "status_details",
+        "role",
+        "name",
+        "code",
+        "message",
+        "error",
+        "item",
+        "response",
+        "session",
+        "usage",
+        "total_tokens",
+        "input_tokens",
+        "output_tokens",
+        "audio_start_ms",
+        "audio_end_ms",
+    }
+)
+
+
+def parse_sample_rates(spec: Optional[str]) -> Dict[str, float]:
+    """Parse ``"response.done=0.1,rate_limits.updated=0"`` into a mapping."""
+    rates: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        name, sep, value = part.strip().partition("=")
+        if not sep:
+            continue
+        try:
+            rates[name.strip()] = min(max(float(value), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
+
+
+class PayloadTrimmer:
+    """Processor that projects dict fields onto ``allowed`` keys.
+
+    Nested dicts are trimmed recursively up to ``max_depth``, strings longer
+    than ``max_string`` characters are cut and lists keep at most
+    ``max_items`` elements.
+    """
+
+    def __init__(
+        self,
+        allowed: Iterable[str] = DEFAULT_ALLOWED_KEYS,
+        *,
+        max_string: int = 200,
+        max_items: int = 5,
+        max_depth: int = 3,
+    ):
+        self.allowed = frozenset(allowed)
+        self.max_string = max_string
+        self.max_items = max_items
+        self.max_depth = max_depth
+
+    def __call__(self, logger: Any, method_name: str, event_dict: dict) -> dict:
+        for key, value in event_dict.items():
+            if key != "event":
+                event_dict[key] = self._trim(value, 0)
+        return event_dict
+
+    def _trim(self, value: Any, depth: int) -> Any:
+        if isinstance(value, str):
+            if len(value) > self.max_string:
+                return f"{value[:self.max_string]}...(+{len(value) - self.max_string})"
+            return value
+        if isinstance(value, dict):
+            if depth >= self.max_depth:
+                return "{...}"
+            return {
+                k: self._trim(v, depth + 1) for k, v in value.items() if k in self.allowed
+            }
+        if isinstance(value, (list, tuple)):
+            if depth >= self.max_depth:
+                return f"[{len(value)} items]"
+            trimmed = [self._trim(v, depth + 1) for v in value[: self.max_items]]
+            if len(value) > self.max_items:
+                trimmed.append(f"...(+{len(value) - self.max_items})")
+            return trimmed
+        return value
+
+
+class EventSampler:
+    """Processor that keeps a fraction of records per event type.
+
+    The rate is looked up by the record's ``event_type`` field first, then
+    by its event name; unlisted events use ``default``. Sampling is
+    deterministic: a rate of ``0.25`` keeps every fourth record.
+    """
+
+    def __init__(self, rates: Optional[Mapping[str, float]] = None, default: float = 1.0):
+        self.rates = dict(rates or {})
+        self.default = default
+        self._credit: Dict[str, float] = {}
+        self.sampled_out = 0
+
+    def __call__(self, logger: Any, method_name: str, event_dict: dict) -> dict:
+        if method_name in ("error", "critical", "exception"):
+            return event_dict
+        key = event_dict.get("event_type")
+        rate = self.rates.get(key) if key is not None else None
+        if rate is None:
+            key = event_dict.get("event")
+            rate = self.rates.get(key, self.default)
+        if rate >= 1.0:
+            return event_dict
+        credit = self._credit.get(key, 0.0) + rate
+        if credit >= 1.0:
+            self._credit[key] = credit - 1.0
+            return event_dict
+        self._credit[key] = credit
+        self.sampled_out += 1
+        raise structlog.DropEvent
+
+
+class QueueSink:
+    """Bounded, non-blocking log sink drained by a writer thread.
+
+    Parameters
+    ----------
+    stream: file-like
+        Where rendered lines are written; defaults to ``sys.stdout``.
+    max_queue: int
+        Lines that may wait for the writer; further lines are dropped.
+    batch: int
+        Lines written per ``write`` call at most.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self, stream: Optional[TextIO] = None, *, max_queue: int = 10000, batch: int = 256
+    ):
+        self.stream = stream if stream is not None else sys.stdout
+        self.batch = batch
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self._thread = threading.Thread(target=self._drain, name="log-sink", daemon=True)
+        self._thread.start()
+
+    def put(self, line: str) -> None:
+        """Queue ``line`` for writing, or count it as dropped."""
+        try:
+            self._queue.put_nowait(line)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Return queue depth and enqueued, written and dropped counts."""
+        return {
+            "queue_depth": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Write queued lines and stop the writer thread."""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _drain(self) -> None:
+        while True:
+            lines: List[str] = [self._queue.get()]
+            while len(lines) < self.batch:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = lines[-1] is self._STOP
+            if stop:
+                lines.pop()
+            if lines:
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                    self.written += len(lines)
+                except Exception:
+                    self.dropped += len(lines)
+            if stop:
+                return
+
+
+class QueueLogger:
+    """Structlog logger that forwards rendered records to a :class:`QueueSink`."""
+
+    def __init__(self, sink: QueueSink):
+        self._sink = sink
+
+    def msg(self, message: str) -> None:
+        self._sink.put(message)
+
+    log = debug = info = warn = warning = error = critical = exception = fatal = msg
+
+
+def configure(
+    mode: str = "full",
+    *,
+    sample_rates: Optional[Mapping[str, float]] = None,
+    allowed_keys: Iterable[str] = DEFAULT_ALLOWED_KEYS,
+    max_string: int = 200,
+    max_queue: int = 10000,
+    stream: Optional[TextIO] = None,
+) -> Optional[QueueSink]:
+    """Configure structlog for ``mode`` and return the queue sink, if any."""
+    if mode != "production":
+        structlog.configure(
+            processors=[
+                structlog.processors.TimeStamper(fmt="iso"),
+                structlog.processors.JSONRenderer(),
+            ],
+            logger_factory=structlog.PrintLoggerFactory(stream),
+        )
+        return None
+
+    sink = QueueSink(stream, max_queue=max_queue)
+    logger = QueueLogger(sink)
+    structlog.configure(
+        processors=[
+            EventSampler(sample_rates),
+            PayloadTrimmer(allowed_keys, max_string=max_string),
+            structlog.processors.add_log_level,
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.JSONRenderer(serializer=_render),
+        ],
+        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+        logger_factory=lambda *args: logger,
+        cache_logger_on_first_use=True,
+    )
+    return sink
+
+
+def _render(event_dict: dict, **kwargs: Any) -> str:
+    try:
+        return codec.dumps(event_dict)
+    except TypeError:
+        # Values the fast path cannot serialize are logged as their repr
+        return json.dumps(event_dict, default=repr)
@@ -1,11 +1,11 @@
+import base64
 import time
 import os
-import json
-import base64
 import asyncio
 import logging
 import re
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
 
 from guardrails.validator_base import register_validator, Validator
 from guardrails.classes.validation.validation_result import PassResult, FailResult
@@ -15,30 +15,49 @@ from pydantic import BaseModel, Field
 import structlog
 import websockets
 from fastapi import FastAPI, WebSocket, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.websockets import WebSocketDisconnect
-from twilio.rest import Client
 from twilio.twiml.voice_response import VoiceResponse, Connect
 from dotenv import load_dotenv
+import codec
 import gcal
-from db import init_db, save_call_summary
-from metrics import compute_call_metrics, write_report
+import log_pipeline
+from audio import FrameCoalescer, passthrough_payload
+from availability import AvailabilityIndex
+from realtime_pool import RealtimePool
+from twilio_client import AsyncTwilio
+from call_context import CallContext, CallRegistry
+from campaign import Dialer, parse_numbers
+from leg_writer import POLICIES as LEG_QUEUE_POLICIES, LegWriter
+from call_recorder import CallRecorder
+from call_flow import FLOW, render_session
+from db import AsyncCallStore, init_db
+from intent_validation import IntentValidator
+from live_metrics import LiveMetrics
+from persistence import CallWriter
+from topic_guard import TopicMatcher, literal_topics, load_topics
+from transcript_sink import TranscriptSink, item_role_content, shutdown as shutdown_transcripts
+from vad import SPEECH_END, SPEECH_START, VoiceActivityDetector
 
 load_dotenv()
 
 logging.basicConfig(format="%(message)s", level=logging.INFO)
-structlog.configure(
-    processors=[
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.JSONRenderer(),
-    ]
+# "production" trims payloads, samples noisy events and logs off the event loop
+LOG_MODE = os.getenv("LOG_MODE", "full").lower()
+LOG_ALLOWED_KEYS = os.getenv("LOG_ALLOWED_KEYS")
+LOG_SINK = log_pipeline.configure(
+    LOG_MODE,
+    sample_rates=log_pipeline.parse_sample_rates(os.getenv("LOG_SAMPLE_RATES")),
+    allowed_keys=LOG_ALLOWED_KEYS.split(",")
+    if LOG_ALLOWED_KEYS
+    else log_pipeline.DEFAULT_ALLOWED_KEYS,
+    max_string=int(os.getenv("LOG_MAX_STRING", 200)),
+    max_queue=int(os.getenv("LOG_QUEUE_SIZE", 10000)),
 )
 logger = structlog.get_logger()
 
-# Global variable to track the active call SID
-CURRENT_CALL_ID = None
-# Track metrics for the current call
-CURRENT_METRICS = None
+# Active calls bridged by this worker, keyed by call SID
+CALLS = CallRegistry()
 
 
 @register_validator("intent_whitelist", data_type="string")
@@ -55,10 +74,13 @@ class IntentWhitelist(Validator):
         return FailResult(error_message=f"Intent '{value}' not allowed")
 
 
+ALLOWED_INTENTS = ["greeting", "ask_date"]
+
+
 class LLMOutput(BaseModel):
     intent: str = Field(
         json_schema_extra={
-            "validators": [IntentWhitelist(["greeting", "ask_date"])]
+            "validators": [IntentWhitelist(ALLOWED_INTENTS)]
         }
     )
     text: str
@@ -66,10 +88,24 @@ class LLMOutput(BaseModel):
 
 intent_guard = Guard.for_pydantic(LLMOutput)
 
+# Pre-filter, LRU cache and compiled pydantic check in front of intent_guard
+INTENT_VALIDATOR = IntentValidator(
+    LLMOutput,
+    ALLOWED_INTENTS,
+    guard=intent_guard,
+    cache_size=int(os.getenv("INTENT_CACHE_SIZE", 512)),
+)
+
 
-def contains_disallowed_topic(text: str) -> bool:
-    """Return True if text matches the disallowed topics regex."""
-    if DISALLOWED_TOPICS_PATTERN and text:
+def contains_disallowed_topic(text) -> bool:
+    """Return True if text contains a disallowed topic or matches the regex."""
+    if not text:
+        return False
+    if not isinstance(text, str):
+        text = codec.dumps(text)
+    if TOPIC_MATCHER is not None and TOPIC_MATCHER.search(text):
+        return True
+    if DISALLOWED_TOPICS_PATTERN:
         return bool(DISALLOWED_TOPICS_PATTERN.search(text))
     return False
 
@@ -96,30 +132,153 @@ PORT = int(os.getenv("PORT", 5050))
 GOOGLE_CRED_JSON = os.getenv("GOOGLE_CRED_JSON")
 CALENDAR_ID = os.getenv("CALENDAR_ID")
 DISALLOWED_TOPICS_REGEX = os.getenv("DISALLOWED_TOPICS_REGEX")
+DISALLOWED_TOPICS = os.getenv("DISALLOWED_TOPICS")
+DISALLOWED_TOPICS_FILE = os.getenv("DISALLOWED_TOPICS_FILE")
+GCAL_MAX_WORKERS = int(os.getenv("GCAL_MAX_WORKERS", 4))
+# Sales team calendars: offer slots when any rep is free (meetings are
+# booked round-robin on a free rep) or only when all of them are
+TEAM_CALENDAR_IDS = [
+    c.strip() for c in os.getenv("TEAM_CALENDAR_IDS", "").split(",") if c.strip()
+]
+TEAM_AVAILABILITY = os.getenv("TEAM_AVAILABILITY", gcal.ANY_FREE)
+if TEAM_AVAILABILITY not in gcal.TEAM_MODES:
+    raise ValueError(f"TEAM_AVAILABILITY must be one of {gcal.TEAM_MODES}")
+# Seconds between background rebuilds of the in-memory availability index
+# from freebusy data (0 disables it; slots are then fetched per lookup)
+AVAILABILITY_REFRESH = float(os.getenv("AVAILABILITY_REFRESH", 60))
+# Days from today kept in the availability index
+AVAILABILITY_DAYS = int(os.getenv("AVAILABILITY_DAYS", 7))
+OPENAI_REALTIME_URL = os.getenv(
+    "OPENAI_REALTIME_URL",
+    "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview-2024-10-01&response_format=json",
+)
+REALTIME_POOL_SIZE = int(os.getenv("REALTIME_POOL_SIZE", 2))
+REALTIME_POOL_MAX_AGE = float(os.getenv("REALTIME_POOL_MAX_AGE", 300))
+REALTIME_POOL_HEALTH_INTERVAL = float(os.getenv("REALTIME_POOL_HEALTH_INTERVAL", 15))
+TWILIO_MAX_WORKERS = int(os.getenv("TWILIO_MAX_WORKERS", 8))
+TWILIO_TIMEOUT = float(os.getenv("TWILIO_TIMEOUT", 5))
+TWILIO_MAX_RETRIES = int(os.getenv("TWILIO_MAX_RETRIES", 2))
+# Campaign dialing: outbound calls per second, cap on live calls, attempts
+# per number and the wait before redialing a busy or unanswered number
+CAMPAIGN_CPS = float(os.getenv("CAMPAIGN_CPS", 1))
+CAMPAIGN_MAX_LIVE = int(os.getenv("CAMPAIGN_MAX_LIVE", 10))
+CAMPAIGN_MAX_ATTEMPTS = int(os.getenv("CAMPAIGN_MAX_ATTEMPTS", 3))
+CAMPAIGN_RETRY_DELAY = float(os.getenv("CAMPAIGN_RETRY_DELAY", 300))
+TRANSCRIPT_DIR = os.getenv(
+    "TRANSCRIPT_DIR", os.path.join(os.path.dirname(__file__), "transcripts")
+)
+TRANSCRIPT_FLUSH_INTERVAL = float(os.getenv("TRANSCRIPT_FLUSH_INTERVAL", 1))
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", 20))
+PERSIST_FLUSH_INTERVAL = float(os.getenv("PERSIST_FLUSH_INTERVAL", 1))
+PERSIST_QUEUE_SIZE = int(os.getenv("PERSIST_QUEUE_SIZE", 1000))
+# Record every inbound Twilio and OpenAI event of each call here when set
+CALL_RECORDING_DIR = os.getenv("CALL_RECORDING_DIR")
+# Detect caller speech locally and stop the bot's playback without waiting
+# for OpenAI's speech_started
+BARGE_IN_VAD = os.getenv("BARGE_IN_VAD", "false").lower() in ("1", "true", "yes")
+VAD_ENERGY_DB = float(os.getenv("VAD_ENERGY_DB", -35))
+VAD_ZCR_MAX = float(os.getenv("VAD_ZCR_MAX", 0.35))
+VAD_START_FRAMES = int(os.getenv("VAD_START_FRAMES", 3))
+VAD_HANGOVER_FRAMES = int(os.getenv("VAD_HANGOVER_FRAMES", 15))
+# Concatenate inbound 20 ms frames into windows of this many ms before
+# sending them to OpenAI (0 forwards every frame on its own)
+INBOUND_COALESCE_MS = int(os.getenv("INBOUND_COALESCE_MS", 0))
+# Send a partial window once its oldest frame has waited this long
+INBOUND_FLUSH_TIMEOUT_MS = int(os.getenv("INBOUND_FLUSH_TIMEOUT_MS") or INBOUND_COALESCE_MS)
+# Twilio events that flush the pending inbound window first
+INBOUND_FLUSH_EVENTS = ("stop", "dtmf", "media_stream_timeout")
+# Outgoing messages queued per WebSocket leg, and what to do when a slow
+# peer fills the queue: drop_oldest (audio), block or hangup
+LEG_QUEUE_SIZE = int(os.getenv("LEG_QUEUE_SIZE", 200))
+LEG_QUEUE_POLICY = os.getenv("LEG_QUEUE_POLICY", "drop_oldest")
+if LEG_QUEUE_POLICY not in LEG_QUEUE_POLICIES:
+    raise ValueError(f"LEG_QUEUE_POLICY must be one of {LEG_QUEUE_POLICIES}")
+# Decode outbound audio deltas before forwarding them (debugging aid)
+AUDIO_VALIDATE = os.getenv("AUDIO_VALIDATE", "false").lower() in ("1", "true", "yes")
 
-if DISALLOWED_TOPICS_REGEX:
+# Topic phrases are matched incrementally over streamed response deltas; a
+# plain "a|b|c" regex is folded into the same automaton
+_topics = load_topics(DISALLOWED_TOPICS, DISALLOWED_TOPICS_FILE)
+_regex_topics = literal_topics(DISALLOWED_TOPICS_REGEX)
+if _regex_topics:
+    _topics += _regex_topics
+TOPIC_MATCHER = TopicMatcher(_topics) if _topics else None
+if DISALLOWED_TOPICS_REGEX and not _regex_topics:
     DISALLOWED_TOPICS_PATTERN = re.compile(DISALLOWED_TOPICS_REGEX, re.IGNORECASE)
 else:
     DISALLOWED_TOPICS_PATTERN = None
+# Streamed response text scanned for disallowed topics
+TOPIC_DELTA_TYPES = ("response.audio_transcript.delta", "response.text.delta")
 
 SYSTEM_MESSAGE = load_prompt("system_prompt")
 
+# Runs blocking Google Calendar calls off the event loop
+CALENDAR = gcal.AsyncCalendar(max_workers=GCAL_MAX_WORKERS)
+# Round-robin position for booking on team calendars
+_team_turn = -1
+# Free-slot bitmaps of the booking calendars, rebuilt in the background
+AVAILABILITY = AvailabilityIndex() if AVAILABILITY_REFRESH > 0 else None
+_availability_task: asyncio.Task | None = None
+
+# Writes reports and call summaries in the background
+CALL_WRITER = CallWriter(
+    batch_size=PERSIST_BATCH_SIZE,
+    flush_interval=PERSIST_FLUSH_INTERVAL,
+    max_queue=PERSIST_QUEUE_SIZE,
+)
+
+
+async def get_todays_free_slots(ctx: CallContext | None = None):
+    """Return formatted free time slots for today.
 
-def get_todays_free_slots():
-    """Return formatted free time slots for today."""
-    if not CALENDAR_ID:
+    Calendar failures are counted against ``ctx`` when one is given.
+    """
+    if not CALENDAR_ID and not TEAM_CALENDAR_IDS:
         raise ValueError("CALENDAR_ID environment variable not set")
-    start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-    end = start + timedelta(days=1)
-    global CURRENT_METRICS
+    today = datetime.now(timezone.utc).date()
+    slot_ids = indexed_slot_ids(today)
+    if slot_ids is not None:
+        return [AVAILABILITY.label(s) for s in slot_ids]
     try:
-        slots = gcal.list_free_slots(CALENDAR_ID, start, end)
+        if TEAM_CALENDAR_IDS:
+            slots = await CALENDAR.team_free_slots_for_day(
+                TEAM_CALENDAR_IDS, today, mode=TEAM_AVAILABILITY
+            )
+        else:
+            slots = await CALENDAR.free_slots_for_day(CALENDAR_ID, today)
     except Exception as exc:
         logger.error("slots.fetch_failed", error=str(exc))
-        if CURRENT_METRICS is not None:
-            CURRENT_METRICS["calendar_errors"] += 1
+        if ctx is not None:
+            ctx.calendar_errors += 1
         return []
     return [f"{s[0].strftime('%I:%M %p')} - {s[1].strftime('%I:%M %p')}" for s in slots]
+
+
+def booking_calendars() -> list[str]:
+    """Return the calendars meetings are booked against."""
+    return TEAM_CALENDAR_IDS or ([CALENDAR_ID] if CALENDAR_ID else [])
+
+
+def indexed_slot_ids(day) -> list[str] | None:
+    """Return free slot IDs on ``day`` from the index, or ``None`` if it does not cover the day."""
+    calendars = booking_calendars()
+    if AVAILABILITY is None or not calendars or not AVAILABILITY.covers(calendars, day):
+        return None
+    return AVAILABILITY.free_slot_ids(calendars, day, TEAM_AVAILABILITY)
+
+
+async def refresh_availability():
+    """Rebuild the availability index every ``AVAILABILITY_REFRESH`` seconds."""
+    while True:
+        today = datetime.now(timezone.utc).date()
+        try:
+            await CALENDAR.rebuild_index(
+                AVAILABILITY, booking_calendars(), today, AVAILABILITY_DAYS
+            )
+            logger.info("availability.rebuilt", **AVAILABILITY.stats())
+        except Exception as exc:
+            logger.error("availability.rebuild_failed", error=str(exc))
+        await asyncio.sleep(AVAILABILITY_REFRESH)
 VOICE = "echo"
 LOG_EVENT_TYPES = [
     "response.content.done",
@@ -133,6 +292,44 @@ LOG_EVENT_TYPES = [
 
 app = FastAPI()
 init_db()
+# Reads of stored call summaries, off the event loop
+SUMMARY_STORE = AsyncCallStore()
+# Largest page the summary query endpoint returns
+SUMMARY_PAGE_MAX = 500
+
+
+@app.on_event("startup")
+async def prefetch_slots():
+    """Warm the slot cache so the first call's session update is a cache hit."""
+    if booking_calendars() and AVAILABILITY is None:
+        await get_todays_free_slots()
+        logger.info("slot_cache.prefetched", **gcal.SLOT_CACHE.stats())
+
+
+@app.on_event("startup")
+async def start_background_workers():
+    await REALTIME_POOL.start()
+    await CALL_WRITER.start()
+    DIALER.start()
+    global _availability_task
+    if AVAILABILITY is not None and booking_calendars():
+        _availability_task = asyncio.create_task(refresh_availability())
+
+
+@app.on_event("shutdown")
+async def shutdown_clients():
+    if _availability_task is not None:
+        _availability_task.cancel()
+    await DIALER.close()
+    await REALTIME_POOL.close()
+    await CALL_WRITER.close()
+    CALENDAR.shutdown()
+    TWILIO.shutdown()
+    SUMMARY_STORE.shutdown()
+    shutdown_transcripts()
+    if LOG_SINK is not None:
+        LOG_SINK.close()
+
 
 if not OPENAI_API_KEY:
     raise ValueError("Missing the OpenAI API key. Please set it in the .env file.")
@@ -140,23 +337,61 @@ if not OPENAI_API_KEY:
 if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN or not TWILIO_PHONE_NUMBER:
     raise ValueError("Missing Twilio configuration. Please set it in the .env file.")
 
+# Shared, pooled Twilio REST client; requests run off the event loop
+TWILIO = AsyncTwilio(
+    TWILIO_ACCOUNT_SID,
+    TWILIO_AUTH_TOKEN,
+    max_workers=TWILIO_MAX_WORKERS,
+    timeout=TWILIO_TIMEOUT,
+    retries=TWILIO_MAX_RETRIES,
+)
+
+
+async def dial_campaign_number(to: str) -> str:
+    """Place one campaign call; Twilio reports its outcome to /call-status."""
+    call = await TWILIO.create_call(
+        to=to,
+        from_=TWILIO_PHONE_NUMBER,
+        url=f"{NGROK_URL}/outgoing-call",
+        status_callback=f"{NGROK_URL}/call-status",
+    )
+    return call.sid
+
+
+# Paced outbound dialing for campaigns, sharing one CPS budget
+DIALER = Dialer(
+    dial_campaign_number,
+    CALLS,
+    cps=CAMPAIGN_CPS,
+    max_live=CAMPAIGN_MAX_LIVE,
+    max_attempts=CAMPAIGN_MAX_ATTEMPTS,
+    retry_delay=CAMPAIGN_RETRY_DELAY,
+)
+
 
 @app.get("/", response_class=HTMLResponse)
 async def index_page():
     return {"message": "Twilio Media Stream Server is running!"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Live process metrics in the Prometheus text format."""
+    return PlainTextResponse(
+        LIVE_METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @app.post("/make-call")
 async def make_call(to_phone_number: str):
     """Make an outgoing call to the specified phone number."""
     if not to_phone_number:
         return {"error": "Phone number is required"}
     try:
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        call = client.calls.create(
-            url=f"{NGROK_URL}/outgoing-call",
+        call = await TWILIO.create_call(
             to=to_phone_number,
             from_=TWILIO_PHONE_NUMBER,
+            url=f"{NGROK_URL}/outgoing-call",
         )
         start_ts = datetime.utcnow().isoformat()
         logger.info(
@@ -167,40 +402,166 @@ async def make_call(to_phone_number: str):
         )
     except Exception as e:
         logger.error("call.initiation_failed", error=str(e))
+        return {"error": "Failed to initiate call"}
 
     return {"call_sid": call.sid}
 
 
+@app.post("/campaigns")
+async def create_campaign(request: Request):
+    """Start dialing a CSV or JSON list of numbers at the campaign pace."""
+    body = (await request.body()).decode("utf-8", errors="replace")
+    try:
+        numbers = parse_numbers(body, request.headers.get("content-type", ""))
+    except ValueError as exc:
+        return {"error": f"Invalid campaign body: {exc}"}
+    if not numbers:
+        return {"error": "No phone numbers found"}
+    campaign = DIALER.submit(numbers)
+    return campaign.progress()
+
+
+@app.get("/campaigns/{campaign_id}")
+async def campaign_progress(campaign_id: str):
+    """Report how far a campaign has got."""
+    campaign = DIALER.campaigns.get(campaign_id)
+    if campaign is None:
+        return {"error": "Campaign not found", "campaign_id": campaign_id}
+    return campaign.progress()
+
+
+@app.post("/campaigns/{campaign_id}/cancel")
+async def cancel_campaign(campaign_id: str):
+    """Stop dialing a campaign's remaining numbers."""
+    campaign = DIALER.cancel(campaign_id)
+    if campaign is None:
+        return {"error": "Campaign not found", "campaign_id": campaign_id}
+    return campaign.progress()
+
+
+@app.post("/call-status")
+async def call_status(request: Request):
+    """Twilio status callback for campaign calls."""
+    form = parse_qs((await request.body()).decode("utf-8"))
+    call_sid = form.get("CallSid", [""])[0]
+    status = form.get("CallStatus", [""])[0]
+    if DIALER.call_status(call_sid, status):
+        logger.info("campaign.call_status", call_id=call_sid, status=status)
+    return {"status": "ok"}
+
+
+def _encode_cursor(key) -> str:
+    scheduled_time, call_id = key
+    raw = f"{scheduled_time.isoformat()}|{call_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str):
+    scheduled_time, call_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+    return datetime.fromisoformat(scheduled_time), call_id
+
+
+@app.get("/call-summaries")
+async def list_call_summaries(
+    start: str | None = None,
+    end: str | None = None,
+    outcome: str | None = None,
+    limit: int = 50,
+    cursor: str | None = None,
+):
+    """Page through stored call summaries by date range and outcome.
+
+    ``start`` (inclusive) and ``end`` (exclusive) are ISO dates or times.
+    Pass the returned ``next_cursor`` as ``cursor`` for the next page.
+    """
+    try:
+        start_dt = datetime.fromisoformat(start) if start else None
+        end_dt = datetime.fromisoformat(end) if end else None
+        after = _decode_cursor(cursor) if cursor else None
+    except ValueError as exc:
+        return {"error": f"Invalid query: {exc}"}
+    limit = max(1, min(limit, SUMMARY_PAGE_MAX))
+    rows, next_key = await SUMMARY_STORE.query(
+        start=start_dt, end=end_dt, outcome=outcome, limit=limit, after=after
+    )
+    for row in rows:
+        if row["scheduled_time"] is not None:
+            row["scheduled_time"] = row["scheduled_time"].isoformat()
+    return {
+        "items": rows,
+        "count": len(rows),
+        "next_cursor": _encode_cursor(next_key) if next_key else None,
+    }
+
+
 @app.post("/offer-time-slots")
 async def offer_time_slots(prospect_name: str):
-    """Return free slots for today."""
-    slots = get_todays_free_slots()
-    return {"prospect_name": prospect_name, "time_slots": slots}
+    """Return free slots for today, with slot IDs when the index covers today."""
+    slot_ids = indexed_slot_ids(datetime.now(timezone.utc).date())
+    if slot_ids is None:
+        slots = await get_todays_free_slots()
+        return {"prospect_name": prospect_name, "time_slots": slots}
+    labels = [AVAILABILITY.label(s) for s in slot_ids]
+    return {
+        "prospect_name": prospect_name,
+        "time_slots": labels,
+        "slots": [{"id": s, "label": label} for s, label in zip(slot_ids, labels)],
+    }
 
 
 @app.post("/schedule-meeting")
-async def schedule_meeting(prospect_name: str, time_slot: str, email: str):
-    """Create a calendar event using the chosen time slot."""
-    if not CALENDAR_ID:
+async def schedule_meeting(
+    prospect_name: str, time_slot: str, email: str, call_sid: str | None = None
+):
+    """Create a calendar event using the chosen time slot.
+
+    ``time_slot`` is a slot ID from ``/offer-time-slots`` or its label. Slots
+    the availability index covers are reserved in it before the event is
+    created, so a slot is never booked twice.
+    """
+    if not CALENDAR_ID and not TEAM_CALENDAR_IDS:
         raise ValueError("CALENDAR_ID environment variable not set")
 
-    global CURRENT_METRICS
-    try:
-        start_str, end_str = [s.strip() for s in time_slot.split("-")]
-        today = datetime.now(timezone.utc)
-        start_dt = datetime.strptime(start_str, "%I:%M %p")
-        end_dt = datetime.strptime(end_str, "%I:%M %p")
-        start = today.replace(hour=start_dt.hour, minute=start_dt.minute, second=0, microsecond=0)
-        end = today.replace(hour=end_dt.hour, minute=end_dt.minute, second=0, microsecond=0)
-    except Exception as exc:
-        logger.error("schedule.parse_failed", time_slot=time_slot, error=str(exc))
-        if CURRENT_METRICS is not None:
-            CURRENT_METRICS["calendar_errors"] += 1
-        return {"error": "Invalid time slot"}
+    ctx = CALLS.get(call_sid)
+    today = datetime.now(timezone.utc)
+    slot_id = AVAILABILITY.resolve(time_slot, today.date()) if AVAILABILITY else None
+    if slot_id is not None:
+        start, end = AVAILABILITY.slot_bounds(slot_id)
+    else:
+        try:
+            start_str, end_str = [s.strip() for s in time_slot.split("-")]
+            start_dt = datetime.strptime(start_str, "%I:%M %p")
+            end_dt = datetime.strptime(end_str, "%I:%M %p")
+            start = today.replace(
+                hour=start_dt.hour, minute=start_dt.minute, second=0, microsecond=0
+            )
+            end = today.replace(hour=end_dt.hour, minute=end_dt.minute, second=0, microsecond=0)
+        except Exception as exc:
+            logger.error("schedule.parse_failed", time_slot=time_slot, error=str(exc))
+            if ctx is not None:
+                ctx.calendar_errors += 1
+            return {"error": "Invalid time slot"}
+
+    calendar_id = CALENDAR_ID
+    reserved: list[str] = []
+    if slot_id is not None and AVAILABILITY.covers(booking_calendars(), start.date()):
+        calendar_id, reserved = reserve_slot(slot_id)
+        if calendar_id is None:
+            return {"error": "That time slot is no longer available"}
+    elif TEAM_CALENDAR_IDS:
+        try:
+            calendar_id = await pick_team_calendar(start, end)
+        except Exception as exc:
+            logger.error("schedule.team_lookup_failed", error=str(exc))
+            if ctx is not None:
+                ctx.calendar_errors += 1
+            return {"error": "Failed to schedule meeting"}
+        if calendar_id is None:
+            return {"error": "No one is free at that time"}
 
     try:
-        event = gcal.create_event(
-            CALENDAR_ID,
+        event = await CALENDAR.create_event(
+            calendar_id,
             start,
             end,
             f"Call with {prospect_name}"
@@ -208,28 +569,96 @@ async def schedule_meeting(prospect_name: str, time_slot: str, email: str):
         logger.info("schedule.created", event_id=event.get("id"))
     except Exception as exc:
         logger.error("schedule.failed", error=str(exc))
-        if CURRENT_METRICS is not None:
-            CURRENT_METRICS["calendar_errors"] += 1
+        if reserved:
+            AVAILABILITY.release(reserved, slot_id)
+        if ctx is not None:
+            ctx.calendar_errors += 1
         return {"error": "Failed to schedule meeting"}
+    if reserved:
+        AVAILABILITY.confirm(reserved, slot_id)
+
+    return {
+        "status": "scheduled",
+        "event_id": event.get("id"),
+        "email": email,
+        "calendar_id": calendar_id,
+    }
+
+
+def reserve_slot(slot_id: str) -> tuple[str | None, list[str]]:
+    """Mark ``slot_id`` booked in the availability index.
+
+    Returns the calendar to create the event on and the calendars reserved,
+    or ``(None, [])`` if the slot is no longer free. Team calendars follow
+    the same rules as :func:`pick_team_calendar`.
+    """
+    if not TEAM_CALENDAR_IDS:
+        reserved = [CALENDAR_ID]
+        calendar_id = CALENDAR_ID
+    elif TEAM_AVAILABILITY == gcal.ALL_FREE:
+        reserved = TEAM_CALENDAR_IDS
+        calendar_id = CALENDAR_ID or TEAM_CALENDAR_IDS[0]
+    else:
+        calendar_id = take_turn(AVAILABILITY.free_calendars(TEAM_CALENDAR_IDS, slot_id))
+        if calendar_id is None:
+            return None, []
+        reserved = [calendar_id]
+    if not AVAILABILITY.book(reserved, slot_id):
+        return None, []
+    return calendar_id, reserved
+
+
+def take_turn(free: list[str]) -> str | None:
+    """Return the next of the free team calendars, round-robin, or ``None`` if none is free."""
+    global _team_turn
+    if not free:
+        return None
+    _team_turn += 1
+    return free[_team_turn % len(free)]
+
 
-    return {"status": "scheduled", "event_id": event.get("id"), "email": email}
+async def pick_team_calendar(start: datetime, end: datetime) -> str | None:
+    """Return the team calendar to book ``start``-``end`` on, or ``None``.
+
+    With ``TEAM_AVAILABILITY=any`` the reps free for the whole slot take
+    turns; with ``all`` the meeting goes on ``CALENDAR_ID`` (or the first
+    team calendar) once everyone is free.
+    """
+    minutes = int((end - start).total_seconds() // 60)
+    if minutes <= 0:
+        return None
+    slots = await CALENDAR.team_free_slots(
+        TEAM_CALENDAR_IDS, start, end, mode=TEAM_AVAILABILITY, slot_minutes=minutes
+    )
+    if not slots or slots[0][0] != start:
+        return None
+    if TEAM_AVAILABILITY == gcal.ALL_FREE:
+        return CALENDAR_ID or TEAM_CALENDAR_IDS[0]
+    return take_turn(slots[0][2])
 
 
 @app.post("/end-call")
 async def end_call():
-    """Hang up the active call using Twilio's <Hangup> verb."""
-    global CURRENT_CALL_ID
-    if not CURRENT_CALL_ID:
+    """Hang up the active call when exactly one call is bridged."""
+    if not len(CALLS):
         return {"error": "No active call"}
+    ctx = CALLS.only()
+    if ctx is None:
+        return {"error": "Multiple active calls; use /end-call/{call_sid}"}
+    return await end_call_by_sid(ctx.call_id)
+
+
+@app.post("/end-call/{call_sid}")
+async def end_call_by_sid(call_sid: str):
+    """Hang up the given call using Twilio's <Hangup> verb."""
+    if call_sid not in CALLS:
+        return {"error": "No active call", "call_id": call_sid}
     try:
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        vr = VoiceResponse()
-        vr.hangup()
-        client.calls(CURRENT_CALL_ID).update(twiml=str(vr))
-        logger.info("call.hangup", call_id=CURRENT_CALL_ID)
-        return {"status": "hangup", "call_id": CURRENT_CALL_ID}
+        await TWILIO.hangup(call_sid)
+        logger.info("call.hangup", call_id=call_sid)
+        return {"status": "hangup", "call_id": call_sid}
     except Exception as exc:
-        logger.error("hangup.failed", call_id=CURRENT_CALL_ID, error=str(exc))
+        logger.error("hangup.failed", call_id=call_sid, error=str(exc))
         return {"error": "Failed to hang up"}
 
 
@@ -255,335 +684,480 @@ async def handle_media_stream(websocket: WebSocket):
     logger.info("client.connected")
     await websocket.accept()
 
-    async with websockets.connect(
-        "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview-2024-10-01&response_format=json",
+    setup_start = time.monotonic()
+    pooled = await REALTIME_POOL.checkout()
+    ctx = CallContext(
+        session_id=pooled.session_id,
+        openai_setup_seconds=time.monotonic() - setup_start,
+        session_fields=dict(pooled.session_fields or {}),
+    )
+    LIVE_METRICS.call_started(ctx)
+    if CALL_RECORDING_DIR:
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        ctx.recorder = CallRecorder(
+            os.path.join(CALL_RECORDING_DIR, f"{stamp}_{ctx.session_id or id(ctx)}.crec")
+        )
+    logger.info(
+        "openai.checkout",
+        pooled=pooled.pooled,
+        setup_ms=round(ctx.openai_setup_seconds * 1000, 1),
+        warmup_ms=round(pooled.setup_seconds * 1000, 1),
+    )
+    try:
+        await bridge_call(websocket, pooled.ws, ctx)
+    finally:
+        if pooled.ws.open:
+            await pooled.ws.close()
+
+
+async def connect_openai():
+    """Open a new OpenAI Realtime WebSocket."""
+    return await websockets.connect(
+        OPENAI_REALTIME_URL,
         extra_headers={
             "Authorization": f"Bearer {OPENAI_API_KEY}",
             "OpenAI-Beta": "realtime=v1",
         },
-    ) as openai_ws:
-        session = {"state": "awaiting_greeting"}
-        await send_session_update(openai_ws, session)
-        stream_sid = None
-        session_id = None
-        call_id = None
-        start_ts = None
-        transcripts = []
-        silence_count = 0
-        derailment_count = 0
-        guardrail_rejects = 0
-        latencies = []
-        speech_start_time = None
-        global CURRENT_METRICS
-        CURRENT_METRICS = {
-            "guardrail_rejects": 0,
-            "calendar_errors": 0,
-            "latencies": [],
-        }
+    )
 
-        async def receive_from_twilio():
-            """Receive audio data from Twilio and send it to the OpenAI Realtime API."""
-            nonlocal stream_sid, call_id, start_ts
-            try:
-                async for message in websocket.iter_text():
-                    data = json.loads(message)
-                    if data["event"] == "media" and openai_ws.open:
-                        audio_append = {
-                            "type": "input_audio_buffer.append",
-                            "audio": data["media"]["payload"],
-                        }
-                        await openai_ws.send(json.dumps(audio_append))
-                    elif data["event"] == "start":
-                        stream_sid = data["start"]["streamSid"]
-                        call_id = data["start"].get("callSid")
-                        start_ts = datetime.utcnow().isoformat()
-                        global CURRENT_CALL_ID
-                        CURRENT_CALL_ID = call_id
-                        logger.info(
-                            "stream.started",
-                            call_id=call_id,
-                            stream_sid=stream_sid,
-                            start_time=start_ts,
-                        )
-                    elif data["event"] == "dtmf":
-                        digits = (
-                            data.get("dtmf", {}).get("digits")
-                            or data.get("digits")
-                            or data.get("dtmf")
-                        )
-                        if digits:
-                            session.setdefault("digits", "")
-                            session["digits"] += digits
-                            logger.info(
-                                "digits.received", call_id=call_id, digits=digits
+
+async def configure_openai(openai_ws):
+    """Wait for ``session.created`` and send the initial session update.
+
+    Returns the session ID and the session fields sent so a call that
+    checks the session out only sends what differs.
+    """
+    session_id = None
+    created = codec.loads(await asyncio.wait_for(openai_ws.recv(), 10))
+    if created.get("type") == "session.created":
+        session_id = created["session"]["id"]
+    ctx = CallContext()
+    await send_session_update(openai_ws, ctx)
+    return session_id, ctx.session_fields
+
+
+# Pre-connected, pre-configured realtime sessions ready for new calls
+REALTIME_POOL = RealtimePool(
+    connect_openai,
+    configure_openai,
+    size=REALTIME_POOL_SIZE,
+    max_age=REALTIME_POOL_MAX_AGE,
+    health_interval=REALTIME_POOL_HEALTH_INTERVAL,
+)
+
+# Process-wide counters and histograms served on /metrics
+LIVE_METRICS = LiveMetrics(
+    CALLS, calendar=CALENDAR, realtime_pool=REALTIME_POOL, writer=CALL_WRITER
+)
+
+
+async def bridge_call(websocket, openai_ws, ctx: CallContext):
+    """Bridge one Twilio media stream to an open OpenAI Realtime socket.
+
+    All per-call state lives on ``ctx``; the context is registered in
+    ``CALLS`` once Twilio's ``start`` event reveals the call SID. Session
+    fields already applied to a pooled socket are carried in
+    ``ctx.session_fields`` and are not re-sent unless they change.
+    """
+    await send_session_update(openai_ws, ctx)
+    if TOPIC_MATCHER is not None and ctx.topics is None:
+        ctx.topics = TOPIC_MATCHER.stream()
+    if BARGE_IN_VAD and ctx.vad is None:
+        ctx.vad = VoiceActivityDetector(
+            VAD_ENERGY_DB, VAD_ZCR_MAX, VAD_START_FRAMES, VAD_HANGOVER_FRAMES
+        )
+
+    coalescer = FrameCoalescer(INBOUND_COALESCE_MS) if INBOUND_COALESCE_MS > 0 else None
+    flush_timer = None
+
+    async def send_inbound(payload: str, first_at: float):
+        if openai_ws.open:
+            await ctx.to_openai.send(codec.audio_append_frame(payload), audio=True)
+            ctx.trace.frame_forwarded(first_at, time.monotonic())
+
+    async def flush_inbound():
+        nonlocal flush_timer
+        if flush_timer is not None:
+            flush_timer.cancel()
+            flush_timer = None
+        payload = coalescer.flush()
+        if payload is not None:
+            await send_inbound(payload, coalescer.first_at)
+
+    def flush_on_timeout():
+        nonlocal flush_timer
+        flush_timer = None
+        # Take the window now so later frames cannot overtake it
+        payload = coalescer.flush()
+        if payload is not None:
+            asyncio.ensure_future(send_inbound(payload, coalescer.first_at))
+
+    async def hangup_and_close():
+        try:
+            await TWILIO.hangup(ctx.call_id)
+        except Exception as exc:
+            logger.error("hangup.failed", call_id=ctx.call_id, error=str(exc))
+        if openai_ws.open:
+            await openai_ws.close()
+        await websocket.close()
+
+    def on_overflow():
+        logger.warning("queue.hangup", call_id=ctx.call_id)
+        asyncio.ensure_future(hangup_and_close())
+
+    ctx.to_openai = LegWriter(
+        "openai",
+        openai_ws.send,
+        max_depth=LEG_QUEUE_SIZE,
+        policy=LEG_QUEUE_POLICY,
+        on_overflow=on_overflow,
+        wait=ctx.trace.inbound_queue,
+    ).start()
+    ctx.to_twilio = LegWriter(
+        "twilio",
+        websocket.send_text,
+        max_depth=LEG_QUEUE_SIZE,
+        policy=LEG_QUEUE_POLICY,
+        on_overflow=on_overflow,
+        wait=ctx.trace.outbound_queue,
+    ).start()
+
+    async def clear_playback():
+        """Drop queued reply audio and tell Twilio to drop what it buffered."""
+        ctx.to_twilio.discard_audio()
+        await ctx.to_twilio.send(codec.dumps({"streamSid": ctx.stream_sid, "event": "clear"}))
+
+    async def barge_in():
+        """Stop the bot's playback as soon as the caller starts talking."""
+        ctx.barged_in = True
+        ctx.playback_until = 0.0
+        await clear_playback()
+        if openai_ws.open:
+            await ctx.to_openai.send(codec.dumps({"type": "response.cancel"}))
+        latency = time.monotonic() - ctx.vad.onset_at
+        ctx.trace.barge_in.record(latency)
+        logger.info("barge_in.local", call_id=ctx.call_id, latency_ms=round(latency * 1000, 1))
+
+    async def receive_from_twilio():
+        """Receive audio data from Twilio and send it to the OpenAI Realtime API."""
+        nonlocal flush_timer
+        try:
+            async for message in websocket.iter_text():
+                received = time.monotonic()
+                # Media frames are forwarded without decoding the JSON
+                if codec.peek_event(message) == "media":
+                    payload = codec.peek_string(message, "payload")
+                    if ctx.recorder is not None and payload is not None:
+                        ctx.recorder.twilio_media(payload)
+                    if payload is None:
+                        continue
+                    if coalescer is None:
+                        await send_inbound(payload, received)
+                    else:
+                        window = coalescer.add(payload, received)
+                        if window is not None:
+                            if flush_timer is not None:
+                                flush_timer.cancel()
+                                flush_timer = None
+                            await send_inbound(window, coalescer.first_at)
+                        elif flush_timer is None:
+                            flush_timer = asyncio.get_running_loop().call_later(
+                                INBOUND_FLUSH_TIMEOUT_MS / 1000, flush_on_timeout
                             )
-                    elif data["event"] == "media_stream_timeout":
-                        logger.info("silence.detected", call_id=call_id)
-                        silence_count += 1
-                        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-                        if silence_count == 1:
-                            vr = VoiceResponse()
-                            vr.say("I didn't catch that. Are you still there?")
-                            client.calls(call_id).update(twiml=str(vr))
-                        else:
-                            logger.info("silence.hangup", call_id=call_id)
-                            client.calls(call_id).update(status="completed")
-                            if openai_ws.open:
-                                await openai_ws.close()
-                            await websocket.close()
-                            break
-            except WebSocketDisconnect:
-                logger.info("client.disconnected", call_id=call_id)
-                if openai_ws.open:
-                    await openai_ws.close()
-
-        async def send_to_twilio():
-            """Receive events from the OpenAI Realtime API, send audio back to Twilio."""
-            nonlocal stream_sid, session_id, transcripts, session, derailment_count
-            try:
-                async for openai_message in openai_ws:
-                    response = json.loads(openai_message)
-                    if response["type"] in LOG_EVENT_TYPES:
+                    if ctx.vad is not None:
+                        speech = ctx.vad.process_payload(payload, received)
+                        if speech == SPEECH_START and time.monotonic() < ctx.playback_until:
+                            await barge_in()
+                        elif speech == SPEECH_END:
+                            ctx.barged_in = False
+                    continue
+                if ctx.recorder is not None:
+                    ctx.recorder.twilio_event(message)
+                data = codec.loads(message)
+                if coalescer is not None and data["event"] in INBOUND_FLUSH_EVENTS:
+                    await flush_inbound()
+                if data["event"] == "start":
+                    ctx.stream_sid = data["start"]["streamSid"]
+                    ctx.call_id = data["start"].get("callSid")
+                    ctx.start_ts = datetime.utcnow().isoformat()
+                    if ctx.call_id:
+                        CALLS.register(ctx)
+                    logger.info(
+                        "stream.started",
+                        call_id=ctx.call_id,
+                        stream_sid=ctx.stream_sid,
+                        start_time=ctx.start_ts,
+                        active_calls=len(CALLS),
+                    )
+                elif data["event"] == "dtmf":
+                    digits = (
+                        data.get("dtmf", {}).get("digits")
+                        or data.get("digits")
+                        or data.get("dtmf")
+                    )
+                    if digits:
+                        ctx.digits += digits
                         logger.info(
-                            "openai.event",
-                            call_id=call_id,
-                            event=response["type"],
-                            payload=response,
+                            "digits.received", call_id=ctx.call_id, digits=digits
                         )
-                    if response["type"] == "session.created":
-                        session_id = response["session"]["id"]
-                    if response["type"] == "session.updated":
-                        logger.info("session.updated", call_id=call_id)
-                    if response["type"] == "response.audio.delta" and response.get(
-                        "delta"
-                    ):
+                elif data["event"] == "media_stream_timeout":
+                    logger.info("silence.detected", call_id=ctx.call_id)
+                    ctx.silence_count += 1
+                    if ctx.silence_count == 1:
+                        try:
+                            await TWILIO.say(
+                                ctx.call_id, "I didn't catch that. Are you still there?"
+                            )
+                        except Exception as exc:
+                            logger.error(
+                                "silence.prompt_failed", call_id=ctx.call_id, error=str(exc)
+                            )
+                    else:
+                        logger.info("silence.hangup", call_id=ctx.call_id)
+                        try:
+                            await TWILIO.update_call(ctx.call_id, status="completed")
+                        except Exception as exc:
+                            logger.error(
+                                "hangup.failed", call_id=ctx.call_id, error=str(exc)
+                            )
+                        if openai_ws.open:
+                            await openai_ws.close()
+                        await websocket.close()
+                        break
+        except WebSocketDisconnect:
+            logger.info("client.disconnected", call_id=ctx.call_id)
+            if openai_ws.open:
+                await openai_ws.close()
+
+    async def send_to_twilio():
+        """Receive events from the OpenAI Realtime API, send audio back to Twilio."""
+        try:
+            async for openai_message in openai_ws:
+                received = time.monotonic()
+                # Audio deltas are forwarded without decoding the JSON
+                if codec.peek_type(openai_message) == "response.audio.delta":
+                    ctx.trace.audio_delta(received)
+                    delta = codec.peek_string(openai_message, "delta")
+                    if ctx.recorder is not None and delta:
+                        ctx.recorder.openai_audio(delta)
+                    if delta:
                         try:
-                            audio_payload = base64.b64encode(
-                                base64.b64decode(response["delta"])
-                            ).decode("utf-8")
-                            audio_delta = {
-                                "event": "media",
-                                "streamSid": stream_sid,
-                                "media": {"payload": audio_payload},
-                            }
-                            await websocket.send_json(audio_delta)
+                            audio_payload = passthrough_payload(
+                                delta, validate=AUDIO_VALIDATE
+                            )
+                            await ctx.to_twilio.send(
+                                codec.twilio_media_frame(ctx.stream_sid, audio_payload),
+                                audio=True,
+                            )
+                            sent = time.monotonic()
+                            ctx.trace.audio_sent(received, sent)
+                            if ctx.vad is not None:
+                                # 8 kHz μ-law: one byte per sample, 4 base64 chars per 3 bytes
+                                ctx.playback_until = (
+                                    max(ctx.playback_until, sent) + len(delta) * 0.75 / 8000
+                                )
                         except Exception as e:
                             logger.error(
-                                "audio.process_error", call_id=call_id, error=str(e)
+                                "audio.process_error", call_id=ctx.call_id, error=str(e)
                             )
-                    if response["type"] == "conversation.item.created":
-                        transcripts.append(response)
-                        logger.info(
-                            "conversation.item", call_id=call_id, item=response
+                    continue
+                if ctx.recorder is not None:
+                    ctx.recorder.openai_event(openai_message)
+                response = codec.loads(openai_message)
+                if response["type"] in LOG_EVENT_TYPES:
+                    logger.info(
+                        "openai.event",
+                        call_id=ctx.call_id,
+                        event_type=response["type"],
+                        payload=response,
+                    )
+                if response["type"] in TOPIC_DELTA_TYPES:
+                    topic = ctx.topics.feed(response.get("delta")) if ctx.topics else None
+                    if topic is not None:
+                        logger.warning(
+                            "topic.disallowed",
+                            call_id=ctx.call_id,
+                            topic=topic,
+                            response_id=response.get("response_id"),
                         )
-                        content = None
-                        role = None
-                        if isinstance(response.get("message"), dict):
-                            role = response["message"].get("role")
-                            content = response["message"].get("content")
-                        elif "content" in response:
-                            content = response.get("content")
-                            role = response.get("role") or response.get("speaker")
-                        if role == "assistant" and speech_start_time is not None:
-                            latency = time.monotonic() - speech_start_time
-                            latencies.append(latency)
-                            if CURRENT_METRICS is not None:
-                                CURRENT_METRICS["latencies"].append(latency)
-                            speech_start_time = None
-                        if content:
-                            if contains_disallowed_topic(content):
-                                logger.warning(
-                                    "topic.disallowed",
-                                    call_id=call_id,
-                                    content=content,
+                        ctx.derailment_count += 1
+                        ctx.guardrail_rejects += 1
+                        # Stop generation and drop audio Twilio has buffered
+                        if openai_ws.open:
+                            await ctx.to_openai.send(codec.dumps({"type": "response.cancel"}))
+                        await clear_playback()
+                        if ctx.derailment_count >= 3:
+                            await hangup_and_close()
+                            break
+                    continue
+                if response["type"] == "response.created" and ctx.topics is not None:
+                    ctx.topics.reset()
+                if response["type"] == "session.created":
+                    ctx.session_id = response["session"]["id"]
+                if response["type"] == "session.updated":
+                    logger.info("session.updated", call_id=ctx.call_id)
+                if response["type"] == "conversation.item.created":
+                    if ctx.transcript is None:
+                        ctx.transcript = TranscriptSink(
+                            TRANSCRIPT_DIR,
+                            ctx.call_id,
+                            ctx.session_id,
+                            flush_interval=TRANSCRIPT_FLUSH_INTERVAL,
+                        )
+                    ctx.transcript.append(openai_message, response)
+                    logger.info(
+                        "conversation.item", call_id=ctx.call_id, item=response
+                    )
+                    role, content = item_role_content(response)
+                    if role == "assistant" and ctx.speech_start_time is not None:
+                        ctx.latencies.append(time.monotonic() - ctx.speech_start_time)
+                        ctx.speech_start_time = None
+                    if content:
+                        if role == "assistant" and ctx.topics and ctx.topics.matched:
+                            # Already cancelled while the response streamed
+                            continue
+                        if contains_disallowed_topic(content):
+                            logger.warning(
+                                "topic.disallowed",
+                                call_id=ctx.call_id,
+                                content=content,
+                            )
+                            ctx.derailment_count += 1
+                            ctx.guardrail_rejects += 1
+                            if openai_ws.open:
+                                await ctx.to_openai.send(
+                                    codec.dumps({"type": "response.cancel"})
                                 )
-                                derailment_count += 1
-                                guardrail_rejects += 1
-                                if CURRENT_METRICS is not None:
-                                    CURRENT_METRICS["guardrail_rejects"] += 1
-                                if openai_ws.open:
-                                    await openai_ws.send(
-                                        json.dumps({"type": "response.cancel"})
-                                    )
-                                if derailment_count >= 3:
-                                    client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-                                    vr = VoiceResponse()
-                                    vr.hangup()
-                                    client.calls(call_id).update(twiml=str(vr))
-                                    if openai_ws.open:
-                                        await openai_ws.close()
-                                    await websocket.close()
-                                    break
-                                continue
-                            intent = None
-                            try:
-                                llm_output = intent_guard.parse(
-                                    content if isinstance(content, str) else json.dumps(content)
+                            if ctx.derailment_count >= 3:
+                                await hangup_and_close()
+                                break
+                            continue
+                        validation_start = time.perf_counter()
+                        result = INTENT_VALIDATOR.validate(
+                            content if isinstance(content, str) else codec.dumps(content)
+                        )
+                        ctx.trace.validation.record(time.perf_counter() - validation_start)
+                        if result.error is not None:
+                            logger.warning(
+                                "intent.validation_failed",
+                                call_id=ctx.call_id,
+                                error=result.error,
+                                content=content,
+                            )
+                            ctx.guardrail_rejects += 1
+                        intent = result.intent
+                        if intent:
+                            state = FLOW[ctx.state]
+                            transition = state.on(intent)
+                            if transition is not None:
+                                ctx.state = transition.target
+                                await send_session_update(
+                                    ctx.to_openai, ctx, transition.updates
                                 )
-                                intent = llm_output.intent
-                            except Exception as exc:
+                            elif state.rejects(intent):
                                 logger.warning(
-                                    "intent.validation_failed",
-                                    call_id=call_id,
-                                    error=str(exc),
-                                    content=content,
+                                    "state.violation",
+                                    call_id=ctx.call_id,
+                                    state=ctx.state,
+                                    intent=intent,
                                 )
-                                guardrail_rejects += 1
-                                if CURRENT_METRICS is not None:
-                                    CURRENT_METRICS["guardrail_rejects"] += 1
-                            if intent:
-                                if session["state"] == "awaiting_greeting":
-                                    if intent == "greeting":
-                                        session["state"] = "awaiting_date"
-                                        await send_session_update(openai_ws, session)
-                                    else:
-                                        logger.warning(
-                                            "state.violation",
-                                            call_id=call_id,
-                                            state=session["state"],
-                                            intent=intent,
-                                        )
-                                        derailment_count += 1
-                                        if derailment_count >= 3:
-                                            client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-                                            vr = VoiceResponse()
-                                            vr.hangup()
-                                            client.calls(call_id).update(twiml=str(vr))
-                                            if openai_ws.open:
-                                                await openai_ws.close()
-                                            await websocket.close()
-                                            break
-                                elif session["state"] == "awaiting_date":
-                                    if intent == "ask_date":
-                                        session["state"] = "complete"
-                                        await send_session_update(openai_ws, session)
-                                    elif intent != "greeting":
-                                        logger.warning(
-                                            "state.violation",
-                                            call_id=call_id,
-                                            state=session["state"],
-                                            intent=intent,
-                                        )
-                                        derailment_count += 1
-                                        if derailment_count >= 3:
-                                            client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-                                            vr = VoiceResponse()
-                                            vr.hangup()
-                                            client.calls(call_id).update(twiml=str(vr))
-                                            if openai_ws.open:
-                                                await openai_ws.close()
-                                            await websocket.close()
-                                            break
-                    if response["type"] == "input_audio_buffer.speech_started":
-                        logger.info("speech.start", call_id=call_id)
-                        speech_start_time = time.monotonic()
-
-                        # Send clear event to Twilio
-                        await websocket.send_json({"streamSid": stream_sid, "event": "clear"})
-
-                        logger.info("speech.cancel", call_id=call_id)
-
-                        # Send cancel message to OpenAI
-                        interrupt_message = {"type": "response.cancel"}
-                        await openai_ws.send(json.dumps(interrupt_message))
-            except Exception as e:
-                logger.error("send_to_twilio.error", call_id=call_id, error=str(e))
+                                ctx.derailment_count += 1
+                                if ctx.derailment_count >= 3:
+                                    await hangup_and_close()
+                                    break
+                if response["type"] == "input_audio_buffer.speech_stopped":
+                    ctx.trace.speech_stopped(received)
+                if response["type"] == "input_audio_buffer.speech_started":
+                    logger.info("speech.start", call_id=ctx.call_id)
+                    ctx.speech_start_time = time.monotonic()
+                    if ctx.barged_in:
+                        # Playback was already cleared by the local detector
+                        continue
 
-        try:
-            await asyncio.gather(receive_from_twilio(), send_to_twilio())
-        finally:
-            stop_ts = datetime.utcnow().isoformat()
-            global CURRENT_CALL_ID
-            CURRENT_CALL_ID = None
-            logger.info(
-                "call.completed",
-                call_id=call_id,
-                start_time=start_ts,
-                stop_time=stop_ts,
-                outcome=transcripts,
-            )
+                    # Send clear event to Twilio
+                    await clear_playback()
 
-            # Persist transcript to file and record summary in the database
-            transcript_dir = os.path.join(os.path.dirname(__file__), "transcripts")
-            os.makedirs(transcript_dir, exist_ok=True)
-            transcript_file = os.path.join(
-                transcript_dir, f"{call_id}_{session_id or 'session'}.json"
-            )
-            try:
-                with open(transcript_file, "w", encoding="utf-8") as f:
-                    json.dump(transcripts, f, ensure_ascii=False, indent=2)
-            except Exception as exc:
-                logger.error("transcript.save_failed", call_id=call_id, error=str(exc))
-                transcript_file = None
-
-            # Append plain text transcript for QA review
-            qa_file = os.path.join(transcript_dir, f"call_{call_id}.txt")
-            try:
-                with open(qa_file, "a", encoding="utf-8") as f:
-                    for item in transcripts:
-                        role = None
-                        content = None
-                        if isinstance(item.get("message"), dict):
-                            role = item["message"].get("role")
-                            content = item["message"].get("content")
-                        else:
-                            role = item.get("role") or item.get("speaker")
-                            content = item.get("content")
-                        if content:
-                            prefix = "GPT-4o" if role == "assistant" else "ASR"
-                            f.write(f"{prefix}: {content}\n")
-            except Exception as exc:
-                logger.error("qa_transcript.save_failed", call_id=call_id, error=str(exc))
-
-            try:
-                duration = (
-                    datetime.fromisoformat(stop_ts)
-                    - datetime.fromisoformat(start_ts)
-                ).total_seconds()
-            except Exception:
-                duration = 0.0
-
-            save_call_summary(
-                call_id=call_id,
-                duration=duration,
-                outcome="completed",
-                scheduled_time=datetime.fromisoformat(start_ts),
-                transcript_path=transcript_file,
-            )
+                    logger.info("speech.cancel", call_id=ctx.call_id)
 
-            metrics = compute_call_metrics(
-                transcripts=transcripts,
-                start_time=start_ts,
-                stop_time=stop_ts,
-                guardrail_rejects=guardrail_rejects,
-                calendar_errors=CURRENT_METRICS.get("calendar_errors", 0)
-                if CURRENT_METRICS
-                else 0,
-                latencies=latencies,
-            )
-            write_report(call_id, metrics)
-
-            CURRENT_METRICS = None
-
-
-async def send_session_update(openai_ws, session):
-    """Send session update to OpenAI WebSocket."""
-    slots = get_todays_free_slots()
-    instructions = SYSTEM_MESSAGE
-    if slots:
-        formatted = "\n".join(f"- {s}" for s in slots)
-        instructions += f"\n\nToday's available slots:\n{formatted}"
-    session_update = {
-        "type": "session.update",
-        "session": {
-            "input_audio_format": "g711_ulaw",
-            "output_audio_format": "g711_ulaw",
-            "voice": VOICE,
-            "instructions": instructions,
-            "modalities": ["text", "audio"],
-            "temperature": 0.2,
-            "state": session.get("state"),
+                    # Send cancel message to OpenAI
+                    interrupt_message = {"type": "response.cancel"}
+                    await ctx.to_openai.send(codec.dumps(interrupt_message))
+        except Exception as e:
+            logger.error("send_to_twilio.error", call_id=ctx.call_id, error=str(e))
+
+    try:
+        await asyncio.gather(receive_from_twilio(), send_to_twilio())
+    finally:
+        await ctx.to_twilio.close()
+        await ctx.to_openai.close()
+        CALLS.unregister(ctx.call_id)
+        await finalize_call(ctx)
+
+
+async def finalize_call(ctx: CallContext) -> None:
+    """Queue the transcript, call summary and metrics report for ``ctx``."""
+    ctx.stop_ts = datetime.utcnow().isoformat()
+    LIVE_METRICS.call_finished(ctx)
+    logger.info(
+        "call.completed",
+        call_id=ctx.call_id,
+        start_time=ctx.start_ts,
+        stop_time=ctx.stop_ts,
+        items=len(ctx.transcript) if ctx.transcript is not None else 0,
+    )
+    if ctx.transcript is not None:
+        await ctx.transcript.aclose()
+    if ctx.recorder is not None:
+        ctx.recorder.close()
+        logger.info("recorder.closed", call_id=ctx.call_id, path=ctx.recorder.path)
+    await CALL_WRITER.submit(ctx)
+    logger.info("slot_cache.stats", call_id=ctx.call_id, **gcal.SLOT_CACHE.stats())
+    logger.info("realtime_pool.stats", call_id=ctx.call_id, **REALTIME_POOL.stats())
+    logger.info("persist.stats", call_id=ctx.call_id, **CALL_WRITER.stats())
+    logger.info("intent_validator.stats", call_id=ctx.call_id, **INTENT_VALIDATOR.stats())
+    for writer in (ctx.to_openai, ctx.to_twilio):
+        if writer is not None:
+            logger.info("queue.stats", call_id=ctx.call_id, leg=writer.name, **writer.stats())
+    logger.info(
+        "latency.stats",
+        call_id=ctx.call_id,
+        **{
+            f"{stage}_{q}_ms": round(histogram.percentile(int(q[1:])) * 1000, 2)
+            for stage, histogram in ctx.trace.histograms().items()
+            for q in ("p50", "p99")
         },
+    )
+    if LOG_SINK is not None:
+        logger.info("log.stats", call_id=ctx.call_id, **LOG_SINK.stats())
+
+
+async def send_session_update(openai_ws, ctx: CallContext, fields=None):
+    """Send the session fields that differ from what the socket already has.
+
+    ``fields`` limits the candidates to the names a transition declares;
+    all fields are considered when it is ``None``. Returns the fields sent.
+    """
+    slots = await get_todays_free_slots(ctx)
+    session = render_session(SYSTEM_MESSAGE, ctx.state, tuple(slots), VOICE)
+    if fields is not None:
+        session = {name: session[name] for name in fields}
+    changed = {
+        name: value
+        for name, value in session.items()
+        if name not in ctx.session_fields or ctx.session_fields[name] != value
     }
-    logger.info("session.update.send", payload=session_update)
-    await openai_ws.send(json.dumps(session_update))
+    if not changed:
+        return changed
+    message = codec.dumps({"type": "session.update", "session": changed})
+    ctx.session_fields.update(changed)
+    ctx.session_updates += 1
+    ctx.session_update_bytes += len(message)
+    logger.info(
+        "session.update.send",
+        call_id=ctx.call_id,
+        state=ctx.state,
+        fields=sorted(changed),
+        bytes=len(message),
+    )
+    await openai_ws.send(message)
+    return changed
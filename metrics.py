@@ -1,18 +1,58 @@
+import math
 import os
 from datetime import datetime
 from statistics import mean
-from typing import List, Dict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sized
+
+import codec
+from latency import PERCENTILES, LatencyHistogram
+
+# Report labels for the CallTrace histograms, in report order
+STAGE_LABELS = {
+    "first_audio": "Time to First Audio",
+    "response": "Speech Stopped to First Delta",
+    "inbound": "Inbound Forwarding (Twilio -> OpenAI)",
+    "outbound": "Outbound Forwarding (OpenAI -> Twilio)",
+    "validation": "Intent Validation per Item",
+    "barge_in": "Barge-in (Speech Onset to Clear)",
+    "inbound_queue": "Queue Wait (to OpenAI)",
+    "outbound_queue": "Queue Wait (to Twilio)",
+}
+
+# One JSON line per call, appended next to the reports and read by analytics
+CALL_RECORDS_FILE = "calls.jsonl"
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """Return the :data:`latency.PERCENTILES` of ``values`` (nearest rank)."""
+    ordered = sorted(values)
+    result = {}
+    for q in PERCENTILES:
+        if ordered:
+            rank = max(1, math.ceil(len(ordered) * q / 100))
+            result[f"p{q}"] = ordered[rank - 1]
+        else:
+            result[f"p{q}"] = 0.0
+    return result
 
 
 def compute_call_metrics(
-    transcripts: List[dict],
+    transcripts: Sized,
     start_time: str,
     stop_time: str,
     guardrail_rejects: int,
     calendar_errors: int,
     latencies: List[float],
+    setup_latency: float = 0.0,
+    session_update_bytes: int = 0,
+    histograms: Optional[Mapping[str, LatencyHistogram]] = None,
 ) -> Dict[str, float]:
-    """Return computed metrics for a call."""
+    """Return computed metrics for a call.
+
+    ``histograms`` are the stage histograms of a :class:`latency.CallTrace`;
+    each contributes ``<stage>_p50``, ``_p95``, ``_p99``, ``_max`` and
+    ``_count`` entries.
+    """
     try:
         duration = (
             datetime.fromisoformat(stop_time) - datetime.fromisoformat(start_time)
@@ -21,13 +61,21 @@ def compute_call_metrics(
         duration = 0.0
     tps = len(transcripts) / duration if duration else 0.0
     avg_latency = mean(latencies) if latencies else 0.0
-    return {
+    metrics = {
         "tps": tps,
         "avg_latency": avg_latency,
         "guardrail_rejects": guardrail_rejects,
         "calendar_errors": calendar_errors,
         "duration": duration,
+        "setup_latency": setup_latency,
+        "session_update_bytes": session_update_bytes,
     }
+    for name, value in percentiles(latencies).items():
+        metrics[f"latency_{name}"] = value
+    for stage, histogram in (histograms or {}).items():
+        for name, value in histogram.summary().items():
+            metrics[f"{stage}_{name}"] = value
+    return metrics
 
 
 def write_report(call_id: str, metrics: Dict[str, float], reports_dir: str = "reports") -> str:
@@ -40,4 +88,60 @@ def write_report(call_id: str, metrics: Dict[str, float], reports_dir: str = "re
         f.write(f"Average Latency: {metrics['avg_latency']:.3f} seconds\n")
         f.write(f"Guardrail Rejects: {metrics['guardrail_rejects']}\n")
         f.write(f"Calendar Errors: {metrics['calendar_errors']}\n")
+        f.write(f"OpenAI Setup Latency: {metrics.get('setup_latency', 0.0):.3f} seconds\n")
+        f.write(f"Session Update Bytes: {metrics.get('session_update_bytes', 0)}\n")
+        if "latency_p50" in metrics:
+            f.write(
+                "Turn Latency p50/p95/p99: "
+                + " / ".join(f"{metrics[f'latency_p{q}']:.3f}" for q in PERCENTILES)
+                + " seconds\n"
+            )
+        stages = [s for s in STAGE_LABELS if f"{s}_count" in metrics]
+        if stages:
+            f.write("\n## Stage Latency (ms)\n\n")
+            f.write("| Stage | " + " | ".join(f"p{q}" for q in PERCENTILES) + " | Max | Count |\n")
+            f.write("|---" * (len(PERCENTILES) + 3) + "|\n")
+            for stage in stages:
+                cells = [f"{metrics[f'{stage}_p{q}'] * 1000:.1f}" for q in PERCENTILES]
+                cells.append(f"{metrics[f'{stage}_max'] * 1000:.1f}")
+                cells.append(str(metrics[f"{stage}_count"]))
+                f.write(f"| {STAGE_LABELS[stage]} | " + " | ".join(cells) + " |\n")
+    return path
+
+
+def call_record(
+    call_id: str,
+    start_time: str,
+    metrics: Mapping[str, float],
+    items: int,
+    turns: int,
+) -> Dict[str, Any]:
+    """Return the machine-readable record of a call for :mod:`analytics`.
+
+    ``items`` is the number of transcript items and ``turns`` the number of
+    measured turn latencies. Stage latencies are included only for stages
+    that were observed.
+    """
+    record: Dict[str, Any] = {
+        "call_id": call_id,
+        "start": start_time,
+        "items": items,
+        "turns": turns,
+    }
+    for key in ("duration", "avg_latency", "guardrail_rejects", "calendar_errors", "setup_latency"):
+        record[key] = metrics.get(key, 0)
+    if metrics.get("first_audio_count"):
+        record["first_audio"] = metrics["first_audio_p50"]
+    if metrics.get("response_count"):
+        record["response_p95"] = metrics["response_p95"]
+    return record
+
+
+def append_call_records(records: Iterable[Mapping[str, Any]], reports_dir: str = "reports") -> str:
+    """Append records to :data:`CALL_RECORDS_FILE` in one write and return its path."""
+    os.makedirs(reports_dir, exist_ok=True)
+    path = os.path.join(reports_dir, CALL_RECORDS_FILE)
+    data = "".join(codec.dumps(record) + "\n" for record in records)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(data)
     return path
@@ -0,0 +1,216 @@
+"""Background persistence for finished calls.
+
+Ending a call used to write the database row and the markdown report
+synchronously on the event loop, stalling audio for every other live call.
+:class:`CallWriter` takes finished :class:`~call_context.CallContext`
+objects from a bounded queue and writes them in batches on a dedicated
+thread, flushing when a batch fills or ``flush_interval`` elapses, and
+drains the queue on shutdown. Transcripts are streamed to disk during the
+call by :mod:`transcript_sink`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import structlog
+
+from call_context import CallContext
+from db import save_call_summaries
+from latency import LatencyHistogram
+from metrics import append_call_records, call_record, compute_call_metrics, write_report
+
+logger = structlog.get_logger()
+
+
+class CallWriter:
+    """Batching writer for end-of-call artifacts.
+
+    Parameters
+    ----------
+    reports_dir: str
+        Directory for :func:`metrics.write_report` reports and the
+        :func:`metrics.append_call_records` file.
+    batch_size: int
+        Calls written per database transaction at most.
+    flush_interval: float
+        Seconds a partial batch may wait before it is flushed.
+    max_queue: int
+        Finished calls that may wait; :meth:`submit` waits when it is full.
+    """
+
+    def __init__(
+        self,
+        reports_dir: str = "reports",
+        *,
+        batch_size: int = 20,
+        flush_interval: float = 1.0,
+        max_queue: int = 1000,
+    ):
+        self.reports_dir = reports_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persist")
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_write_seconds = 0.0
+        self.max_write_seconds = 0.0
+        self.max_queue_wait_seconds = 0.0
+        # Recorded on the event loop, so /metrics can read them without locks
+        self.write_latency = LatencyHistogram()
+        self.queue_wait = LatencyHistogram()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        """Start the background flush task if it is not running."""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, ctx: CallContext) -> None:
+        """Queue a finished call, waiting for room if the queue is full."""
+        await self.start()
+        await self._queue.put((time.monotonic(), ctx))
+
+    async def close(self) -> None:
+        """Flush everything queued, then stop the flush task."""
+        if self._queue is not None and self._task is not None:
+            await self._queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, float]:
+        """Return queue depth, throughput and write latency counters."""
+        return {
+            "queue_depth": self.queue_depth,
+            "written": self.written,
+            "batches": self.batches,
+            "errors": self.errors,
+            "last_write_seconds": self.last_write_seconds,
+            "max_write_seconds": self.max_write_seconds,
+            "max_queue_wait_seconds": self.max_queue_wait_seconds,
+        }
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            handed_off = time.monotonic()
+            for queued_at, _ in batch:
+                self.queue_wait.record(handed_off - queued_at)
+            try:
+                elapsed = await loop.run_in_executor(self._executor, self._write_batch, batch)
+                self.write_latency.record(elapsed)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: List[Tuple[float, CallContext]]) -> float:
+        started = time.monotonic()
+        rows = []
+        records = []
+        for queued_at, ctx in batch:
+            self.max_queue_wait_seconds = max(
+                self.max_queue_wait_seconds, started - queued_at
+            )
+            try:
+                row, record = self._write_call(ctx)
+                rows.append(row)
+                records.append(record)
+            except Exception as exc:
+                self.errors += 1
+                logger.error("persist.call_failed", call_id=ctx.call_id, error=str(exc))
+        if records:
+            try:
+                append_call_records(records, self.reports_dir)
+            except Exception as exc:
+                logger.error("persist.records_failed", calls=len(records), error=str(exc))
+        try:
+            save_call_summaries(rows)
+            self.written += len(rows)
+        except Exception as exc:
+            self.errors += len(rows)
+            logger.error(
+                "persist.db_failed",
+                call_ids=[row["call_id"] for row in rows],
+                error=str(exc),
+            )
+        elapsed = time.monotonic() - started
+        self.batches += 1
+        self.last_write_seconds = elapsed
+        self.max_write_seconds = max(self.max_write_seconds, elapsed)
+        logger.info(
+            "persist.flush",
+            calls=len(batch),
+            seconds=round(elapsed, 4),
+            queue_depth=self.queue_depth,
+        )
+        return elapsed
+
+    def _write_call(self, ctx: CallContext) -> Tuple[dict, dict]:
+        """Write the metrics report and return the summary row and call record."""
+        try:
+            duration = (
+                datetime.fromisoformat(ctx.stop_ts)
+                - datetime.fromisoformat(ctx.start_ts)
+            ).total_seconds()
+        except Exception:
+            duration = 0.0
+
+        transcript = ctx.transcript
+        metrics = compute_call_metrics(
+            transcripts=transcript if transcript is not None else [],
+            start_time=ctx.start_ts,
+            stop_time=ctx.stop_ts,
+            guardrail_rejects=ctx.guardrail_rejects,
+            calendar_errors=ctx.calendar_errors,
+            latencies=ctx.latencies,
+            setup_latency=ctx.openai_setup_seconds,
+            session_update_bytes=ctx.session_update_bytes,
+            histograms=ctx.trace.histograms(),
+        )
+        write_report(ctx.call_id, metrics, self.reports_dir)
+        record = call_record(
+            ctx.call_id,
+            ctx.start_ts,
+            metrics,
+            items=len(transcript) if transcript is not None else 0,
+            turns=len(ctx.latencies),
+        )
+
+        row = {
+            "call_id": ctx.call_id,
+            "duration": duration,
+            "outcome": "completed",
+            "scheduled_time": datetime.fromisoformat(ctx.start_ts) if ctx.start_ts else None,
+            "transcript_path": transcript.path
+            if transcript is not None and not transcript.failed
+            else None,
+        }
+        return row, record
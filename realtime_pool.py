@@ -0,0 +1,209 @@
+"""Warm pool of pre-connected OpenAI Realtime sessions.
+
+Opening the realtime WebSocket costs a TLS handshake, the server's session
+setup and our initial ``session.update``. :class:`RealtimePool` does that
+work ahead of time so a call can check out a ready session the moment its
+Twilio stream starts. Idle sessions are pinged periodically and recycled
+once they reach ``max_age``; a checkout falls back to a cold connect when
+the pool is empty.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import structlog
+
+from latency import LatencyHistogram
+
+logger = structlog.get_logger()
+
+Connect = Callable[[], Awaitable[Any]]
+# Returns (session_id, session fields sent) for a fresh connection
+Configure = Callable[[Any], Awaitable[Tuple[Optional[str], Optional[dict]]]]
+
+
+@dataclass
+class PooledSession:
+    """A connected, configured realtime session."""
+
+    ws: Any
+    created_at: float
+    setup_seconds: float
+    session_id: Optional[str] = None
+    session_fields: Optional[dict] = None
+    pooled: bool = False
+
+
+class RealtimePool:
+    """Keep ``size`` configured realtime sessions ready for checkout.
+
+    Parameters
+    ----------
+    connect: callable
+        Coroutine function returning an open WebSocket.
+    configure: callable, optional
+        Coroutine run on each new connection; see :data:`Configure`.
+    size: int
+        Number of idle sessions to keep ready. ``0`` disables warming and
+        every checkout connects on demand.
+    max_age: float
+        Seconds after which an idle session is closed and replaced.
+    health_interval: float
+        Seconds between health checks of idle sessions.
+    ping_timeout: float
+        Seconds to wait for a pong before a session is considered dead.
+    """
+
+    def __init__(
+        self,
+        connect: Connect,
+        configure: Optional[Configure] = None,
+        *,
+        size: int = 2,
+        max_age: float = 300.0,
+        health_interval: float = 15.0,
+        ping_timeout: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._connect = connect
+        self._configure = configure
+        self.size = size
+        self.max_age = max_age
+        self.health_interval = health_interval
+        self.ping_timeout = ping_timeout
+        self._clock = clock
+        self._ready: List[PooledSession] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self.hits = 0
+        self.misses = 0
+        self.recycled = 0
+        self.failures = 0
+        self.setup_seconds: List[float] = []
+        # Connect plus configure time of every session opened
+        self.connect_latency = LatencyHistogram()
+
+    async def start(self) -> None:
+        """Start the background task that fills and checks the pool."""
+        if self.size > 0 and self._task is None:
+            self._closed = False
+            self._task = asyncio.create_task(self._maintain())
+
+    async def checkout(self) -> PooledSession:
+        """Return a ready session, connecting on demand if none is idle."""
+        while self._ready:
+            session = self._ready.pop(0)
+            if self._usable(session):
+                self.hits += 1
+                session.pooled = True
+                self._wakeup.set()
+                return session
+            await self._discard(session)
+        self.misses += 1
+        self._wakeup.set()
+        return await self._open()
+
+    def stats(self) -> Dict[str, float]:
+        """Return pool counters and the mean warm-up time."""
+        recent = self.setup_seconds[-100:]
+        return {
+            "ready": len(self._ready),
+            "hits": self.hits,
+            "misses": self.misses,
+            "recycled": self.recycled,
+            "failures": self.failures,
+            "avg_setup_seconds": sum(recent) / len(recent) if recent else 0.0,
+        }
+
+    async def close(self) -> None:
+        """Stop maintenance and close every idle session."""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        ready, self._ready = self._ready, []
+        for session in ready:
+            await self._close_ws(session.ws)
+
+    async def _open(self) -> PooledSession:
+        started = self._clock()
+        ws = await self._connect()
+        session_id = session_fields = None
+        try:
+            if self._configure is not None:
+                session_id, session_fields = await self._configure(ws)
+        except BaseException:
+            await self._close_ws(ws)
+            raise
+        now = self._clock()
+        self.setup_seconds.append(now - started)
+        self.connect_latency.record(now - started)
+        del self.setup_seconds[:-1000]
+        return PooledSession(
+            ws=ws,
+            created_at=now,
+            setup_seconds=now - started,
+            session_id=session_id,
+            session_fields=session_fields,
+        )
+
+    def _usable(self, session: PooledSession) -> bool:
+        if self._clock() - session.created_at >= self.max_age:
+            return False
+        return getattr(session.ws, "open", True) is not False
+
+    async def _healthy(self, session: PooledSession) -> bool:
+        if not self._usable(session):
+            return False
+        try:
+            pong = await session.ws.ping()
+            await asyncio.wait_for(pong, self.ping_timeout)
+        except Exception:
+            return False
+        return True
+
+    async def _discard(self, session: PooledSession) -> None:
+        self.recycled += 1
+        await self._close_ws(session.ws)
+
+    @staticmethod
+    async def _close_ws(ws: Any) -> None:
+        try:
+            await ws.close()
+        except Exception:
+            pass
+
+    async def _maintain(self) -> None:
+        backoff = 1.0
+        while not self._closed:
+            while len(self._ready) < self.size and not self._closed:
+                try:
+                    self._ready.append(await self._open())
+                    backoff = 1.0
+                except Exception as exc:
+                    self.failures += 1
+                    logger.error("realtime_pool.connect_failed", error=str(exc))
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 30.0)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.health_interval)
+            except asyncio.TimeoutError:
+                await self._check_idle()
+
+    async def _check_idle(self) -> None:
+        for session in list(self._ready):
+            if await self._healthy(session):
+                continue
+            if session in self._ready:
+                self._ready.remove(session)
+                await self._discard(session)
@@ -0,0 +1,140 @@
+"""Streaming disallowed-topic matching.
+
+:class:`TopicMatcher` compiles a list of topic phrases into an Aho-Corasick
+automaton, so a chunk of text is scanned once however many topics there
+are. :class:`TopicStream` keeps the automaton state between chunks, which
+lets the bridge feed ``response.audio_transcript.delta`` and
+``response.text.delta`` fragments as they arrive and catch a topic that is
+split across deltas, cancelling the response while it is still being
+spoken instead of after the finished item arrives.
+
+Matching is case-insensitive and on substrings, like the
+``DISALLOWED_TOPICS_REGEX`` alternation it replaces.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# A regex that is only literal words and spaces separated by "|"
+_LITERAL_ALTERNATION = re.compile(r"^[\w '\-]+(?:\|[\w '\-]+)*$")
+
+
+def literal_topics(regex: Optional[str]) -> Optional[List[str]]:
+    """Return the alternatives of a plain ``a|b|c`` regex, else ``None``."""
+    if regex and _LITERAL_ALTERNATION.match(regex):
+        return [part for part in regex.split("|") if part.strip()]
+    return None
+
+
+def load_topics(spec: Optional[str] = None, path: Optional[str] = None) -> List[str]:
+    """Read topics from a comma-separated ``spec`` and/or a one-per-line file."""
+    topics = [t for t in (spec or "").split(",")]
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            topics.extend(line for line in f if not line.lstrip().startswith("#"))
+    return [t.strip() for t in topics if t.strip()]
+
+
+class TopicMatcher:
+    """Aho-Corasick automaton over lower-cased topic phrases."""
+
+    def __init__(self, topics: Iterable[str]):
+        self.topics: List[str] = list(
+            dict.fromkeys(t.strip().lower() for t in topics if t and t.strip())
+        )
+        goto: List[Dict[str, int]] = [{}]
+        out: List[int] = [-1]
+        for index, topic in enumerate(self.topics):
+            state = 0
+            for ch in topic:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    goto.append({})
+                    out.append(-1)
+                    nxt = len(goto) - 1
+                    goto[state][ch] = nxt
+                state = nxt
+            if out[state] < 0:
+                out[state] = index
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                # A state also reports any topic that ends at its fail state
+                if out[nxt] < 0:
+                    out[nxt] = out[fail[nxt]]
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def __len__(self) -> int:
+        return len(self.topics)
+
+    @property
+    def states(self) -> int:
+        return len(self._goto)
+
+    def step(self, state: int, text: str) -> Tuple[int, int]:
+        """Advance from ``state`` over ``text``.
+
+        Returns the new state and the index of the first topic matched, or
+        ``-1``; scanning stops at the first match.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        for ch in text.lower():
+            while True:
+                nxt = goto[state].get(ch)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            if out[state] >= 0:
+                return state, out[state]
+        return state, -1
+
+    def search(self, text: str) -> Optional[str]:
+        """Return the first topic found in ``text``, or ``None``."""
+        _, index = self.step(0, text)
+        return self.topics[index] if index >= 0 else None
+
+    def stream(self) -> "TopicStream":
+        return TopicStream(self)
+
+
+class TopicStream:
+    """Incremental matcher state for one response."""
+
+    __slots__ = ("matcher", "state", "matched")
+
+    def __init__(self, matcher: TopicMatcher):
+        self.matcher = matcher
+        self.state = 0
+        self.matched: Optional[str] = None
+
+    def feed(self, delta: str) -> Optional[str]:
+        """Scan the next chunk; return a topic the first time one matches."""
+        if self.matched is not None or not delta:
+            return None
+        self.state, index = self.matcher.step(self.state, delta)
+        if index >= 0:
+            self.matched = self.matcher.topics[index]
+            return self.matched
+        return None
+
+    def reset(self) -> None:
+        """Start over for a new response."""
+        self.state = 0
+        self.matched = None
@@ -0,0 +1,160 @@
+"""Streaming, crash-safe transcript files.
+
+:class:`TranscriptSink` appends each ``conversation.item.created`` event to
+``<call>_<session>.jsonl`` as it arrives and the matching QA line to
+``call_<call>.txt``. Records are buffered and flushed when the buffer
+fills, ``flush_interval`` seconds after the first unflushed record, and on
+close, so memory per call stays bounded and a worker crash loses at most
+one flush interval of transcript. Inside an event loop the file writes run
+on one background thread shared by all calls, in submission order, so a
+slow disk never stalls the audio path.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Tuple
+
+import structlog
+
+import codec
+
+logger = structlog.get_logger()
+
+# One writer thread keeps each file's writes in order
+_WRITER: Optional[ThreadPoolExecutor] = None
+
+
+def _writer() -> ThreadPoolExecutor:
+    global _WRITER
+    if _WRITER is None:
+        _WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transcript")
+    return _WRITER
+
+
+def shutdown() -> None:
+    """Stop the writer thread once queued writes finish."""
+    global _WRITER
+    if _WRITER is not None:
+        _WRITER.shutdown(wait=True)
+        _WRITER = None
+
+
+def item_role_content(item: dict) -> Tuple[Optional[str], Any]:
+    """Return the ``(role, content)`` of a conversation item event."""
+    if isinstance(item.get("message"), dict):
+        return item["message"].get("role"), item["message"].get("content")
+    return item.get("role") or item.get("speaker"), item.get("content")
+
+
+class TranscriptSink:
+    """Append-only JSONL transcript plus QA text for one call."""
+
+    def __init__(
+        self,
+        transcript_dir: str,
+        call_id: Optional[str],
+        session_id: Optional[str],
+        *,
+        flush_interval: float = 1.0,
+        flush_bytes: int = 64 * 1024,
+    ):
+        os.makedirs(transcript_dir, exist_ok=True)
+        self.call_id = call_id
+        self.path = os.path.join(transcript_dir, f"{call_id}_{session_id or 'session'}.jsonl")
+        self.qa_path = os.path.join(transcript_dir, f"call_{call_id}.txt")
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.count = 0
+        self.failed = False
+        self._lines: List[str] = []
+        self._qa_lines: List[str] = []
+        self._pending_bytes = 0
+        self._files = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, message: str, item: dict) -> None:
+        """Record one item; ``message`` is the raw event text if available."""
+        line = message if message and "\n" not in message else codec.dumps(item)
+        self._lines.append(line + "\n")
+        self._pending_bytes += len(line) + 1
+        role, content = item_role_content(item)
+        if content:
+            prefix = "GPT-4o" if role == "assistant" else "ASR"
+            self._qa_lines.append(f"{prefix}: {content}\n")
+        self.count += 1
+        if self._pending_bytes >= self.flush_bytes:
+            self.flush()
+        elif self._timer is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self._timer = loop.call_later(self.flush_interval, self.flush)
+
+    def flush(self) -> None:
+        """Write buffered records to disk, on the writer thread inside an event loop."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._lines:
+            return
+        lines, qa_lines = self._lines, self._qa_lines
+        self._lines, self._qa_lines, self._pending_bytes = [], [], 0
+        if self.failed:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(lines, qa_lines)
+            return
+        loop.run_in_executor(_writer(), self._write, lines, qa_lines)
+
+    def _write(self, lines: List[str], qa_lines: List[str]) -> None:
+        if self.failed:
+            return
+        try:
+            if self._files is None:
+                self._files = (
+                    open(self.path, "a", encoding="utf-8"),
+                    open(self.qa_path, "a", encoding="utf-8"),
+                )
+            transcript, qa = self._files
+            transcript.writelines(lines)
+            transcript.flush()
+            if qa_lines:
+                qa.writelines(qa_lines)
+                qa.flush()
+        except Exception as exc:
+            self.failed = True
+            logger.error("transcript.save_failed", call_id=self.call_id, error=str(exc))
+
+    def close(self) -> None:
+        """Flush remaining records and close the files.
+
+        Inside an event loop the close is queued behind the pending writes;
+        use :meth:`aclose` to wait for them.
+        """
+        self.flush()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._close_files()
+            return
+        loop.run_in_executor(_writer(), self._close_files)
+
+    async def aclose(self) -> None:
+        """Flush remaining records, close the files and wait until they are written."""
+        self.flush()
+        await asyncio.get_running_loop().run_in_executor(_writer(), self._close_files)
+
+    def _close_files(self) -> None:
+        if self._files is not None:
+            for f in self._files:
+                f.close()
+            self._files = None
@@ -0,0 +1,116 @@
+"""Shared Twilio REST client with async dispatch.
+
+One :class:`AsyncTwilio` per process wraps a single ``twilio.rest.Client``
+whose HTTP session keeps a pool of keep-alive connections. The SDK is
+synchronous, so every request runs on a bounded thread pool and is awaited
+with a deadline, keeping hangups and call updates off the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from requests.adapters import HTTPAdapter
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+from twilio.twiml.voice_response import VoiceResponse
+from urllib3.util.retry import Retry
+
+
+class AsyncTwilio:
+    """Pooled Twilio client whose calls run off the event loop.
+
+    Parameters
+    ----------
+    account_sid, auth_token: str
+        Twilio credentials.
+    max_workers: int
+        Threads (and pooled connections) available for concurrent requests.
+    timeout: float
+        Socket timeout for each HTTP attempt, in seconds.
+    retries: int
+        Retries for connection failures and ``429`` responses. Both mean the
+        request was not processed, so retrying a ``POST`` cannot dial twice.
+    base_url: str, optional
+        Override ``https://api.twilio.com``, e.g. for a local stand-in server.
+    """
+
+    def __init__(
+        self,
+        account_sid: str,
+        auth_token: str,
+        *,
+        max_workers: int = 8,
+        timeout: float = 5.0,
+        retries: int = 2,
+        base_url: Optional[str] = None,
+    ):
+        self.timeout = timeout
+        self.retries = retries
+        http_client = TwilioHttpClient(pool_connections=True, timeout=timeout)
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max_workers,
+            max_retries=Retry(
+                total=retries,
+                connect=retries,
+                read=0,
+                status=retries,
+                status_forcelist=(429,),
+                allowed_methods=None,
+                backoff_factor=0.2,
+                raise_on_status=False,
+            ),
+        )
+        http_client.session.mount("https://", adapter)
+        http_client.session.mount("http://", adapter)
+        self.client = Client(account_sid, auth_token, http_client=http_client)
+        if base_url:
+            self.client.api.base_url = base_url.rstrip("/")
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="twilio"
+        )
+
+    @property
+    def deadline(self) -> float:
+        """Upper bound for one request including retries and backoff."""
+        return self.timeout * (self.retries + 1) + 1.0
+
+    async def _run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(
+            loop.run_in_executor(self._executor, lambda: func(*args, **kwargs)),
+            self.deadline,
+        )
+
+    async def create_call(self, to: str, from_: str, url: str, **kwargs: Any) -> Any:
+        """Place an outbound call and return the call resource.
+
+        Extra keyword arguments, e.g. ``status_callback=``, go to the SDK.
+        """
+        return await self._run(
+            self.client.calls.create, url=url, to=to, from_=from_, **kwargs
+        )
+
+    async def update_call(self, call_sid: str, **kwargs: Any) -> Any:
+        """Update a live call, e.g. with ``twiml=`` or ``status=``."""
+        return await self._run(self.client.calls(call_sid).update, **kwargs)
+
+    async def say(self, call_sid: str, text: str) -> Any:
+        """Interrupt ``call_sid`` with a spoken message."""
+        vr = VoiceResponse()
+        vr.say(text)
+        return await self.update_call(call_sid, twiml=str(vr))
+
+    async def hangup(self, call_sid: str) -> Any:
+        """Hang up ``call_sid`` using Twilio's <Hangup> verb."""
+        vr = VoiceResponse()
+        vr.hangup()
+        return await self.update_call(call_sid, twiml=str(vr))
+
+    def shutdown(self) -> None:
+        """Stop the worker threads and close pooled connections."""
+        self._executor.shutdown(wait=False)
+        self.client.http_client.session.close()
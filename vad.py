@@ -0,0 +1,137 @@
+"""Local voice-activity detection on Twilio's μ-law frames.
+
+Each 20 ms frame is decoded through a 256-entry lookup table and scored by
+its energy (dBFS) and zero-crossing rate: speech is loud with a moderate
+zero-crossing rate, while line noise and hiss cross zero far more often.
+:class:`VoiceActivityDetector` turns the per-frame decision into speech
+start and end events with an onset of ``start_frames`` consecutive speech
+frames and a hangover of ``hangover_frames`` non-speech frames.
+
+Uses NumPy when it is installed and falls back to pure Python lookups
+otherwise.
+"""
+
+from __future__ import annotations
+
+import binascii
+import math
+from typing import Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+BACKEND = "numpy" if np is not None else "python"
+
+SPEECH_START = "start"
+SPEECH_END = "end"
+
+_FULL_SCALE = 32768.0
+
+
+def _ulaw_to_linear(byte: int) -> int:
+    byte = ~byte & 0xFF
+    exponent = (byte >> 4) & 0x07
+    sample = ((((byte & 0x0F) << 3) + 0x84) << exponent) - 0x84
+    return -sample if byte & 0x80 else sample
+
+
+ULAW_TO_LINEAR = tuple(_ulaw_to_linear(b) for b in range(256))
+_SQUARES = tuple(v * v for v in ULAW_TO_LINEAR)
+# 1 for negative samples, matching np.signbit on the decoded values
+_SIGN_TABLE = bytes(1 if v < 0 else 0 for v in ULAW_TO_LINEAR)
+
+if np is not None:
+    _LUT = np.array(ULAW_TO_LINEAR, dtype=np.float32)
+
+
+def frame_features(frame: bytes) -> Tuple[float, float]:
+    """Return ``(energy_dbfs, zero_crossing_rate)`` of a μ-law frame."""
+    n = len(frame)
+    if n < 2:
+        return -120.0, 0.0
+    if np is not None:
+        samples = _LUT[np.frombuffer(frame, dtype=np.uint8)]
+        power = float(np.dot(samples, samples)) / n
+        signs = np.signbit(samples)
+        crossings = int(np.count_nonzero(signs[1:] != signs[:-1]))
+    else:
+        power = sum(map(_SQUARES.__getitem__, frame)) / n
+        signs = frame.translate(_SIGN_TABLE)
+        crossings = sum(a != b for a, b in zip(signs, signs[1:]))
+    energy = 10 * math.log10(power / (_FULL_SCALE * _FULL_SCALE)) if power > 0 else -120.0
+    return energy, crossings / (n - 1)
+
+
+class VoiceActivityDetector:
+    """Frame-by-frame speech detector with onset and hangover.
+
+    Parameters
+    ----------
+    energy_db: float
+        Minimum frame energy in dBFS for a speech frame.
+    zcr_max: float
+        Maximum zero-crossing rate (crossings per sample) for a speech frame.
+    start_frames: int
+        Consecutive speech frames needed to report :data:`SPEECH_START`.
+    hangover_frames: int
+        Consecutive non-speech frames after which :data:`SPEECH_END` is
+        reported.
+    """
+
+    def __init__(
+        self,
+        energy_db: float = -35.0,
+        zcr_max: float = 0.35,
+        start_frames: int = 3,
+        hangover_frames: int = 15,
+    ):
+        self.energy_db = energy_db
+        self.zcr_max = zcr_max
+        self.start_frames = start_frames
+        self.hangover_frames = hangover_frames
+        self.speaking = False
+        self._run = 0
+        self._silence = 0
+        self.onset_at: Optional[float] = None
+        self._first_speech_at: Optional[float] = None
+
+    def is_speech(self, frame: bytes) -> bool:
+        energy, zcr = frame_features(frame)
+        return energy >= self.energy_db and zcr <= self.zcr_max
+
+    def process(self, frame: bytes, now: float = 0.0) -> Optional[str]:
+        """Feed one frame received at ``now``; return a speech event or ``None``.
+
+        On :data:`SPEECH_START`, :attr:`onset_at` is the arrival time of the
+        first frame of the run that triggered it.
+        """
+        if self.is_speech(frame):
+            self._silence = 0
+            if self._run == 0:
+                self._first_speech_at = now
+            self._run += 1
+            if not self.speaking and self._run >= self.start_frames:
+                self.speaking = True
+                self.onset_at = self._first_speech_at
+                return SPEECH_START
+            return None
+        self._run = 0
+        if self.speaking:
+            self._silence += 1
+            if self._silence >= self.hangover_frames:
+                self.speaking = False
+                self._silence = 0
+                return SPEECH_END
+        return None
+
+    def process_payload(self, payload: str, now: float = 0.0) -> Optional[str]:
+        """:meth:`process` for a base64 Twilio media payload."""
+        return self.process(binascii.a2b_base64(payload), now)
+
+    def reset(self) -> None:
+        self.speaking = False
+        self._run = 0
+        self._silence = 0
+        self.onset_at = None